@@ -3,22 +3,123 @@
 Main Streamlit application for ranking municipalities by accessibility and quality of life.
 """
 
+from typing import Any, Dict, List, Optional
+
 import numpy as np
+import pandas as pd
 import streamlit as st
 
 from config.styles import apply_styles
-from config.constants import CRITERIA, BENEFIT_COLUMNS, COST_COLUMNS
-from core.data_loader import load_data, load_placeholder_images
-from core.accessibility import compute_accessibility_hours
+from config.constants import BENEFIT_COLUMNS, COST_COLUMNS
+from core.data_loader import (
+    available_provinces,
+    available_years,
+    dataset_key,
+    load_data,
+    load_commute_matrix,
+    load_placeholder_images,
+    load_profile_tensor,
+)
+from core.accessibility import (
+    add_commute_hours,
+    compute_accessibility_hours,
+    compute_household_hours,
+    lookup_accessibility_hours,
+)
+from core.commute import commute_hours, commute_minutes, workplace_distance_km
 from core.ahp import preferences_to_weights
-from core.scoring import normalize_criteria, compute_scores, equal_weights
-from ui.questionnaire import render_questionnaire
+from core.scoring import (
+    equal_weights,
+    materialize_scores,
+    normalize_frame,
+    rank_positions,
+    score_frame,
+    scoring_frame,
+)
+from ui.questionnaire import render_province_selector, render_questionnaire, render_year_selector
 from ui.map_view import render_map_view
 from ui.list_view import render_list_view
 from ui.details_view import render_details
 from ui.comparison_view import render_comparison_view
 
 
+def score_municipalities(
+    df_raw: pd.DataFrame,
+    year: Optional[int],
+    provinces: Optional[List[int]],
+    prefs: Dict[str, Any],
+    weights: Dict[str, float],
+) -> Dict[str, Any]:
+    """Filter, compute accessibility, normalize and score one year's data.
+    
+    Args:
+        df_raw: Shared dataset of one year (derive from it, never modify)
+        year: Padrón year of df_raw
+        provinces: Provinces of df_raw, as passed to load_data
+        prefs: Output of render_questionnaire
+        weights: Mapping {criterion: weight}
+        
+    Returns:
+        Output of score_frame (see materialize_scores for the DataFrame)
+    """
+    # Filter by population (a row mask: df_raw is never sliced or copied)
+    population = df_raw["IDE_PoblacionTotal"].to_numpy()
+    keep = (population >= prefs["pop_min"]) & (population <= prefs["pop_max"])
+    
+    # Hard distance limit to the workplace
+    commute = prefs["commute"]
+    if commute is not None and commute["max_km"] is not None:
+        keep &= workplace_distance_km(df_raw, commute) <= commute["max_km"]
+    
+    # Accessibility over the whole dataset: a lookup in the precomputed
+    # tensor when built, else computed and cached per travel profile. Either
+    # way population filter changes reuse it; its rows align with df_raw
+    profile = {
+        "freq_car": prefs["w_car"],
+        "freq_supermarket": prefs["w_supermarket"],
+        "freq_sport": prefs["w_sport"],
+        "freq_hospital": prefs["w_hospital"],
+        "edu_has_kids": prefs["edu_has_kids"],
+        "edu_variant": prefs["edu_variant"],
+        "edu_levels": tuple(prefs["edu_levels"]),
+    }
+    household = prefs["household"]
+    if household is not None:
+        acc_df = compute_household_hours(
+            df_raw, dataset_key(year, provinces), household["members"], household["aggregation"]
+        )
+    else:
+        store = load_profile_tensor(year)
+        acc_df = lookup_accessibility_hours(store, df_raw, **profile) if store is not None else None
+        if acc_df is None:
+            acc_df = compute_accessibility_hours(df_raw, dataset_key(year, provinces), **profile)
+    
+    # Commute: one matrix row (or haversine estimate) for the workplace
+    if commute is not None:
+        hours = commute_hours(commute_minutes(load_commute_matrix(), df_raw, commute), prefs["w_car"], commute["days"])
+        acc_df = add_commute_hours(acc_df, hours, household)
+    
+    # Household limits drop municipalities where someone would travel too long
+    if household is not None:
+        within = acc_df["WithinMemberLimits"].to_numpy(bool)
+        if within[keep].any():
+            keep &= within
+    
+    # Score the kept rows as arrays (optional criteria only when the dataset
+    # has them); the breakdown columns are attached on materialization
+    benefit_cols = {crit: BENEFIT_COLUMNS[crit] for crit in prefs["criteria"] if crit in BENEFIT_COLUMNS}
+    acc_cols = [col for col in acc_df.columns if col not in ("codigo", "Nombre")]
+    frame = scoring_frame(
+        df_raw,
+        np.flatnonzero(keep),
+        benefit_cols,
+        COST_COLUMNS,
+        acc_df["AccessibilityHoursWeekly"].to_numpy(),
+        breakdown=acc_df[acc_cols],
+    )
+    return score_frame(normalize_frame(frame), weights)
+
+
 def main() -> None:
     """Main application entry point."""
     # Apply styles and page config
@@ -50,37 +151,16 @@ def main() -> None:
     # Add anchor for back-to-top
     st.markdown('<div id="top"></div>', unsafe_allow_html=True)
 
-    # Load data
-    df_raw, gdf_raw = load_data()
+    # Load data (only the selected year's partition and provinces)
+    year_prefs = render_year_selector(available_years())
+    provinces = render_province_selector(available_provinces(year_prefs["year"]))
+    df_raw, _ = load_data(year_prefs["year"], provinces)
     images = load_placeholder_images()
     
     # Render questionnaire and get user preferences
     prefs = render_questionnaire(df_raw)
-    
-    # Filter by population
-    df = df_raw.copy()
-    if "IDE_PoblacionTotal" in df.columns:
-        df = df[(df["IDE_PoblacionTotal"] >= prefs["pop_min"]) & 
-                (df["IDE_PoblacionTotal"] <= prefs["pop_max"])].copy()
-    
-    # Compute accessibility
-    acc_df = compute_accessibility_hours(
-        df=df,
-        freq_car=prefs["w_car"],
-        freq_supermarket=prefs["w_supermarket"],
-        freq_sport=prefs["w_sport"],
-        freq_hospital=prefs["w_hospital"],
-        edu_has_kids=prefs["edu_has_kids"],
-        edu_variant=prefs["edu_variant"],
-        edu_levels=prefs["edu_levels"],
-    )
-    
-    # Merge accessibility data including breakdown columns (exclude 'Nombre' to avoid duplicates)
-    acc_cols = ["codigo", "AccessibilityHoursWeekly"] + [col for col in acc_df.columns if col.startswith("hrs_")]
-    df_scored = df.merge(acc_df[acc_cols], on="codigo", how="left")
-    
-    # Normalize criteria
-    norm_df = normalize_criteria(df_scored, BENEFIT_COLUMNS, COST_COLUMNS)
+    household = prefs["household"]
+    st.session_state["household_labels"] = [m["label"] for m in household["members"]] if household else []
     
     # Compute weights via AHP
     try:
@@ -88,25 +168,27 @@ def main() -> None:
         # Keep 0 as 0 to indicate "no importance"
         inverted_ranks = [11 - r if r > 0 else 0 for r in prefs["ranks"]]
         w_vec = preferences_to_weights(np.array(inverted_ranks, dtype=float), mode="ranking")
-        weights = {CRITERIA[i]: float(w_vec[i]) for i in range(len(CRITERIA))}
+        weights = {crit: float(w) for crit, w in zip(prefs["criteria"], w_vec)}
     except Exception as e:
         st.sidebar.error(f":material/error: Error: {e}")
         st.sidebar.info("Usando pesos iguales como respaldo.")
-        weights = equal_weights(CRITERIA)
+        weights = equal_weights(prefs["criteria"])
     
     # Compute scores
     with st.spinner("Calculando puntuaciones de municipios..."):
-        scores_df = compute_scores(norm_df, weights)
-    
-    # Prepare map data
-    with st.spinner("Preparando mapa..."):
-        gdf = gdf_raw.merge(
-            scores_df[["codigo", "Nombre", "Score", "weighted_score", "AccessibilityHoursWeekly",
-                      "IDE_PoblacionTotal", "IDE_PrecioPorMetroCuadrado"] +
-                     [c for c in scores_df.columns if c.startswith("NORM_") or c.startswith("CONTRIB_") or c.startswith("hrs_")]],
-            on=["Nombre"],
-            how="inner",
-        )
+        frame = score_municipalities(df_raw, year_prefs["year"], provinces, prefs, weights)
+        scores_df = materialize_scores(frame)
+
+        # Rank across years: same preferences applied to each compared year's
+        # partition (loaded on demand), joined by INE code. Only the ranks
+        # are needed, so those frames are never materialized
+        if year_prefs["compare_years"]:
+            ranks = {f"Rank_{year_prefs['year']}": rank_positions(frame)}
+            for year in year_prefs["compare_years"]:
+                year_df = load_data(year, provinces)[0]
+                year_frame = score_municipalities(year_df, year, provinces, prefs, weights)
+                ranks[f"Rank_{year}"] = rank_positions(year_frame)
+            scores_df = scores_df.join(pd.DataFrame(ranks).reindex(columns=sorted(ranks)), how="left")
     
     # Main view selector
     view_option = st.radio(
@@ -135,7 +217,7 @@ def main() -> None:
     
     # Render selected view
     if view_option == ":material/map: Mapa de municipios":
-        render_map_view(gdf, scores_df)
+        render_map_view(scores_df)
     elif view_option == ":material/list: Lista de municipios":
         render_list_view(scores_df, images)
     else:
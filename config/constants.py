@@ -1,7 +1,8 @@
 # config/constants.py
 """Configuration constants for LodCORE Madrid municipality finder."""
 
-from typing import Dict, List, Literal
+import re
+from typing import Dict, Iterable, List, Literal, Optional
 
 # Criteria definitions
 CRITERIA: List[str] = [
@@ -12,8 +13,13 @@ CRITERIA: List[str] = [
     "TransportInfraQuality",
     "EconomicDynamism",
     "HousePriceSqm",
+    "ServiceOffer",
 ]
 
+# Criteria only offered when the dataset has their column (built from
+# optional inputs, e.g. the gravity stage of scripts/build.py)
+OPTIONAL_CRITERIA: List[str] = ["ServiceOffer"]
+
 CRITERIA_LABELS: Dict[str, str] = {
     "AccessibilityHoursWeekly": "Ahorro de tiempo en desplazamientos",
     "EducationQuality": "Calidad de la educación",
@@ -22,6 +28,7 @@ CRITERIA_LABELS: Dict[str, str] = {
     "TransportInfraQuality": "Calidad de las infraestructuras de transporte",
     "EconomicDynamism": "Dinamismo económico",
     "HousePriceSqm": "Precio de la vivienda (€/m²)",
+    "ServiceOffer": "Oferta de servicios cercana",
 }
 
 CRITERIA_ICONS: Dict[str, str] = {
@@ -32,6 +39,7 @@ CRITERIA_ICONS: Dict[str, str] = {
     "TransportInfraQuality": ":material/train:",
     "EconomicDynamism": ":material/work:",
     "HousePriceSqm": ":material/payments:",
+    "ServiceOffer": ":material/storefront:",
 }
 
 CRITERIA_TOOLTIPS: Dict[str, str] = {
@@ -42,6 +50,7 @@ CRITERIA_TOOLTIPS: Dict[str, str] = {
     "TransportInfraQuality": "Disponibilidad y calidad de infraestructuras de transporte público y carreteras.",
     "EconomicDynamism": "Actividad económica, empleo y tejido empresarial del municipio.",
     "HousePriceSqm": "Precio medio de vivienda por metro cuadrado según datos de Idealista. Menor es mejor.",
+    "ServiceOffer": "Cantidad y cercanía de supermercados, farmacias, centros de salud y colegios alrededor del municipio, no solo el más próximo.",
 }
 
 # Dataset column mappings
@@ -51,6 +60,7 @@ BENEFIT_COLUMNS: Dict[str, str] = {
     "BuildingQuality": "ATR_AtractividadDeLosInmuebles_ClusterEstadistica",
     "TransportInfraQuality": "ATR_AtractividadDeLasInfraestructurasDeTransporte_ClusterEstadistica",
     "EconomicDynamism": "ATR_DinamismosEconomico_ClusterEstadistica",
+    "ServiceOffer": "GRV_OfertaServicios",
 }
 
 COST_COLUMNS: Dict[str, str] = {
@@ -112,6 +122,82 @@ ACC_COLUMNS: Dict[str, Dict[str, str]] = {
     },
 }
 
+# Travel modes of every ACC service, in accessibility tensor order
+TRAVEL_MODES: List[str] = ["coche", "TransportePublico"]
+
+# Travel-time columns: {ACC|OSM}_{service}_tiempo_{mode}[_{detail}]
+ACC_COLUMN_PATTERN = re.compile(
+    r"^(?:ACC|OSM)_(?P<service>[A-Za-z]+)_tiempo_(?P<mode>coche|TransportePublico)(?:_(?P<detail>.+))?$"
+)
+
+
+def discover_acc_columns(columns: Iterable[str]) -> Dict[str, Dict[str, str]]:
+    """Configured ACC_COLUMNS plus every other travel-time service in a header.
+
+    Unconfigured services (e.g. OdontologiaEstomatologia) are keyed by their
+    service and detail, "sanidad_OfertaAsistencial_OdontologiaEstomatologia".
+    A service with a single mode uses that column for both, like "gas".
+    Columns that already belong to a configured service are not rediscovered.
+
+    Args:
+        columns: Dataset column names
+
+    Returns:
+        Dictionary {service key: {mode: column}}, configured services first
+    """
+    services = {key: dict(modes) for key, modes in ACC_COLUMNS.items()}
+    configured = {column for modes in ACC_COLUMNS.values() for column in modes.values()}
+
+    found: Dict[str, Dict[str, str]] = {}
+    for column in columns:
+        match = ACC_COLUMN_PATTERN.match(column)
+        if match:
+            key = "_".join(part for part in match.group("service", "detail") if part)
+            found.setdefault(key, {})[match.group("mode")] = column
+
+    for key, modes in found.items():
+        if key in services or configured & set(modes.values()):
+            continue
+        services[key] = {mode: modes.get(mode, next(iter(modes.values()))) for mode in TRAVEL_MODES}
+    return services
+
+
+def acc_column_name(service: str, mode: str) -> Optional[str]:
+    """Dataset column holding a service's travel time by one mode.
+
+    Configured services use ACC_COLUMNS; other keys follow the
+    discover_acc_columns naming in reverse ("sanidad_OfertaAsistencial_X"
+    → ACC_sanidad_tiempo_{mode}_OfertaAsistencial_X).
+
+    Args:
+        service: Service key
+        mode: One of TRAVEL_MODES
+
+    Returns:
+        Column name, or None if the service has no column of its own for
+        that mode (e.g. gas stations by public transport reuse the car time)
+    """
+    if service in ACC_COLUMNS:
+        column = ACC_COLUMNS[service][mode]
+        match = ACC_COLUMN_PATTERN.match(column)
+        return column if match and match.group("mode") == mode else None
+    name, _, detail = service.partition("_")
+    return f"ACC_{name}_tiempo_{mode}" + (f"_{detail}" if detail else "")
+
+
+def available_criteria(columns: Iterable[str]) -> List[str]:
+    """Criteria the dataset can score, in CRITERIA order.
+
+    Args:
+        columns: Dataset column names
+
+    Returns:
+        CRITERIA without the optional ones whose column is missing
+    """
+    present = set(columns)
+    return [c for c in CRITERIA if c not in OPTIONAL_CRITERIA or BENEFIT_COLUMNS[c] in present]
+
+
 # Questionnaire options
 CAR_FREQ_LABELS: List[str] = [
     "Casi nunca (0-1 días/semana)",
@@ -175,6 +261,26 @@ DEMOGRAPHIC_COLUMNS: Dict[str, str] = {
     "80+": "DEM_Edad_80Plus_Total",
 }
 
+# INE province codes (first two digits of the municipality code)
+PROVINCE_NAMES: Dict[int, str] = {
+    1: "Araba/Álava", 2: "Albacete", 3: "Alicante/Alacant", 4: "Almería", 5: "Ávila",
+    6: "Badajoz", 7: "Balears, Illes", 8: "Barcelona", 9: "Burgos", 10: "Cáceres",
+    11: "Cádiz", 12: "Castellón/Castelló", 13: "Ciudad Real", 14: "Córdoba", 15: "Coruña, A",
+    16: "Cuenca", 17: "Girona", 18: "Granada", 19: "Guadalajara", 20: "Gipuzkoa",
+    21: "Huelva", 22: "Huesca", 23: "Jaén", 24: "León", 25: "Lleida",
+    26: "Rioja, La", 27: "Lugo", 28: "Madrid", 29: "Málaga", 30: "Murcia",
+    31: "Navarra", 32: "Ourense", 33: "Asturias", 34: "Palencia", 35: "Palmas, Las",
+    36: "Pontevedra", 37: "Salamanca", 38: "Santa Cruz de Tenerife", 39: "Cantabria", 40: "Segovia",
+    41: "Sevilla", 42: "Soria", 43: "Tarragona", 44: "Teruel", 45: "Toledo",
+    46: "Valencia/València", 47: "Valladolid", 48: "Bizkaia", 49: "Zamora", 50: "Zaragoza",
+    51: "Ceuta", 52: "Melilla",
+}
+
+MADRID_PROVINCE: int = 28
+
+# Padrón year of the demographics in data/merged_dataset.csv
+DEFAULT_DATASET_YEAR: int = 2022
+
 # Age group labels for display
 AGE_GROUP_LABELS: Dict[str, str] = {
     "0-19": "0-19 años",
@@ -186,6 +292,35 @@ AGE_GROUP_LABELS: Dict[str, str] = {
 # Age groups to combine for 60+
 AGE_60_PLUS_GROUPS: List[str] = ["60-79", "80+"]
 
+# Derived demographic columns, computed once when the dataset is built
+DEMOGRAPHIC_TOTAL_COLUMN: str = "DEM_Total"
+
+# Display age groups (keys of AGE_GROUP_LABELS) → resident counts
+AGE_GROUP_COUNT_COLUMNS: Dict[str, str] = {
+    "0-19": DEMOGRAPHIC_COLUMNS["0-19"],
+    "20-39": DEMOGRAPHIC_COLUMNS["20-39"],
+    "40-59": DEMOGRAPHIC_COLUMNS["40-59"],
+    "60+": "DEM_Edad_60Plus_Total",
+}
+
+# Display age groups → share of DEMOGRAPHIC_TOTAL_COLUMN in percent
+AGE_GROUP_SHARE_COLUMNS: Dict[str, str] = {
+    "0-19": "DEM_Pct_0_19",
+    "20-39": "DEM_Pct_20_39",
+    "40-59": "DEM_Pct_40_59",
+    "60+": "DEM_Pct_60Plus",
+}
+
+GENDER_TOTAL_COLUMNS: Dict[str, str] = {
+    "Hombres": "DEM_Hombres_Total",
+    "Mujeres": "DEM_Mujeres_Total",
+}
+
+GENDER_SHARE_COLUMNS: Dict[str, str] = {
+    "Hombres": "DEM_Pct_Hombres",
+    "Mujeres": "DEM_Pct_Mujeres",
+}
+
 def edu_level_to_key(level: str, variant: Literal["public", "pubpriv"]) -> str:
     """Map education level and variant to ACC column key.
     
@@ -0,0 +1,50 @@
+# config/paths.py
+"""Filesystem locations for source data and generated build artifacts."""
+
+from pathlib import Path
+
+ROOT_DIR: Path = Path(__file__).resolve().parent.parent
+
+DATA_DIR: Path = ROOT_DIR / "data"
+BOUNDARIES_DIR: Path = ROOT_DIR / "boundaries"
+ASSETS_DIR: Path = ROOT_DIR / "assets"
+
+# Raw inputs
+DATASET_CSV: Path = DATA_DIR / "merged_dataset.csv"
+INE_DEMOGRAPHICS_CSV: Path = DATA_DIR / "population_by_age_and_gender.csv"
+BOUNDARIES_SHP: Path = BOUNDARIES_DIR / "recintos_municipales_inspire_peninbal_etrs89.shp"
+
+# Offline routing (core/routing.py): road/transit graph and facility locations
+ROUTING_DIR: Path = DATA_DIR / "routing"
+ROAD_NODES_CSV: Path = ROUTING_DIR / "nodes.csv"
+ROAD_EDGES_CSV: Path = ROUTING_DIR / "edges.csv"
+FACILITIES_CSV: Path = ROUTING_DIR / "facilities.csv"
+
+# Generated artifacts (safe to delete, rebuilt by scripts/ or on demand)
+BUILD_DIR: Path = DATA_DIR / "build"
+BOUNDARIES_ARTIFACT: Path = BUILD_DIR / "boundaries_madrid.parquet"
+GEOMETRY_LOD_DIR: Path = BUILD_DIR / "geometries"
+DATASET_CACHE_DIR: Path = BUILD_DIR / "dataset"
+# Precomputed accessibility hours of every questionnaire profile, per partition
+ACCESSIBILITY_DIR: Path = BUILD_DIR / "accessibility"
+# Home → workplace minutes between municipality centroids (scripts/build_commute.py)
+COMMUTE_DIR: Path = BUILD_DIR / "commute"
+
+# National scope: all-Spain boundaries and per-province shards
+NATIONAL_BOUNDARIES_ARTIFACT: Path = BUILD_DIR / "boundaries_national.parquet"
+GEOMETRY_SHARD_DIR: Path = GEOMETRY_LOD_DIR / "provinces"
+PROVINCE_SHARD_DIR: Path = DATASET_CACHE_DIR / "provinces"
+
+# Data pipeline (scripts/build.py): per-stage outputs keyed by input hash and
+# versioned dataset snapshots; CURRENT_SNAPSHOT names the one the app loads
+STAGE_CACHE_DIR: Path = BUILD_DIR / "stages"
+SNAPSHOTS_DIR: Path = BUILD_DIR / "snapshots"
+CURRENT_SNAPSHOT: Path = BUILD_DIR / "CURRENT.json"
+
+# Images
+MUNICIPALITY_IMAGES_DIR: Path = ASSETS_DIR / "municipalities"
+PLACEHOLDER_IMAGES_DIR: Path = ROOT_DIR / "photos"
+
+# Files under STATIC_DIR are served by Streamlit at app/static/
+STATIC_DIR: Path = ROOT_DIR / "static"
+IMAGE_DERIVATIVES_DIR: Path = STATIC_DIR / "municipalities"
@@ -0,0 +1,44 @@
+# config/settings.py
+"""Deployment settings read from environment variables."""
+
+import os
+from pathlib import Path
+from typing import Literal, Optional
+
+# How card images reach the browser:
+#   "inline": bytes pushed through the session websocket by st.image
+#   "static": <img> tags pointing at content-hashed files under static/
+#   "auto":   "static" when image derivatives have been built, else "inline"
+IMAGE_MODE: Literal["auto", "static", "inline"] = os.environ.get("LODCORE_IMAGE_MODE", "auto")  # type: ignore[assignment]
+
+# Base URL of static/ as seen by the browser. The default is Streamlit's own
+# static route; point it at a CDN or reverse proxy to add long-lived
+# Cache-Control headers.
+STATIC_BASE_URL: str = os.environ.get("LODCORE_STATIC_BASE_URL", "app/static").rstrip("/")
+
+# Directory for the cross-process shared store (e.g. /dev/shm/lodcore). When
+# set, every server process on the host memory-maps the same read-only copy of
+# the numeric dataset and map geometries instead of loading its own.
+SHARED_STORE_DIR: Optional[Path] = (
+    Path(os.environ["LODCORE_SHARED_STORE_DIR"]) if os.environ.get("LODCORE_SHARED_STORE_DIR") else None
+)
+
+# Dataset years kept loaded per process. Other years are read from their
+# partition on demand and evicted least-recently-used.
+CACHED_YEARS: int = int(os.environ.get("LODCORE_CACHED_YEARS", "3"))
+
+# Geographic scope:
+#   "madrid":   the Comunidad de Madrid dataset and boundaries, loaded whole
+#   "national": every Spanish municipality, sharded by province; only the
+#               provinces selected in the sidebar are loaded
+SCOPE: Literal["madrid", "national"] = os.environ.get("LODCORE_SCOPE", "madrid")  # type: ignore[assignment]
+
+# Province shards (dataset or geometries per level) kept loaded per process
+CACHED_PROVINCES: int = int(os.environ.get("LODCORE_CACHED_PROVINCES", "64"))
+
+# National datasets (one per year and province selection) kept per process.
+# Each holds every selected province, so keep this small.
+CACHED_PROVINCE_SELECTIONS: int = int(os.environ.get("LODCORE_CACHED_PROVINCE_SELECTIONS", "8"))
+
+# Accessibility results (one per dataset and travel profile) kept per process
+CACHED_PROFILES: int = int(os.environ.get("LODCORE_CACHED_PROFILES", "256"))
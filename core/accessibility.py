@@ -1,17 +1,83 @@
 # core/accessibility.py
-"""Accessibility computation: weekly commute hours from user preferences."""
+"""Accessibility computation: weekly commute hours from user preferences.
+
+Travel minutes of every service are stacked once into a (municipalities ×
+services × modes) tensor. A profile reduces to mode weights (car vs public
+transport) and round trips per service, so its weekly hours and breakdown
+come from a single blended matrix product.
+
+Households are evaluated the same way with one mode blend per member,
+batched over members and municipalities. A workplace commute (core/commute.py)
+is added on top of either result.
+
+The questionnaire only offers a few thousand distinct profiles, so
+scripts/build_accessibility.py can evaluate all of them ahead of time into a
+memory-mapped float32 tensor (profiles × municipalities × breakdown slots);
+the app then answers a profile with a lookup instead of computing it.
+"""
+
+import itertools
+import json
+import os
+import shutil
+from pathlib import Path
 
 import numpy as np
 import pandas as pd
 import streamlit as st
-from typing import Dict, List, Optional, Literal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Literal, Tuple
 
-from config.constants import ACC_COLUMNS, edu_level_to_key
+from config.constants import (
+    CAR_FREQ_TO_WCAR,
+    EDU_LEVEL_OPTIONS,
+    HOSPITAL_USE_TO_W,
+    SPORT_FREQ_TO_W,
+    SUPERMARKET_FREQ_TO_W,
+    TRAVEL_MODES,
+    discover_acc_columns,
+    edu_level_to_key,
+)
+from config.paths import ACCESSIBILITY_DIR
+from config.settings import CACHED_PROFILES
 
+# Bump when the accessibility formulas or the tensor layout change
+PROFILE_TENSOR_VERSION: int = 1
 
-@st.cache_data
-def compute_accessibility_hours(
-    df: pd.DataFrame,
+# Breakdown columns stored per profile; the tensor's last slot is the weekly total
+PROFILE_SLOTS: List[str] = ["supermarket", "gas", "sport", "gp", "pharmacy"] + [
+    f"edu_{level.lower()}" for level in EDU_LEVEL_OPTIONS
+]
+
+# Per-member hours columns of compute_household_hours: mhrs_{member}_{key}
+MEMBER_PREFIX: str = "mhrs_"
+
+PROFILE_TENSOR: str = "hours.npy"
+PROFILE_META: str = "profiles.json"
+
+
+def accessibility_tensor(df: pd.DataFrame) -> Dict[str, Any]:
+    """Stack the travel-time columns of every service.
+
+    Services come from discover_acc_columns, so travel-time columns that are
+    not configured in ACC_COLUMNS (e.g. OdontologiaEstomatologia) are
+    included automatically.
+
+    Args:
+        df: Municipality dataset
+
+    Returns:
+        Dictionary with "services" (service keys), "modes" (TRAVEL_MODES) and
+        "minutes", a float64 array of one-way minutes shaped
+        (municipalities, services, modes); float64 so that hours match the
+        dataset values exactly (only the stored profile tensor is float32)
+    """
+    services = discover_acc_columns(df.columns)
+    columns = [services[key][mode] for key in services for mode in TRAVEL_MODES]
+    minutes = df[columns].to_numpy(np.float64).reshape(len(df), len(services), len(TRAVEL_MODES))
+    return {"services": list(services), "modes": list(TRAVEL_MODES), "minutes": minutes}
+
+
+def profile_visits(
     freq_car: float,
     freq_supermarket: float,
     freq_sport: float,
@@ -19,91 +85,476 @@ def compute_accessibility_hours(
     edu_has_kids: bool,
     edu_variant: Optional[Literal["public", "pubpriv"]],
     edu_levels: List[str],
-) -> pd.DataFrame:
-    """Compute weekly accessibility hours per municipality.
-    
-    Aggregates round-trip travel time across essential services based on
-    user-specified visit frequencies.
-    
+) -> Dict[str, Tuple[str, float]]:
+    """Weekly visits behind each breakdown column of a profile.
+
     Args:
-        df: Municipality dataset
-        freq_car: Car usage frequency (days per week) for mode choice weighting
+        freq_car: Car usage frequency (days per week)
         freq_supermarket: Supermarket visit frequency (times per week)
         freq_sport: Sports facility visit frequency (times per week)
         freq_hospital: Hospital/health center visit frequency (times per week)
         edu_has_kids: Whether to include education travel
         edu_variant: School type ('public' or 'pubpriv')
         edu_levels: Education stages to include
-        
+
     Returns:
-        DataFrame with AccessibilityHoursWeekly column (actually weekly hours)
+        Dictionary {breakdown key: (service key, visits per week)}; the
+        breakdown key names the hrs_{key} output column
     """
-    out = df[["codigo", "Nombre"]].copy()
-    total = np.zeros(len(df), dtype=float)
-
-    # Compute car usage weight for transportation mode blending
-    w_car = freq_car / 7.0  # Convert days per week to proportion
-
-    def blend_minutes(col_car: str, col_pt: str) -> np.ndarray:
-        """Blend car and public transport times based on car usage."""
-        mc = df[col_car].astype(float)
-        mp = df[col_pt].astype(float) if col_pt in df.columns else mc
-        return w_car * mc + (1.0 - w_car) * mp
-
-    def add_hours(key: str, minutes_one_way: np.ndarray, visits_per_week: float) -> None:
-        """Add weekly commute hours for a service."""
-        nonlocal total
-        hours = visits_per_week * (2.0 * minutes_one_way) / 60.0
-        out[f"hrs_{key}"] = hours
-        total += hours
-
     # Supermarkets (user-specified frequency)
-    mins_super = blend_minutes(
-        ACC_COLUMNS["supermarket"]["coche"],
-        ACC_COLUMNS["supermarket"]["TransportePublico"],
-    )
-    add_hours("supermarket", mins_super, freq_supermarket)
+    visits: Dict[str, Tuple[str, float]] = {"supermarket": ("supermarket", freq_supermarket)}
 
     # Gas stations (scale with car usage: ~0.5 visits/week for frequent drivers)
     if freq_car > 0:
-        mins_gas = df[ACC_COLUMNS["gas"]["coche"]].astype(float)
-        gas_visits_per_week = min(freq_car / 10.0, 1.0)  # Scale with car use
-        add_hours("gas", mins_gas, gas_visits_per_week)
+        visits["gas"] = ("gas", min(freq_car / 10.0, 1.0))
 
     # Sports facilities (user-specified frequency)
     if freq_sport > 0:
-        mins_sport = blend_minutes(
-            ACC_COLUMNS["sport"]["coche"],
-            ACC_COLUMNS["sport"]["TransportePublico"],
-        )
-        add_hours("sport", mins_sport, freq_sport)
+        visits["sport"] = ("sport", freq_sport)
 
     # Healthcare: split frequency between GP (20%) and Pharmacy (80%)
     if freq_hospital > 0:
-        mins_gp = blend_minutes(
-            ACC_COLUMNS["gp"]["coche"],
-            ACC_COLUMNS["gp"]["TransportePublico"],
-        )
-        add_hours("gp", mins_gp, freq_hospital * 0.2)
-
-        mins_pharm = blend_minutes(
-            ACC_COLUMNS["pharmacy"]["coche"],
-            ACC_COLUMNS["pharmacy"]["TransportePublico"],
-        )
-        add_hours("pharmacy", mins_pharm, freq_hospital * 0.8)
-
-    # Education (5 visits/week for school-age children on weekdays)
+        visits["gp"] = ("gp", freq_hospital * 0.2)
+        visits["pharmacy"] = ("pharmacy", freq_hospital * 0.8)
+
+    # Education (5 visits/week for school-age children on weekdays, split evenly across levels)
     if edu_has_kids and edu_variant in ("public", "pubpriv") and edu_levels:
-        per_level = 1.0 / len(edu_levels)
+        per_level = 5.0 / len(edu_levels)
+        for level in edu_levels:
+            visits[f"edu_{level.lower()}"] = (edu_level_to_key(level, edu_variant), per_level)
+
+    return visits
+
+
+def weekly_hours(
+    tensor: Dict[str, Any], freq_car: float, visits: Dict[str, Tuple[str, float]]
+) -> np.ndarray:
+    """Weekly round-trip hours per municipality and breakdown column.
+
+    Args:
+        tensor: Output of accessibility_tensor
+        freq_car: Car usage frequency (days per week), the weight of car times
+        visits: Output of profile_visits
+
+    Returns:
+        Array shaped (municipalities, len(visits)) in visits order
+    """
+    index = {key: i for i, key in enumerate(tensor["services"])}
+    # Only services the profile visits, so unused columns never reach the product
+    used = list(dict.fromkeys(index[service] for service, _ in visits.values()))
+
+    w_car = freq_car / 7.0  # Convert days per week to proportion
+    mode_weights = np.array([w_car, 1.0 - w_car])
+
+    # Hours per one-way minute of each service, per breakdown column
+    trips = np.zeros((len(used), len(visits)))
+    for j, (service, per_week) in enumerate(visits.values()):
+        trips[used.index(index[service]), j] = 2.0 * per_week / 60.0
+
+    blended = tensor["minutes"][:, used, :] @ mode_weights
+    return blended @ trips
+
+
+def household_members(
+    freq_car: float,
+    freq_supermarket: float,
+    freq_sport: float,
+    freq_hospital: float,
+    edu_variant: Optional[Literal["public", "pubpriv"]],
+    edu_levels: List[str],
+    other_adults: List[Dict[str, float]],
+    max_hours: Optional[float] = None,
+) -> List[Dict[str, Any]]:
+    """Members of a household built from questionnaire answers.
+
+    The respondent does the household shopping; every other adult travels
+    for their own sport and health visits. Each selected school stage is a
+    child with 5 school trips per week, driven with the respondent's car
+    usage.
+
+    Args:
+        freq_car ... freq_hospital: Respondent's answers, as in profile_visits
+        edu_variant: School type ('public' or 'pubpriv'), None without kids
+        edu_levels: One child per stage
+        other_adults: Dictionaries with freq_car, freq_sport and freq_hospital
+        max_hours: Weekly limit applied to every member, or None
+
+    Returns:
+        Members as expected by compute_household_hours
+    """
+    members = [{
+        "label": "Tú",
+        "freq_car": freq_car,
+        "visits": profile_visits(freq_car, freq_supermarket, freq_sport, freq_hospital, False, None, []),
+        "max_hours": max_hours,
+    }]
+    for i, adult in enumerate(other_adults, start=2):
+        visits = profile_visits(adult["freq_car"], 0.0, adult["freq_sport"], adult["freq_hospital"], False, None, [])
+        members.append({
+            "label": f"Adulto {i}",
+            "freq_car": adult["freq_car"],
+            "visits": {key: visit for key, visit in visits.items() if visit[1] > 0},
+            "max_hours": max_hours,
+        })
+    if edu_variant in ("public", "pubpriv"):
         for level in edu_levels:
-            svc_key = edu_level_to_key(level, edu_variant)
-            cols = ACC_COLUMNS[svc_key]
-            mins = blend_minutes(cols["coche"], cols["TransportePublico"])
-            add_hours(
-                f"edu_{level.lower()}",
-                mins,
-                5.0 * per_level,  # 5 school days per week, split evenly across levels
-            )
+            members.append({
+                "label": f"Hij@ ({level})",
+                "freq_car": freq_car,
+                "visits": {f"edu_{level.lower()}": (edu_level_to_key(level, edu_variant), 5.0)},
+                "max_hours": max_hours,
+            })
+    return members
+
+
+def household_hours(tensor: Dict[str, Any], members: List[Dict[str, Any]]) -> Tuple[List[str], np.ndarray]:
+    """Weekly round-trip hours of every household member in one batched pass.
+
+    Each member blends car and public transport with their own car usage.
+    The blend is one contraction over modes and the visit weighting one
+    batched matrix product per member, so adding members adds rows to the
+    same two operations instead of separate passes.
+
+    Args:
+        tensor: Output of accessibility_tensor
+        members: Household members, see compute_household_hours
+
+    Returns:
+        Tuple of (breakdown keys, array shaped (members, municipalities,
+        keys)); keys a member does not visit are zero
+    """
+    index = {key: i for i, key in enumerate(tensor["services"])}
+    keys = list(dict.fromkeys(key for member in members for key in member["visits"]))
+    used = list(dict.fromkeys(index[service] for member in members for service, _ in member["visits"].values()))
+
+    # Mode weights (members × modes) and hours per one-way minute (members × services × keys)
+    w_car = np.array([member["freq_car"] / 7.0 for member in members])
+    mode_weights = np.stack([w_car, 1.0 - w_car], axis=1)
+    trips = np.zeros((len(members), len(used), len(keys)))
+    for m, member in enumerate(members):
+        for key, (service, per_week) in member["visits"].items():
+            trips[m, used.index(index[service]), keys.index(key)] = 2.0 * per_week / 60.0
+
+    blended = np.einsum("nsk,mk->mns", tensor["minutes"][:, used, :], mode_weights)
+    return keys, np.matmul(blended, trips)
+
+
+@st.cache_resource(max_entries=CACHED_PROFILES)
+def compute_household_hours(
+    _df: pd.DataFrame,
+    dataset_key: str,
+    members: List[Dict[str, Any]],
+    aggregation: Literal["sum", "max"] = "sum",
+) -> pd.DataFrame:
+    """Compute weekly accessibility hours for a whole household.
+
+    Args:
+        _df: Municipality dataset identified by dataset_key (not hashed)
+        dataset_key: Identifier of _df, see core.data_loader.dataset_key
+        members: One dictionary per person with "label", "freq_car" (days
+            per week), "visits" ({breakdown key: (service key, visits per
+            week)}, as returned by profile_visits) and "max_hours" (weekly
+            limit for that person, or None)
+        aggregation: "sum" adds everyone's hours; "max" keeps the busiest
+            member's
+
+    Returns:
+        DataFrame indexed like _df with AccessibilityHoursWeekly (the
+        aggregate), hrs_{key} summed over members, mhrs_{m}_{key} and
+        mhrs_{m}_total per member (m is the position in members), and
+        WithinMemberLimits, False where anyone exceeds their max_hours.
+        The result is shared between sessions and must not be modified.
+    """
+    keys, hours = household_hours(accessibility_tensor(_df), members)
+    member_totals = hours.sum(axis=2).T
+    total, within_limits = household_totals(member_totals, members, aggregation)
+
+    # One matrix for every numeric column: household breakdown, then each
+    # member's breakdown and total, then the aggregate
+    blocks = [hours.sum(axis=0)]
+    columns = [f"hrs_{key}" for key in keys]
+    for m in range(len(members)):
+        blocks.extend([hours[m], member_totals[:, m:m + 1]])
+        columns.extend([f"{MEMBER_PREFIX}{m}_{key}" for key in keys] + [f"{MEMBER_PREFIX}{m}_total"])
+    blocks.append(total[:, None])
+    columns.append("AccessibilityHoursWeekly")
+    out = pd.DataFrame(np.hstack(blocks), index=_df.index, columns=columns)
+
+    out.insert(0, "codigo", _df["codigo"])
+    out.insert(1, "Nombre", _df["Nombre"])
+    out["WithinMemberLimits"] = within_limits
+    return out
+
+
+def household_totals(
+    member_totals: np.ndarray, members: List[Dict[str, Any]], aggregation: Literal["sum", "max"]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Aggregate member hours and check their limits.
+
+    Args:
+        member_totals: Weekly hours shaped (municipalities, members)
+        members: As in compute_household_hours
+        aggregation: "sum" or "max"
+
+    Returns:
+        Tuple of (household hours, whether every member is within max_hours)
+    """
+    total = member_totals.max(axis=1) if aggregation == "max" else member_totals.sum(axis=1)
+    limits = np.array([member["max_hours"] or np.inf for member in members])
+    return total, (member_totals <= limits).all(axis=1)
+
+
+def add_commute_hours(
+    acc_df: pd.DataFrame, hours: np.ndarray, household: Optional[Dict[str, Any]] = None
+) -> pd.DataFrame:
+    """Add the respondent's commute to accessibility results.
+
+    Args:
+        acc_df: Output of compute_accessibility_hours, lookup_accessibility_hours
+            or compute_household_hours (not modified)
+        hours: Weekly commute hours aligned with acc_df (core.commute.commute_hours)
+        household: prefs["household"] when acc_df is a household result; the
+            commute is the first member's and the aggregate and limits are
+            re-evaluated
+
+    Returns:
+        New DataFrame with an hrs_commute breakdown column
+    """
+    out = acc_df.copy()
+    out["hrs_commute"] = hours
+    if household is None:
+        out["AccessibilityHoursWeekly"] += hours
+        return out
 
+    members = household["members"]
+    out[f"{MEMBER_PREFIX}0_commute"] = hours
+    out[f"{MEMBER_PREFIX}0_total"] += hours
+    member_totals = out[[f"{MEMBER_PREFIX}{m}_total" for m in range(len(members))]].to_numpy()
+    total, within_limits = household_totals(member_totals, members, household["aggregation"])
     out["AccessibilityHoursWeekly"] = total
+    out["WithinMemberLimits"] = within_limits
     return out
+
+
+@st.cache_resource(max_entries=CACHED_PROFILES)
+def compute_accessibility_hours(
+    _df: pd.DataFrame,
+    dataset_key: str,
+    freq_car: float,
+    freq_supermarket: float,
+    freq_sport: float,
+    freq_hospital: float,
+    edu_has_kids: bool,
+    edu_variant: Optional[Literal["public", "pubpriv"]],
+    edu_levels: Tuple[str, ...],
+) -> pd.DataFrame:
+    """Compute weekly accessibility hours per municipality.
+
+    Aggregates round-trip travel time across essential services based on
+    user-specified visit frequencies.
+
+    The cache is keyed on dataset_key and the travel profile only; the
+    dataset itself is not hashed. Pass the whole loaded dataset and slice
+    the result by any filter, so filter changes reuse the cached entry.
+
+    Args:
+        _df: Municipality dataset identified by dataset_key (not hashed)
+        dataset_key: Identifier of _df, see core.data_loader.dataset_key
+        freq_car: Car usage frequency (days per week) for mode choice weighting
+        freq_supermarket: Supermarket visit frequency (times per week)
+        freq_sport: Sports facility visit frequency (times per week)
+        freq_hospital: Hospital/health center visit frequency (times per week)
+        edu_has_kids: Whether to include education travel
+        edu_variant: School type ('public' or 'pubpriv')
+        edu_levels: Education stages to include
+
+    Returns:
+        DataFrame with AccessibilityHoursWeekly column (actually weekly hours)
+        and one hrs_{key} column per service visited, indexed like _df.
+        The result is shared between sessions and must not be modified.
+    """
+    visits = profile_visits(
+        freq_car, freq_supermarket, freq_sport, freq_hospital, edu_has_kids, edu_variant, list(edu_levels)
+    )
+    hours = weekly_hours(accessibility_tensor(_df), freq_car, visits)
+
+    out = pd.DataFrame(hours, index=_df.index, columns=[f"hrs_{key}" for key in visits])
+    out.insert(0, "codigo", _df["codigo"])
+    out.insert(1, "Nombre", _df["Nombre"])
+    out["AccessibilityHoursWeekly"] = hours.sum(axis=1)
+    return out
+
+
+def profile_key(
+    freq_car: float,
+    freq_supermarket: float,
+    freq_sport: float,
+    freq_hospital: float,
+    edu_has_kids: bool,
+    edu_variant: Optional[Literal["public", "pubpriv"]],
+    edu_levels: Iterable[str],
+) -> str:
+    """Canonical key of a travel profile in the precomputed tensor.
+
+    Profiles with the same hours share a key: education levels are ordered
+    as in EDU_LEVEL_OPTIONS, and answers without education travel (no kids,
+    or no levels selected) drop the school type.
+
+    Returns:
+        JSON string
+    """
+    levels = [level for level in EDU_LEVEL_OPTIONS if level in set(edu_levels)]
+    if not (edu_has_kids and edu_variant in ("public", "pubpriv")):
+        levels = []
+    variant = edu_variant if levels else None
+    return json.dumps([freq_car, freq_supermarket, freq_sport, freq_hospital, variant, levels])
+
+
+def questionnaire_profiles() -> Iterator[Tuple[Any, ...]]:
+    """Every distinct travel profile the questionnaire can produce.
+
+    Yields:
+        profile_visits arguments (freq_car, freq_supermarket, freq_sport,
+        freq_hospital, edu_has_kids, edu_variant, edu_levels)
+    """
+    subsets = [
+        list(levels)
+        for size in range(1, len(EDU_LEVEL_OPTIONS) + 1)
+        for levels in itertools.combinations(EDU_LEVEL_OPTIONS, size)
+    ]
+    education = [(False, None, [])] + [(True, variant, levels) for variant in ("public", "pubpriv") for levels in subsets]
+    frequencies = itertools.product(
+        dict.fromkeys(CAR_FREQ_TO_WCAR.values()),
+        dict.fromkeys(SUPERMARKET_FREQ_TO_W.values()),
+        dict.fromkeys(SPORT_FREQ_TO_W.values()),
+        dict.fromkeys(HOSPITAL_USE_TO_W.values()),
+    )
+    for freqs, edu in itertools.product(frequencies, education):
+        yield freqs + edu
+
+
+def profile_tensor_dir(csv_path: Path, data_version: str) -> Path:
+    """Directory of a partition's precomputed accessibility tensor.
+
+    Args:
+        csv_path: Dataset partition
+        data_version: core.dataset.dataset_version of the partition
+    """
+    return ACCESSIBILITY_DIR / f"{csv_path.stem}-{data_version}"
+
+
+def write_profile_tensor(df: pd.DataFrame, out_dir: Path, dataset_version: str) -> int:
+    """Evaluate every questionnaire profile and store the results.
+
+    Writes PROFILE_TENSOR, a float32 array shaped (profiles,
+    municipalities, len(PROFILE_SLOTS) + 1) with zeros for services a
+    profile does not visit, and PROFILE_META with the profile → offset
+    index and the municipality codes in row order. The directory is
+    written under a temporary name and renamed when complete.
+
+    Args:
+        df: Municipality dataset (one partition, in load order)
+        out_dir: Output directory
+        dataset_version: Version of df, checked when the tensor is attached
+
+    Returns:
+        Number of profiles
+    """
+    tensor = accessibility_tensor(df)
+    profiles = list(questionnaire_profiles())
+
+    tmp_dir = out_dir.with_name(f".{out_dir.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    shape = (len(profiles), len(df), len(PROFILE_SLOTS) + 1)
+    hours = np.lib.format.open_memmap(tmp_dir / PROFILE_TENSOR, mode="w+", dtype=np.float32, shape=shape)
+    for offset, profile in enumerate(profiles):
+        visits = profile_visits(*profile)
+        values = weekly_hours(tensor, profile[0], visits)
+        block = np.zeros(shape[1:], dtype=np.float32)
+        block[:, [PROFILE_SLOTS.index(key) for key in visits]] = values
+        block[:, -1] = values.sum(axis=1)
+        hours[offset] = block
+    hours.flush()
+    del hours
+
+    meta = {
+        "version": PROFILE_TENSOR_VERSION,
+        "dataset": dataset_version,
+        "slots": PROFILE_SLOTS,
+        "codes": df["codigo"].astype(int).tolist(),
+        "profiles": {profile_key(*profile): offset for offset, profile in enumerate(profiles)},
+    }
+    with open(tmp_dir / PROFILE_META, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    tmp_dir.rename(out_dir)
+    return len(profiles)
+
+
+def attach_profile_tensor(out_dir: Path, dataset_version: str) -> Optional[Dict[str, Any]]:
+    """Memory-map a precomputed tensor, if one matches the dataset.
+
+    Args:
+        out_dir: Directory written by write_profile_tensor
+        dataset_version: Version of the dataset being displayed
+
+    Returns:
+        Dictionary with "hours" (read-only memmap), "codes" and "profiles",
+        or None if the tensor is missing, outdated or for other data
+    """
+    try:
+        with open(out_dir / PROFILE_META, encoding="utf-8") as f:
+            meta = json.load(f)
+        hours = np.load(out_dir / PROFILE_TENSOR, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if (
+        meta.get("version") != PROFILE_TENSOR_VERSION
+        or meta.get("dataset") != dataset_version
+        or meta.get("slots") != PROFILE_SLOTS
+    ):
+        return None
+    return {"hours": hours, "codes": np.asarray(meta["codes"]), "profiles": meta["profiles"]}
+
+
+def lookup_accessibility_hours(
+    store: Dict[str, Any],
+    df: pd.DataFrame,
+    freq_car: float,
+    freq_supermarket: float,
+    freq_sport: float,
+    freq_hospital: float,
+    edu_has_kids: bool,
+    edu_variant: Optional[Literal["public", "pubpriv"]],
+    edu_levels: Tuple[str, ...],
+) -> Optional[pd.DataFrame]:
+    """Read a profile's hours from a precomputed tensor.
+
+    Columns are views of the memory map, so nothing is computed or copied.
+
+    Args:
+        store: Output of attach_profile_tensor
+        df: Municipality dataset; must have the tensor's rows, in order
+        freq_car ... edu_levels: Travel profile, as in compute_accessibility_hours
+
+    Returns:
+        Same columns as compute_accessibility_hours, or None if the profile
+        or the dataset rows are not covered by the tensor
+    """
+    offset = store["profiles"].get(
+        profile_key(freq_car, freq_supermarket, freq_sport, freq_hospital, edu_has_kids, edu_variant, edu_levels)
+    )
+    if offset is None or not np.array_equal(store["codes"], df.index.to_numpy()):
+        return None
+
+    block = store["hours"][offset]
+    visits = profile_visits(
+        freq_car, freq_supermarket, freq_sport, freq_hospital, edu_has_kids, edu_variant, list(edu_levels)
+    )
+    columns: Dict[str, Any] = {"codigo": df["codigo"], "Nombre": df["Nombre"]}
+    columns.update({f"hrs_{key}": block[:, PROFILE_SLOTS.index(key)] for key in visits})
+    columns["AccessibilityHoursWeekly"] = block[:, -1]
+    return pd.DataFrame(columns, index=df.index, copy=False)
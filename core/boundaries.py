@@ -0,0 +1,350 @@
+# core/boundaries.py
+"""Municipal boundaries: pre-filtered artifact, shapefile fallback and
+simplified map geometries, for Madrid or (sharded by province) all of Spain."""
+
+import json
+import math
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+# NUTS-2 code of the Comunidad de Madrid in the INSPIRE dataset
+MADRID_NUT2: str = "ES30"
+
+# Shapefile attributes the app actually needs (geometry is always read)
+BOUNDARY_COLUMNS: List[str] = ["NATCODE", "NAMEUNIT"]
+
+# Projected CRS used for metric simplification tolerances (UTM 30N)
+METRIC_CRS: str = "EPSG:25830"
+
+# Simplification tolerance in metres for each map level of detail
+GEOMETRY_LEVELS: Dict[str, float] = {
+    "high": 20.0,
+    "medium": 100.0,
+    "low": 500.0,
+}
+
+# Minimum map zoom at which each level is used, most detailed first
+GEOMETRY_LEVEL_MIN_ZOOM: Dict[str, float] = {
+    "high": 10.0,
+    "medium": 8.0,
+    "low": 0.0,
+}
+
+# Municipality centroid coordinates (WGS84) added to the dataset
+CENTROID_COLUMNS: List[str] = ["centroid_lon", "centroid_lat"]
+
+# Decimal degrees kept in WGS84 coordinates (1e-5 deg ≈ 1 m)
+COORD_GRID_SIZE: float = 1e-5
+
+
+def read_boundaries_shapefile(shp_path: Path, nut2: Optional[str] = MADRID_NUT2) -> gpd.GeoDataFrame:
+    """Read the municipalities of one NUTS-2 region from the national shapefile.
+
+    The attribute filter and column projection are pushed down to the OGR
+    driver, so rows from other regions are never materialized.
+
+    Args:
+        shp_path: Path to the INSPIRE peninsular shapefile
+        nut2: NUTS-2 code to keep, or None for every municipality
+
+    Returns:
+        GeoDataFrame with BOUNDARY_COLUMNS and geometry
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if nut2 is None:
+            return gpd.read_file(shp_path, columns=BOUNDARY_COLUMNS)
+        # The filtered attribute must be part of the projection for OGR to apply it
+        gdf = gpd.read_file(
+            shp_path,
+            columns=BOUNDARY_COLUMNS + ["CODNUT2"],
+            where=f"CODNUT2 = '{nut2}'",
+        )
+    return gdf.drop(columns="CODNUT2")
+
+
+def read_madrid_shapefile(shp_path: Path) -> gpd.GeoDataFrame:
+    """Read only Madrid municipalities from the national shapefile."""
+    return read_boundaries_shapefile(shp_path, MADRID_NUT2)
+
+
+def artifact_is_fresh(artifact_path: Path, shp_path: Path) -> bool:
+    """Check whether the boundary artifact exists and is newer than its source.
+
+    Args:
+        artifact_path: Path to the pre-filtered boundary file
+        shp_path: Path to the source shapefile
+
+    Returns:
+        True if the artifact can be used as-is
+    """
+    if not artifact_path.exists():
+        return False
+    if not shp_path.exists():
+        # Deployments may ship the artifact without the national shapefile
+        return True
+    artifact_mtime = artifact_path.stat().st_mtime
+    sources = [shp_path.with_suffix(ext) for ext in (".shp", ".dbf")]
+    return all(artifact_mtime >= src.stat().st_mtime for src in sources if src.exists())
+
+
+def write_boundary_artifact(
+    shp_path: Path, artifact_path: Path, nut2: Optional[str] = MADRID_NUT2
+) -> gpd.GeoDataFrame:
+    """Build the region-filtered, column-pruned GeoParquet boundary file.
+
+    Args:
+        shp_path: Path to the source shapefile
+        artifact_path: Destination GeoParquet path
+        nut2: NUTS-2 code to keep, or None for the national file
+
+    Returns:
+        The GeoDataFrame that was written
+    """
+    gdf = read_boundaries_shapefile(shp_path, nut2)
+    artifact_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = artifact_path.with_suffix(".tmp")
+    gdf.to_parquet(tmp_path, index=False)
+    tmp_path.replace(artifact_path)
+    return gdf
+
+
+def load_boundaries(artifact_path: Path, shp_path: Path, nut2: Optional[str] = MADRID_NUT2) -> gpd.GeoDataFrame:
+    """Load boundaries, preferring the pre-built artifact.
+
+    Falls back to a filtered shapefile read when the artifact is missing,
+    stale, or cannot be read (e.g. pyarrow not installed).
+
+    Args:
+        artifact_path: Path to the pre-filtered boundary file
+        shp_path: Path to the source shapefile
+        nut2: NUTS-2 code the artifact was built for (None for national)
+
+    Returns:
+        GeoDataFrame with BOUNDARY_COLUMNS and geometry
+    """
+    if artifact_is_fresh(artifact_path, shp_path):
+        try:
+            return gpd.read_parquet(artifact_path)
+        except (ImportError, ValueError, OSError):
+            pass
+    return read_boundaries_shapefile(shp_path, nut2)
+
+
+def load_madrid_boundaries(artifact_path: Path, shp_path: Path) -> gpd.GeoDataFrame:
+    """Load Madrid boundaries, preferring the pre-built artifact."""
+    return load_boundaries(artifact_path, shp_path, MADRID_NUT2)
+
+
+def municipality_codes(gdf: gpd.GeoDataFrame) -> pd.Series:
+    """Extract INE municipality codes from the INSPIRE NATCODE.
+
+    NATCODE concatenates country (34), autonomous community, province and the
+    5-digit INE municipality code, e.g. 34132828001 → 28001.
+
+    Args:
+        gdf: Boundaries with a NATCODE column
+
+    Returns:
+        Integer INE codes aligned with gdf
+    """
+    return gdf["NATCODE"].astype(str).str[-5:].astype(int)
+
+
+def province_codes(gdf: gpd.GeoDataFrame) -> pd.Series:
+    """Extract 2-digit province codes from the INSPIRE NATCODE.
+
+    Args:
+        gdf: Boundaries with a NATCODE column
+
+    Returns:
+        Province codes as strings (e.g. "28")
+    """
+    return gdf["NATCODE"].astype(str).str[-5:-3]
+
+
+def municipality_centroids(gdf: gpd.GeoDataFrame) -> pd.DataFrame:
+    """WGS84 centroids of each municipality, computed in the metric CRS.
+
+    Args:
+        gdf: Boundaries indexed by INE code
+
+    Returns:
+        float32 CENTROID_COLUMNS indexed like gdf
+    """
+    centroids = gdf.geometry.to_crs(METRIC_CRS).centroid.to_crs("EPSG:4326")
+    return pd.DataFrame(
+        {CENTROID_COLUMNS[0]: centroids.x.to_numpy(np.float32), CENTROID_COLUMNS[1]: centroids.y.to_numpy(np.float32)},
+        index=gdf.index,
+    )
+
+
+def _simplify_shard(task: Tuple[np.ndarray, float]) -> np.ndarray:
+    """Simplify one shard of metric geometries and quantize them in WGS84.
+
+    Runs in a worker process, so geometries travel as WKB.
+
+    Args:
+        task: (WKB array in METRIC_CRS, tolerance in metres)
+
+    Returns:
+        WKB array of simplified, quantized EPSG:4326 geometries
+    """
+    wkb, tolerance = task
+    geoms = shapely.from_wkb(wkb)
+    try:
+        # Simplifies shared edges once, so neighbours stay gap-free
+        simplified = shapely.coverage_simplify(geoms, tolerance)
+    except (AttributeError, shapely.errors.GEOSException):
+        simplified = shapely.simplify(geoms, tolerance, preserve_topology=True)
+    wgs84 = gpd.GeoSeries(simplified, crs=METRIC_CRS).to_crs(epsg=4326).values
+    quantized = shapely.set_precision(np.asarray(wgs84), COORD_GRID_SIZE)
+    return shapely.to_wkb(quantized)
+
+
+def build_geometry_levels(
+    gdf: gpd.GeoDataFrame,
+    levels: Optional[Dict[str, float]] = None,
+    workers: Optional[int] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Build simplified, WGS84 GeoJSON feature collections per level of detail.
+
+    Work is sharded by province × level and spread over a process pool, so
+    the same stage handles the national boundary set.
+
+    Args:
+        gdf: Boundaries with NATCODE and geometry
+        levels: Mapping {level: tolerance in metres}, defaults to GEOMETRY_LEVELS
+        workers: Process pool size (1 runs in-process)
+
+    Returns:
+        Mapping {level: FeatureCollection} with features keyed by INE code
+    """
+    levels = levels or GEOMETRY_LEVELS
+    metric = gdf.to_crs(METRIC_CRS)
+    codes = municipality_codes(metric).to_numpy()
+    provinces = province_codes(metric).to_numpy()
+    wkb = shapely.to_wkb(metric.geometry.values)
+
+    shards = [np.flatnonzero(provinces == prov) for prov in np.unique(provinces)]
+    tasks = [(level, idx, (wkb[idx], tol)) for level, tol in levels.items() for idx in shards]
+
+    if workers == 1 or len(tasks) == 1:
+        results = [_simplify_shard(task) for _, _, task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simplify_shard, [task for _, _, task in tasks]))
+
+    collections: Dict[str, Dict[str, Any]] = {
+        level: {"type": "FeatureCollection", "features": []} for level in levels
+    }
+    for (level, idx, _), shard_wkb in zip(tasks, results):
+        geoms = shapely.from_wkb(shard_wkb)
+        bounds = shapely.bounds(geoms)
+        for code, geom, bbox in zip(codes[idx], geoms, bounds):
+            if geom is None or geom.is_empty:
+                continue
+            collections[level]["features"].append({
+                "type": "Feature",
+                "id": int(code),
+                "bbox": [round(float(v), 5) for v in bbox],
+                "properties": {},
+                "geometry": json.loads(shapely.to_geojson(geom)),
+            })
+    return collections
+
+
+def geometry_level_path(out_dir: Path, level: str) -> Path:
+    """Path of the GeoJSON file for one level of detail."""
+    return out_dir / f"geometries_{level}.geojson"
+
+
+def geometry_shard_path(out_dir: Path, level: str, province: int) -> Path:
+    """Path of the GeoJSON file for one province at one level of detail."""
+    return out_dir / f"geometries_{level}_{province:02d}.geojson"
+
+
+def write_geometry_shards(collections: Dict[str, Dict[str, Any]], out_dir: Path) -> Dict[int, int]:
+    """Split each level into one compact GeoJSON file per province.
+
+    Args:
+        collections: Output of build_geometry_levels
+        out_dir: Destination directory
+
+    Returns:
+        Mapping {province: number of features at the first level}
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    counts: Dict[int, int] = {}
+    for i, (level, collection) in enumerate(collections.items()):
+        shards: Dict[int, List[Dict[str, Any]]] = {}
+        for feature in collection["features"]:
+            shards.setdefault(feature["id"] // 1000, []).append(feature)
+        for province, features in shards.items():
+            path = geometry_shard_path(out_dir, level, province)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"type": "FeatureCollection", "features": features}, f, separators=(",", ":"))
+            tmp_path.replace(path)
+            if i == 0:
+                counts[province] = len(features)
+    return counts
+
+
+def write_geometry_levels(collections: Dict[str, Dict[str, Any]], out_dir: Path) -> None:
+    """Write compact GeoJSON files for each level of detail.
+
+    Args:
+        collections: Output of build_geometry_levels
+        out_dir: Destination directory
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for level, collection in collections.items():
+        path = geometry_level_path(out_dir, level)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(collection, f, separators=(",", ":"))
+        tmp_path.replace(path)
+
+
+def pick_geometry_level(zoom: float) -> str:
+    """Choose the coarsest level of detail that looks right at a zoom.
+
+    Args:
+        zoom: Web-mercator zoom level
+
+    Returns:
+        Level name from GEOMETRY_LEVELS
+    """
+    for level, min_zoom in GEOMETRY_LEVEL_MIN_ZOOM.items():
+        if zoom >= min_zoom:
+            return level
+    return "low"
+
+
+def view_for_bounds(
+    bounds: Tuple[float, float, float, float],
+    viewport_px: int = 600,
+) -> Tuple[Dict[str, float], float]:
+    """Compute map center and zoom that fit a lon/lat bounding box.
+
+    Args:
+        bounds: (min_lon, min_lat, max_lon, max_lat)
+        viewport_px: Smallest viewport side in pixels
+
+    Returns:
+        Tuple of ({"lat", "lon"} center, zoom)
+    """
+    min_lon, min_lat, max_lon, max_lat = bounds
+    center = {"lat": (min_lat + max_lat) / 2.0, "lon": (min_lon + max_lon) / 2.0}
+    lat_span = (max_lat - min_lat) / max(math.cos(math.radians(center["lat"])), 1e-6)
+    span = max(max_lon - min_lon, lat_span, 1e-3)
+    zoom = math.log2(360.0 * viewport_px / (256.0 * span)) - 0.5
+    return center, float(min(max(zoom, 4.0), 12.0))
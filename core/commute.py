@@ -0,0 +1,213 @@
+# core/commute.py
+"""Daily commute to a workplace from every municipality.
+
+scripts/build_commute.py routes between all municipality centroids over the
+local road graph (core/routing.py) and stores the home → workplace minutes
+as a uint16 matrix (modes × workplaces × homes), UNREACHABLE beyond
+COMMUTE_MAX_MINUTES. The app memory-maps it and reads the single row of the
+chosen workplace. Without the matrix, or for workplaces given as
+coordinates, the row is estimated on demand from haversine distances.
+"""
+
+import json
+import math
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from config.constants import TRAVEL_MODES
+from core.boundaries import CENTROID_COLUMNS
+from core.routing import build_grid_index, load_graphs, nearest_points, project, reverse_graph, run_searches
+
+# Bump when the matrix layout or meaning changes
+COMMUTE_MATRIX_VERSION: int = 1
+
+COMMUTE_MATRIX: str = "minutes.npy"
+COMMUTE_META: str = "commute.json"
+
+# Matrix value of pairs farther than the routing radius
+UNREACHABLE: int = np.iinfo(np.uint16).max
+
+# Routing radius of the matrix; longer commutes fall back to the estimate
+COMMUTE_MAX_MINUTES: float = 180.0
+
+# Haversine estimate: road distance over straight-line distance, and
+# door-to-door average speed of each travel mode
+DETOUR_FACTOR: float = 1.3
+COMMUTE_SPEED_KMH: Dict[str, float] = {"coche": 60.0, "TransportePublico": 30.0}
+
+EARTH_RADIUS_KM: float = 6371.0
+
+
+def haversine_km(lon: np.ndarray, lat: np.ndarray, lon0: float, lat0: float) -> np.ndarray:
+    """Great-circle distance from one point to many, in kilometres."""
+    lon, lat = np.radians(lon), np.radians(lat)
+    lon0, lat0 = math.radians(lon0), math.radians(lat0)
+    a = np.sin((lat - lat0) / 2) ** 2 + math.cos(lat0) * np.cos(lat) * np.sin((lon - lon0) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def workplace_distance_km(df: pd.DataFrame, workplace: Dict[str, Any]) -> np.ndarray:
+    """Straight-line kilometres from each municipality centroid to the workplace.
+
+    Args:
+        df: Municipality dataset with centroid columns
+        workplace: Dictionary with "lon" and "lat"
+
+    Returns:
+        Distances aligned with df (NaN without a centroid)
+    """
+    lon, lat = (df[c].to_numpy(np.float64) for c in CENTROID_COLUMNS)
+    return haversine_km(lon, lat, workplace["lon"], workplace["lat"])
+
+
+def estimate_minutes(distance_km: np.ndarray) -> np.ndarray:
+    """One-way minutes by each travel mode for straight-line distances.
+
+    Returns:
+        Array shaped (len(distance_km), len(TRAVEL_MODES))
+    """
+    speeds = np.array([COMMUTE_SPEED_KMH[mode] for mode in TRAVEL_MODES])
+    return (np.asarray(distance_km)[:, None] * DETOUR_FACTOR / speeds * 60.0).astype(np.float32)
+
+
+def write_commute_matrix(
+    nodes_path: Path,
+    edges_path: Path,
+    centroids: pd.DataFrame,
+    out_dir: Path,
+    max_minutes: float = COMMUTE_MAX_MINUTES,
+    workers: Optional[int] = None,
+) -> int:
+    """Route from every municipality to every other and store the minutes.
+
+    One search per workplace on the reversed graph gives the time from all
+    homes to it, stopping at max_minutes. The directory is written under a
+    temporary name and renamed when complete.
+
+    Args:
+        nodes_path, edges_path: Road graph, see core.routing.load_graphs
+        centroids: Municipality centroids (CENTROID_COLUMNS) indexed by INE code
+        out_dir: Output directory
+        max_minutes: Routing radius
+        workers: Process pool size
+
+    Returns:
+        Number of municipalities
+    """
+    coords, graphs = load_graphs(nodes_path, edges_path)
+    origins = project(*(centroids[c] for c in CENTROID_COLUMNS))
+    nodes, _ = nearest_points(build_grid_index(coords, queries=origins), origins)
+    targets, home_target = np.unique(nodes, return_inverse=True)
+    targets = targets.tolist()
+    target_pos = {node: i for i, node in enumerate(targets)}
+
+    tmp_dir = out_dir.with_name(f".{out_dir.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    shape = (len(TRAVEL_MODES), len(centroids), len(centroids))
+    minutes = np.lib.format.open_memmap(tmp_dir / COMMUTE_MATRIX, mode="w+", dtype=np.uint16, shape=shape)
+    minutes[:] = UNREACHABLE
+    reversed_graphs = {mode: reverse_graph(graph) for mode, graph in graphs.items()}
+    for m, mode in enumerate(TRAVEL_MODES):
+        if mode not in reversed_graphs:
+            continue
+        # Municipalities snapped to the same node share one search
+        tasks = [(mode, [node], targets, max_minutes) for node in targets]
+        for t, times in enumerate(run_searches(reversed_graphs, tasks, workers)):
+            row = np.full(len(targets), UNREACHABLE, dtype=np.uint16)
+            row[[target_pos[h] for h in times]] = np.minimum(np.rint(list(times.values())), UNREACHABLE - 1)
+            minutes[m, home_target == t] = row[home_target]
+    minutes.flush()
+    del minutes
+
+    meta = {
+        "version": COMMUTE_MATRIX_VERSION,
+        "codes": centroids.index.astype(int).tolist(),
+        "modes": [mode for mode in TRAVEL_MODES if mode in graphs],
+        "max_minutes": max_minutes,
+    }
+    with open(tmp_dir / COMMUTE_META, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    tmp_dir.rename(out_dir)
+    return len(centroids)
+
+
+def attach_commute_matrix(out_dir: Path) -> Optional[Dict[str, Any]]:
+    """Memory-map the commute matrix, if built.
+
+    Args:
+        out_dir: Directory written by write_commute_matrix
+
+    Returns:
+        Dictionary with "minutes" (read-only memmap), "codes" and the routed
+        "modes", or None if missing or outdated
+    """
+    try:
+        with open(out_dir / COMMUTE_META, encoding="utf-8") as f:
+            meta = json.load(f)
+        minutes = np.load(out_dir / COMMUTE_MATRIX, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != COMMUTE_MATRIX_VERSION:
+        return None
+    return {"minutes": minutes, "codes": np.asarray(meta["codes"]), "modes": meta["modes"]}
+
+
+def commute_minutes(
+    store: Optional[Dict[str, Any]],
+    df: pd.DataFrame,
+    workplace: Dict[str, Any],
+) -> np.ndarray:
+    """One-way minutes from every municipality to the workplace.
+
+    Routed pairs come from the matrix row of the workplace municipality;
+    the rest (no matrix, a workplace given as coordinates, modes or pairs
+    the graph does not cover) are estimated from the straight-line distance.
+
+    Args:
+        store: Output of attach_commute_matrix, or None
+        df: Municipality dataset with centroid columns, indexed by codigo
+        workplace: Dictionary with "lon", "lat" and "code" (INE code or None)
+
+    Returns:
+        float32 array shaped (len(df), len(TRAVEL_MODES))
+    """
+    minutes = estimate_minutes(workplace_distance_km(df, workplace))
+    if store is None or workplace["code"] is None:
+        return minutes
+
+    codes = pd.Index(store["codes"])
+    w = codes.get_indexer([workplace["code"]])[0]
+    if w < 0:
+        return minutes
+    homes = codes.get_indexer(df.index.to_numpy())
+    known = homes >= 0
+    for mode in store["modes"]:
+        m = TRAVEL_MODES.index(mode)
+        row = np.asarray(store["minutes"][m, w])[homes[known]]
+        routed = row != UNREACHABLE
+        minutes[np.flatnonzero(known)[routed], m] = row[routed]
+    return minutes
+
+
+def commute_hours(minutes: np.ndarray, freq_car: float, days: float) -> np.ndarray:
+    """Weekly round-trip commute hours.
+
+    Args:
+        minutes: Output of commute_minutes
+        freq_car: Car usage frequency (days per week), the weight of car times
+        days: Days per week at the workplace
+
+    Returns:
+        Hours per municipality
+    """
+    w_car = freq_car / 7.0
+    return minutes @ np.array([w_car, 1.0 - w_car]) * 2.0 * days / 60.0
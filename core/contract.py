@@ -0,0 +1,209 @@
+# core/contract.py
+"""Data contract for merged_dataset.csv.
+
+The contract declares, for every column the app reads, its value range and
+NaN policy. scripts/build.py evaluates it over whole columns and stamps the
+result into the published snapshot (CONTRACT_REPORT); the app trusts a
+snapshot whose stamp matches the current contract and only evaluates the
+contract itself when loading an unstamped dataset.
+
+Each column rule is a dictionary with any of:
+    optional        column may be absent; checked only when present
+    nullable        NaN allowed (default False)
+    unique          values must be distinct
+    integer         values must be whole numbers
+    min / max       inclusive bounds
+    min_exclusive   strict lower bound
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config.constants import ACC_COLUMNS, BENEFIT_COLUMNS, COST_COLUMNS, DEMOGRAPHIC_COLUMNS, OPTIONAL_CRITERIA
+from core.dataset import DEMOGRAPHIC_SEXES, POPULATION_COLUMN
+
+# Bump when the meaning of a rule changes (new rule kinds, different checks)
+CONTRACT_VERSION: int = 2
+
+# Contract result written next to the dataset in each snapshot
+CONTRACT_REPORT: str = "contract.json"
+
+# One-way travel times in minutes; the longest real value is under 6 hours
+TRAVEL_MINUTES_MAX: float = 600.0
+
+# Cluster statistics are ratios to the regional mean
+CLUSTER_SCORE_MAX: float = 5.0
+
+# Optional criteria (e.g. GRV_OfertaServicios) are scaled to 0-1
+OPTIONAL_SCORE_MAX: float = 1.0
+
+# Codes reported per violation
+VIOLATION_EXAMPLES: int = 10
+
+ColumnRule = Dict[str, Any]
+
+
+def dataset_contract() -> Dict[str, ColumnRule]:
+    """Rules for every dataset column the app uses.
+
+    Returns:
+        Dictionary {column: rule}
+    """
+    contract: Dict[str, ColumnRule] = {
+        "codigo": {"unique": True, "integer": True, "min": 1},
+        "Nombre": {},
+        POPULATION_COLUMN: {"integer": True, "min_exclusive": 0},
+    }
+    for modes in ACC_COLUMNS.values():
+        for column in modes.values():
+            contract[column] = {"min": 0, "max": TRAVEL_MINUTES_MAX}
+    for crit, column in BENEFIT_COLUMNS.items():
+        if crit in OPTIONAL_CRITERIA:
+            contract[column] = {"optional": True, "min": 0, "max": OPTIONAL_SCORE_MAX}
+        else:
+            contract[column] = {"min": 0, "max": CLUSTER_SCORE_MAX}
+    for column in COST_COLUMNS.values():
+        contract[column] = {"min_exclusive": 0}
+    for total_col in DEMOGRAPHIC_COLUMNS.values():
+        for column in [total_col] + [total_col.replace("_Total", f"_{sex}") for sex in DEMOGRAPHIC_SEXES]:
+            contract[column] = {"integer": True, "min": 0}
+    return contract
+
+
+def contract_digest(contract: Optional[Dict[str, ColumnRule]] = None) -> str:
+    """Identifier of a contract, stored in snapshot stamps.
+
+    Args:
+        contract: Contract to hash (defaults to dataset_contract())
+
+    Returns:
+        16-character hex key
+    """
+    payload = {"version": CONTRACT_VERSION, "rules": contract or dataset_contract()}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _violation(df: pd.DataFrame, column: str, rule: str, mask: np.ndarray) -> Dict[str, Any]:
+    """Describe the rows of one column failing one rule."""
+    codes = df["codigo"].to_numpy()[mask] if "codigo" in df.columns else np.flatnonzero(mask)
+    return {
+        "column": column,
+        "rule": rule,
+        "rows": int(mask.sum()),
+        "examples": [str(c) for c in codes[:VIOLATION_EXAMPLES]],
+    }
+
+
+def check_contract(df: pd.DataFrame, contract: Optional[Dict[str, ColumnRule]] = None) -> List[Dict[str, Any]]:
+    """Evaluate a contract with one vectorized pass per column and rule.
+
+    Args:
+        df: Dataset (raw CSV read or the typed projection)
+        contract: Rules to check (defaults to dataset_contract())
+
+    Returns:
+        List of violations with column, rule, number of rows and example
+        codes; empty if the dataset satisfies the contract
+    """
+    contract = contract or dataset_contract()
+    violations: List[Dict[str, Any]] = []
+
+    for column, rule in contract.items():
+        if column not in df.columns:
+            if rule.get("optional", False):
+                continue
+            violations.append({"column": column, "rule": "present", "rows": len(df), "examples": []})
+            continue
+
+        series = df[column]
+        missing = series.isna().to_numpy()
+        if not rule.get("nullable", False) and missing.any():
+            violations.append(_violation(df, column, "not_null", missing))
+        if rule.get("unique"):
+            duplicated = series.duplicated(keep=False).to_numpy()
+            if duplicated.any():
+                violations.append(_violation(df, column, "unique", duplicated))
+
+        numeric_rules = {"integer", "min", "max", "min_exclusive"} & rule.keys()
+        if not numeric_rules:
+            continue
+        values = pd.to_numeric(series, errors="coerce").to_numpy(np.float64)
+        not_numeric = np.isnan(values) & ~missing
+        if not_numeric.any():
+            violations.append(_violation(df, column, "numeric", not_numeric))
+
+        # NaN compares False, so missing values only fail not_null
+        checks = {
+            "integer": lambda v: np.isfinite(v) & (v != np.round(v)),
+            "min": lambda v: v < rule["min"],
+            "max": lambda v: v > rule["max"],
+            "min_exclusive": lambda v: v <= rule["min_exclusive"],
+        }
+        for name in sorted(numeric_rules):
+            mask = checks[name](values)
+            if mask.any():
+                violations.append(_violation(df, column, name, mask))
+
+    return violations
+
+
+def contract_report(partitions: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    """Evaluate the dataset contract and build the stamp stored in a snapshot.
+
+    Args:
+        partitions: Mapping {file name: dataset} of every yearly partition
+
+    Returns:
+        Dictionary with the contract digest, rows per checked partition,
+        "passed" and violations (tagged with their partition)
+    """
+    violations = [
+        {"partition": name, **violation} for name, df in partitions.items() for violation in check_contract(df)
+    ]
+    return {
+        "contract": contract_digest(),
+        "columns": len(dataset_contract()),
+        "partitions": {name: len(df) for name, df in partitions.items()},
+        "passed": not violations,
+        "violations": violations,
+    }
+
+
+def read_contract_stamp(dataset_path: Path) -> Optional[Dict[str, Any]]:
+    """Contract stamp published next to a dataset, if any.
+
+    Args:
+        dataset_path: Dataset file inside a snapshot
+
+    Returns:
+        Stamp from contract_report, or None if the dataset is unstamped
+    """
+    try:
+        with open(dataset_path.parent / CONTRACT_REPORT, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_trusted(dataset_path: Path) -> bool:
+    """Whether a dataset was built and checked against the current contract.
+
+    Snapshots are immutable and named after their content, so a passing
+    stamp for the current contract digest that covers this partition makes
+    runtime checks redundant.
+
+    Args:
+        dataset_path: Dataset file to load
+
+    Returns:
+        True if the stamp passed under the current contract
+    """
+    stamp = read_contract_stamp(dataset_path)
+    if stamp is None or not stamp.get("passed", False) or stamp.get("contract") != contract_digest():
+        return False
+    return dataset_path.name in stamp.get("partitions", {})
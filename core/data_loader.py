@@ -1,129 +1,507 @@
 # core/data_loader.py
-"""Data loading with caching for CSV and shapefiles."""
+"""Data loading with caching for CSV and shapefiles.
 
-import os
-import warnings
-from typing import Tuple, Dict, Optional
+Base data is cached with st.cache_resource: one read-only instance per
+process, shared by every session without pickling. Callers must treat the
+returned frames as immutable and derive new frames instead of editing them.
+
+With LODCORE_SCOPE=national the dataset and map geometries are split into
+per-province shards the first time a dataset version is loaded, and only
+the provinces a session asks for are read afterwards.
+"""
+
+import json
+import shutil
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Tuple, Dict, List, Optional, Set
 
 import geopandas as gpd
 import pandas as pd
 import streamlit as st
 from PIL import Image
 
+from config.constants import MADRID_PROVINCE
+from config.paths import (
+    BOUNDARIES_ARTIFACT,
+    BOUNDARIES_SHP,
+    COMMUTE_DIR,
+    DATASET_CACHE_DIR,
+    GEOMETRY_LOD_DIR,
+    GEOMETRY_SHARD_DIR,
+    NATIONAL_BOUNDARIES_ARTIFACT,
+    PROVINCE_SHARD_DIR,
+)
+from config.settings import (
+    CACHED_PROVINCE_SELECTIONS,
+    CACHED_PROVINCES,
+    CACHED_YEARS,
+    SCOPE,
+    SHARED_STORE_DIR,
+)
+from core.accessibility import attach_profile_tensor, profile_tensor_dir
+from core.boundaries import (
+    GEOMETRY_LEVELS,
+    artifact_is_fresh,
+    build_geometry_levels,
+    geometry_level_path,
+    geometry_shard_path,
+    load_boundaries,
+    load_madrid_boundaries,
+    municipality_centroids,
+    municipality_codes,
+    province_codes,
+)
+from core.commute import COMMUTE_META, attach_commute_matrix
+from core.contract import check_contract, is_trusted
+from core.dataset import (
+    dataset_version,
+    enable_copy_on_write,
+    index_by_code,
+    load_dataset,
+    read_province_shards,
+    read_shard_manifest,
+    write_province_shards,
+)
+from core.images import PLACEHOLDER_COUNT, build_placeholder_index
+from core.snapshots import current_partitions
+from core.shared_store import (
+    attach_shared_dataset,
+    attach_shared_geometries,
+    publish_shared_store,
+    read_store_meta,
+    shared_bounds,
+    shared_feature_collection,
+    store_key,
+)
+
+# Shared frames must never be modified through a derived frame
+enable_copy_on_write()
+
+# Level whose feature bounding boxes are used to frame the map
+BOUNDS_LEVEL: str = "low"
+
+
+def _load_boundaries() -> gpd.GeoDataFrame:
+    """Boundaries of the configured scope (Madrid, or all of Spain)."""
+    if SCOPE == "national":
+        return load_boundaries(NATIONAL_BOUNDARIES_ARTIFACT, BOUNDARIES_SHP, nut2=None)
+    return load_madrid_boundaries(BOUNDARIES_ARTIFACT, BOUNDARIES_SHP)
+
+
+def _load_local_data(csv_path: Path) -> Tuple[pd.DataFrame, gpd.GeoDataFrame]:
+    """Load and validate the dataset and boundaries into this process.
+
+    Snapshots stamped by scripts/build.py under the current data contract
+    are trusted as is; any other dataset is checked against the contract
+    once here, so the rest of the app never re-validates values.
+    """
+    df = load_dataset(csv_path, DATASET_CACHE_DIR)
+    if not is_trusted(csv_path):
+        violations = check_contract(df)
+        if violations:
+            lines = [f"- `{v['column']}`: {v['rule']} ({v['rows']} filas, p. ej. {v['examples'][:3]})" for v in violations]
+            st.error("merged_dataset.csv no cumple el contrato de datos:\n" + "\n".join(lines))
+            st.stop()
+    df = index_by_code(df)
+
+    artifact = NATIONAL_BOUNDARIES_ARTIFACT if SCOPE == "national" else BOUNDARIES_ARTIFACT
+    if not artifact.exists() and not BOUNDARIES_SHP.exists():
+        st.error(f"No se encuentra el archivo SHP en {BOUNDARIES_SHP}")
+        st.stop()
+
+    scope_gdf = _load_boundaries()
+    if len(scope_gdf) == 0:
+        st.error("No se encontraron municipios en los datos geográficos.")
+        st.stop()
+
+    scope_gdf.index = pd.Index(municipality_codes(scope_gdf).to_numpy())
+    boundaries_gdf = scope_gdf[scope_gdf.index.isin(df.index)]
+    if len(boundaries_gdf) == 0:
+        st.error("No se pudieron combinar los datos geográficos con los datos de merged_dataset.")
+        st.write("Ejemplos en CSV:", df["codigo"].head(10).tolist())
+        st.write("Ejemplos en SHP:", scope_gdf["NATCODE"].head(10).tolist())
+        st.stop()
+
+    df = df.join(municipality_centroids(boundaries_gdf), how="left")
+    return df, boundaries_gdf
+
+
+def _load_local_geometries(level: str) -> Dict[str, Any]:
+    """Read the pre-built GeoJSON for a level, or simplify it in-process."""
+    path = geometry_level_path(GEOMETRY_LOD_DIR, level)
+    if artifact_is_fresh(path, BOUNDARIES_SHP):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    gdf = load_madrid_boundaries(BOUNDARIES_ARTIFACT, BOUNDARIES_SHP)
+    return build_geometry_levels(gdf, {level: GEOMETRY_LEVELS[level]}, workers=1)[level]
+
+
+def _geometry_version() -> str:
+    """Version of the map geometry inputs, from file sizes and mtimes."""
+    paths = [BOUNDARIES_SHP, BOUNDARIES_ARTIFACT]
+    paths += [geometry_level_path(GEOMETRY_LOD_DIR, level) for level in GEOMETRY_LEVELS]
+    parts = []
+    for path in paths:
+        if path.exists():
+            stat = path.stat()
+            parts.append(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return "|".join(parts)
+
+
+@st.cache_resource(max_entries=CACHED_YEARS)
+def shared_store_dir(csv_path: Path, version: str) -> Path:
+    """Locate the shared store for one dataset partition, publishing it if needed.
+
+    The first process to start after the data changes builds the store; the
+    others find it already published and only map it. Each partition has
+    its own parent directory, so publishing one year never removes another.
+
+    Args:
+        csv_path: Partition file from current_partitions()
+        version: Snapshot version from current_partitions() (cache key only)
+
+    Returns:
+        Store directory under SHARED_STORE_DIR
+    """
+    root = SHARED_STORE_DIR / csv_path.stem
+    key = store_key(dataset_version(csv_path), _geometry_version())
+    store_dir = root / key
+    if read_store_meta(store_dir) is None:
+        df, _ = _load_local_data(csv_path)
+        collections = {level: _load_local_geometries(level) for level in GEOMETRY_LEVELS}
+        store_dir = publish_shared_store(df, collections, root, key, bbox_level=BOUNDS_LEVEL)
+    return store_dir
+
+
+@st.cache_resource(max_entries=CACHED_YEARS)
+def province_shard_dir(csv_path: Path, version: str) -> Path:
+    """Locate the province shards of one dataset partition, writing them if needed.
+
+    The first load of a dataset version reads it whole (with the national
+    boundaries, for centroids) and splits it by province; every later load,
+    in this or any other process, reads only the shards it needs.
+
+    Args:
+        csv_path: Partition file from current_partitions()
+        version: Snapshot version from current_partitions() (cache key only)
+
+    Returns:
+        Shard directory under PROVINCE_SHARD_DIR
+    """
+    shard_dir = PROVINCE_SHARD_DIR / f"{csv_path.stem}-{dataset_version(csv_path)}"
+    if read_shard_manifest(shard_dir) is None:
+        df, _ = _load_local_data(csv_path)
+        write_province_shards(df, shard_dir)
+        for old in PROVINCE_SHARD_DIR.glob(f"{csv_path.stem}-*"):
+            if old != shard_dir and not old.name.startswith("."):
+                shutil.rmtree(old, ignore_errors=True)
+    return shard_dir
+
+
+@st.cache_resource(max_entries=CACHED_PROVINCE_SELECTIONS)
+def _load_provinces(shard_dir: Path, provinces: Tuple[int, ...]) -> pd.DataFrame:
+    """Load the shards of a set of provinces; the CACHED_PROVINCE_SELECTIONS
+    most recent selections stay resident."""
+    return index_by_code(read_province_shards(shard_dir, provinces))
+
+
+@st.cache_resource(max_entries=CACHED_YEARS)
+def _load_data_version(csv_path: Path, version: str) -> Tuple[pd.DataFrame, Optional[gpd.GeoDataFrame]]:
+    """Load one partition of one snapshot version.
+
+    Only the most recently requested CACHED_YEARS partitions stay resident;
+    entries of a replaced snapshot age out the same way.
+    """
+    if SHARED_STORE_DIR is not None:
+        return index_by_code(attach_shared_dataset(shared_store_dir(csv_path, version))), None
+
+    return _load_local_data(csv_path)
+
+
+@st.cache_resource(max_entries=CACHED_YEARS)
+def _load_profile_tensor(csv_path: Path, version: str) -> Optional[Dict[str, Any]]:
+    """Attach one partition's tensor; cached per snapshot version."""
+    data_version = dataset_version(csv_path)
+    return attach_profile_tensor(profile_tensor_dir(csv_path, data_version), data_version)
+
+
+def load_profile_tensor(year: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """Precomputed accessibility hours of a year's partition, if built.
+
+    Tensor rows follow the partition file, so it answers requests for the
+    whole partition (Madrid scope); province selections in national scope
+    are computed live.
+
+    Args:
+        year: Padrón year; latest if omitted
+
+    Returns:
+        Output of core.accessibility.attach_profile_tensor, or None if
+        scripts/build_accessibility.py has not been run for this dataset
+    """
+    partitions, version = current_partitions()
+    csv_path = partitions.get(year if year is not None else max(partitions))
+    if csv_path is None or not csv_path.exists():
+        return None
+    return _load_profile_tensor(csv_path, version)
+
+
+@st.cache_resource(max_entries=1)
+def _load_commute_matrix(stamp: str) -> Optional[Dict[str, Any]]:
+    """Attach the commute matrix; cached per build (stamp)."""
+    return attach_commute_matrix(COMMUTE_DIR)
+
+
+def load_commute_matrix() -> Optional[Dict[str, Any]]:
+    """Routed home → workplace minutes, if scripts/build_commute.py has run.
+
+    Returns:
+        Output of core.commute.attach_commute_matrix, or None
+    """
+    try:
+        stat = (COMMUTE_DIR / COMMUTE_META).stat()
+    except OSError:
+        return None
+    return _load_commute_matrix(f"{stat.st_size}:{stat.st_mtime_ns}")
+
+
+def available_provinces(year: Optional[int] = None) -> List[int]:
+    """Provinces with data in a year's partition.
+
+    In national scope this writes the shards on first use; later calls
+    only read the shard manifest.
+
+    Args:
+        year: Padrón year; latest if omitted
+
+    Returns:
+        Sorted INE province codes
+    """
+    if SCOPE != "national":
+        return [MADRID_PROVINCE]
+    partitions, version = current_partitions()
+    csv_path = partitions.get(year if year is not None else max(partitions))
+    return sorted(read_shard_manifest(province_shard_dir(csv_path, version)) or [])
+
+
+def available_years() -> List[int]:
+    """Padrón years with a dataset partition, oldest first.
+
+    Only lists the current snapshot; no partition is read.
 
-@st.cache_data
-def load_data() -> Tuple[pd.DataFrame, gpd.GeoDataFrame]:
-    """Load municipality data and geographic boundaries.
+    Returns:
+        Sorted list of years
+    """
+    partitions, _ = current_partitions()
+    return list(partitions)
+
+
+def _latest_partition() -> Tuple[Path, str]:
+    """Partition of the most recent year and the snapshot version."""
+    partitions, version = current_partitions()
+    return partitions[max(partitions)], version
+
+
+def dataset_key(year: Optional[int] = None, provinces: Optional[Iterable[int]] = None) -> str:
+    """Identifier of the frame load_data(year, provinces) returns.
+
+    Lets derived-result caches key on a short string instead of hashing the
+    dataset; it changes with the snapshot version, year and province set.
+
+    Args:
+        year: Padrón year; latest if omitted
+        provinces: INE province codes (national scope; all if omitted)
+
+    Returns:
+        Key string
+    """
+    partitions, version = current_partitions()
+    key = f"{version}:{year if year is not None else max(partitions)}"
+    if SCOPE == "national" and provinces is not None:
+        key += ":" + ",".join(str(p) for p in sorted(set(provinces)))
+    return key
+
+
+def load_data(
+    year: Optional[int] = None, provinces: Optional[Iterable[int]] = None
+) -> Tuple[pd.DataFrame, Optional[gpd.GeoDataFrame]]:
+    """Load municipality data and geographic boundaries for one year.
+    
+    Both frames are indexed by INE municipality code (``codigo`` in the CSV,
+    the tail of NATCODE in the shapefile), so rows and geometries are looked
+    up with ``.loc[code]`` instead of name joins or boolean masks.
+    
+    With LODCORE_SHARED_STORE_DIR set, the numeric columns are memory-mapped
+    from the shared store and no boundaries are loaded; map geometries are
+    then read from the store by map_bounds and map_feature_collection.
+    
+    The dataset is the current snapshot published by scripts/build.py, or
+    data/merged_dataset.csv if there is none. Cached data is keyed on its
+    version, so publishing a new snapshot takes effect on the next rerun.
+    
+    Each padrón year is a separate partition, loaded the first time it is
+    requested; startup only pays for the year that is displayed.
+    
+    In national scope only the shards of the requested provinces are read
+    and no boundaries are returned (map geometries come from per-province
+    files through map_bounds and map_feature_collection).
+    
+    Args:
+        year: Padrón year (see available_years()); latest if omitted
+        provinces: INE province codes to load (national scope; all if omitted)
     
     Returns:
-        Tuple of (municipality_df, merged_geodataframe)
+        Tuple of (municipality_df, boundaries_geodataframe or None)
         
     Raises:
         FileNotFoundError: If data files are missing
     """
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    parent_dir = os.path.dirname(script_dir)
-    
-    csv_path = os.path.join(parent_dir, "data", "merged_dataset.csv")
-    if not os.path.exists(csv_path):
+    partitions, version = current_partitions()
+    csv_path = partitions.get(year if year is not None else max(partitions))
+    if csv_path is None:
+        st.error(f"No hay datos para el año {year}")
+        st.stop()
+    if not csv_path.exists():
         st.error(f"No se encuentra merged_dataset.csv en {csv_path}")
         st.stop()
 
-    df = pd.read_csv(csv_path, sep = ";")
+    if SCOPE == "national":
+        shard_dir = province_shard_dir(csv_path, version)
+        manifest = read_shard_manifest(shard_dir) or {}
+        selected = tuple(sorted(set(provinces if provinces is not None else manifest) & set(manifest)))
+        if not selected:
+            st.error("No hay datos para las provincias seleccionadas.")
+            st.stop()
+        return _load_provinces(shard_dir, selected), None
 
-    shp_path = os.path.join(parent_dir, "boundaries", "recintos_municipales_inspire_peninbal_etrs89.shp")
-    if not os.path.exists(shp_path):
-        st.error(f"No se encuentra el archivo SHP en {shp_path}")
-        st.stop()
+    return _load_data_version(csv_path, version)
 
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore")
-        gdf = gpd.read_file(shp_path)
 
-    madrid_gdf = gdf[gdf["CODNUT2"] == "ES30"].copy()
-    if len(madrid_gdf) == 0:
-        st.error("No se encontraron municipios de Madrid en los datos geográficos.")
-        st.stop()
+@st.cache_resource
+def load_map_geometries(level: str) -> Dict[str, Any]:
+    """Load simplified WGS84 municipality geometries for one level of detail.
 
-    madrid_gdf["NAMEUNIT"] = madrid_gdf["NAMEUNIT"].astype(str)
-    df["Nombre"] = df["Nombre"].astype(str)
+    Reads the pre-built GeoJSON from scripts/build_geometries.py; if it is
+    missing or stale, simplifies the boundaries once for this process.
 
-    merged_gdf = madrid_gdf.merge(df, left_on="NAMEUNIT", right_on="Nombre", how="inner")
-    if len(merged_gdf) == 0:
-        st.error("No se pudieron combinar los datos geográficos con los datos de merged_dataset.")
-        st.write("Ejemplos en CSV:", df["Nombre"].head(10).tolist())
-        st.write("Ejemplos en SHP:", madrid_gdf["NAMEUNIT"].head(10).tolist())
-        st.stop()
+    Args:
+        level: Level of detail (key of GEOMETRY_LEVELS)
 
-    return df, merged_gdf
+    Returns:
+        GeoJSON FeatureCollection with features keyed by INE code
+    """
+    return _load_local_geometries(level)
 
 
-@st.cache_data
-def load_placeholder_images() -> Dict[str, Optional[Image.Image]]:
-    """Load placeholder images for municipalities.
-    
+@st.cache_resource(max_entries=CACHED_PROVINCES)
+def load_province_geometries(level: str, province: int) -> Dict[str, Any]:
+    """Load one province's simplified geometries for one level of detail.
+
+    Reads the shard from scripts/build_geometries.py --national; if it is
+    missing or stale, simplifies that province's boundaries in-process.
+
+    Args:
+        level: Level of detail (key of GEOMETRY_LEVELS)
+        province: INE province code
+
     Returns:
-        Dictionary mapping image keys to PIL Image objects
+        GeoJSON FeatureCollection with features keyed by INE code
     """
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    parent_dir = os.path.dirname(script_dir)
-    images: Dict[str, Optional[Image.Image]] = {}
-    
-    for i in range(1, 7):
-        try:
-            img_path = os.path.join(parent_dir, "photos", f"placeholder{i}.jpeg")
-            img = Image.open(img_path)
-            images[f"placeholder{i}"] = img
-        except Exception:
-            images[f"placeholder{i}"] = None
-    
-    return images
+    path = geometry_shard_path(GEOMETRY_SHARD_DIR, level, province)
+    if artifact_is_fresh(path, BOUNDARIES_SHP):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
 
+    gdf = _load_boundaries()
+    gdf = gdf[province_codes(gdf) == f"{province:02d}"]
+    if len(gdf) == 0:
+        return {"type": "FeatureCollection", "features": []}
+    return build_geometry_levels(gdf, {level: GEOMETRY_LEVELS[level]}, workers=1)[level]
+
+
+def _features(level: str, codes: Set[int]) -> Iterator[Dict[str, Any]]:
+    """Features of some municipalities from the scope's geometry files."""
+    if SCOPE == "national":
+        collections = [load_province_geometries(level, p) for p in sorted({code // 1000 for code in codes})]
+    else:
+        collections = [load_map_geometries(level)]
+    for collection in collections:
+        for feature in collection["features"]:
+            if feature["id"] in codes:
+                yield feature
+
+
+@st.cache_resource(max_entries=1)
+def _attach_shared_geometries(store_dir: Path) -> Dict[str, Any]:
+    """Memory-map the pre-serialized geometries of one shared store."""
+    return attach_shared_geometries(store_dir)
+
+
+def load_shared_geometries() -> Dict[str, Any]:
+    """Pre-serialized geometries of the shared store for the current dataset."""
+    return _attach_shared_geometries(shared_store_dir(*_latest_partition()))
+
+
+def map_bounds(codes: Set[int]) -> Optional[Tuple[float, float, float, float]]:
+    """Combined WGS84 bounding box of some municipalities.
 
-def get_municipality_image(nombre: str, images_dir: str = "assets/municipalities") -> Optional[Image.Image]:
-    """Get real or placeholder image for municipality.
-    
     Args:
-        nombre: Municipality name
-        images_dir: Directory with real images
-        
+        codes: INE codes
+
+    Returns:
+        (minx, miny, maxx, maxy), or None if none of the codes has a geometry
+    """
+    if SHARED_STORE_DIR is not None and SCOPE != "national":
+        return shared_bounds(load_shared_geometries(), codes)
+
+    boxes = [f["bbox"] for f in _features(BOUNDS_LEVEL, codes)]
+    if not boxes:
+        return None
+    return (
+        min(b[0] for b in boxes),
+        min(b[1] for b in boxes),
+        max(b[2] for b in boxes),
+        max(b[3] for b in boxes),
+    )
+
+
+def map_feature_collection(level: str, codes: Set[int]) -> Dict[str, Any]:
+    """GeoJSON with only the features that will be drawn.
+
+    Args:
+        level: Level of detail (key of GEOMETRY_LEVELS)
+        codes: INE codes to include
+
     Returns:
-        PIL Image or None
+        GeoJSON FeatureCollection
     """
-    from pathlib import Path
-    import re
+    if SHARED_STORE_DIR is not None and SCOPE != "national":
+        return shared_feature_collection(load_shared_geometries(), level, codes)
+
+    return {"type": "FeatureCollection", "features": list(_features(level, codes))}
+
+
+@st.cache_resource
+def load_placeholder_images() -> Dict[str, Optional[Image.Image]]:
+    """Load placeholder images for municipalities.
     
-    def slugify(text: str) -> str:
-        text = text.lower()
-        text = re.sub(r'[áàäâ]', 'a', text)
-        text = re.sub(r'[éèëê]', 'e', text)
-        text = re.sub(r'[íìïî]', 'i', text)
-        text = re.sub(r'[óòöô]', 'o', text)
-        text = re.sub(r'[úùüû]', 'u', text)
-        text = re.sub(r'[ñ]', 'n', text)
-        text = re.sub(r'[^a-z0-9]+', '-', text)
-        return text.strip('-')
+    Images are decoded once per process and shared read-only by all sessions.
     
-    script_dir = Path(__file__).parent.parent
-    slug = slugify(nombre)
+    Returns:
+        Dictionary mapping image keys to PIL Image objects
+    """
+    available = build_placeholder_index()
+    images: Dict[str, Optional[Image.Image]] = {}
     
-    # Try multiple image formats
-    for ext in ['.jpg', '.jpeg', '.png', '.JPG', '.JPEG', '.PNG']:
-        real_img_path = script_dir / images_dir / f"{slug}{ext}"
-        if real_img_path.exists():
+    for i in range(1, PLACEHOLDER_COUNT + 1):
+        images[f"placeholder{i}"] = None
+        if i in available:
             try:
-                return Image.open(real_img_path)
+                with Image.open(available[i]) as img:
+                    img.load()
+                    images[f"placeholder{i}"] = img
             except Exception:
-                continue
-    
-    # Fallback to placeholder
-    import random
-    random.seed(hash(nombre))
-    placeholder_num = random.randint(1, 6)
-    placeholder_path = script_dir / "photos" / f"placeholder{placeholder_num}.jpeg"
+                pass
     
-    try:
-        return Image.open(placeholder_path)
-    except Exception:
-        return None
-
+    return images
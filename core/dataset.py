@@ -0,0 +1,346 @@
+# core/dataset.py
+"""Municipality dataset: column projection, compact dtypes, binary cache and
+per-province shards."""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config.constants import (
+    ACC_COLUMNS,
+    AGE_60_PLUS_GROUPS,
+    AGE_GROUP_COUNT_COLUMNS,
+    AGE_GROUP_SHARE_COLUMNS,
+    BENEFIT_COLUMNS,
+    COST_COLUMNS,
+    DEMOGRAPHIC_COLUMNS,
+    DEMOGRAPHIC_TOTAL_COLUMN,
+    GENDER_SHARE_COLUMNS,
+    OPTIONAL_CRITERIA,
+    GENDER_TOTAL_COLUMNS,
+    discover_acc_columns,
+)
+from core.images import slugify
+
+CSV_SEPARATOR: str = ";"
+
+ID_COLUMNS: List[str] = ["codigo", "Nombre"]
+POPULATION_COLUMN: str = "IDE_PoblacionTotal"
+
+# Sex breakdowns stored next to each DEM_*_Total column
+DEMOGRAPHIC_SEXES: List[str] = ["Hombres", "Mujeres"]
+
+# Bump when the projection, dtype or derivation rules change to invalidate old caches
+CACHE_FORMAT_VERSION: int = 5
+
+# Filename slug of each municipality, used to look up its image
+SLUG_COLUMN: str = "slug"
+
+# INE province code of each municipality (codigo // 1000)
+PROVINCE_COLUMN: str = "provincia"
+
+# Row counts per province written next to the shards
+SHARD_MANIFEST: str = "provinces.json"
+
+
+def required_columns() -> List[str]:
+    """Derive the dataset columns the app uses from the config mappings.
+
+    Returns:
+        Ordered, de-duplicated list of column names
+    """
+    columns: List[str] = list(ID_COLUMNS) + [POPULATION_COLUMN]
+    for modes in ACC_COLUMNS.values():
+        columns.extend(modes.values())
+    columns.extend(col for crit, col in BENEFIT_COLUMNS.items() if crit not in OPTIONAL_CRITERIA)
+    columns.extend(COST_COLUMNS.values())
+    for total_col in DEMOGRAPHIC_COLUMNS.values():
+        columns.append(total_col)
+        columns.extend(total_col.replace("_Total", f"_{sex}") for sex in DEMOGRAPHIC_SEXES)
+    return list(dict.fromkeys(columns))
+
+
+def column_dtype(column: str) -> str:
+    """Compact dtype for a dataset column.
+
+    Counts and codes fit in int32, names are categorical and every other
+    measurement (times, cluster scores, prices) is float32.
+
+    Args:
+        column: Column name
+
+    Returns:
+        NumPy/pandas dtype name
+    """
+    if column == "Nombre":
+        return "category"
+    if column == "codigo" or column == POPULATION_COLUMN or column.startswith("DEM_"):
+        return "int32"
+    return "float32"
+
+
+def _apply_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast columns to their compact dtypes.
+
+    Integer columns with missing values fall back to float32 rather than
+    failing the load.
+    """
+    for col in df.columns:
+        dtype = column_dtype(col)
+        if dtype == "int32" and df[col].isna().any():
+            dtype = "float32"
+        df[col] = df[col].astype(dtype)
+    return df
+
+
+def _compact_counts(values: np.ndarray) -> np.ndarray:
+    """Cast summed counts to int32, or float32 if any input was missing."""
+    return values.astype(np.float32) if np.isnan(values).any() else values.astype(np.int32)
+
+
+def _percent(part: np.ndarray, total: np.ndarray) -> np.ndarray:
+    """Share of total in percent as float32, 0 where the total is 0."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(total > 0, part / total * 100.0, 0.0)
+    return pct.astype(np.float32)
+
+
+def derive_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the display fields derived from the raw columns, for all rows at once.
+
+    Adds the demographic total, the count and share of each display age
+    group (60-79 and 80+ merged into 60+), totals and shares by sex, and
+    the image slug and province, so views only have to format values.
+
+    Args:
+        df: Typed, column-projected dataset
+
+    Returns:
+        The same frame with derived columns appended
+    """
+    groups = {key: df[col].to_numpy(np.float64) for key, col in DEMOGRAPHIC_COLUMNS.items()}
+    total = sum(groups.values())
+    counts = {
+        "0-19": groups["0-19"],
+        "20-39": groups["20-39"],
+        "40-59": groups["40-59"],
+        "60+": sum(groups[key] for key in AGE_60_PLUS_GROUPS),
+    }
+
+    derived: Dict[str, Any] = {DEMOGRAPHIC_TOTAL_COLUMN: _compact_counts(total)}
+    for key, values in counts.items():
+        if AGE_GROUP_COUNT_COLUMNS[key] not in df.columns:
+            derived[AGE_GROUP_COUNT_COLUMNS[key]] = _compact_counts(values)
+        derived[AGE_GROUP_SHARE_COLUMNS[key]] = _percent(values, total)
+
+    for sex in DEMOGRAPHIC_SEXES:
+        by_sex = sum(df[col.replace("_Total", f"_{sex}")].to_numpy(np.float64) for col in DEMOGRAPHIC_COLUMNS.values())
+        derived[GENDER_TOTAL_COLUMNS[sex]] = _compact_counts(by_sex)
+        derived[GENDER_SHARE_COLUMNS[sex]] = _percent(by_sex, total)
+
+    derived[SLUG_COLUMN] = pd.Categorical(df["Nombre"].astype(str).map(slugify))
+    derived[PROVINCE_COLUMN] = province_of(df["codigo"].to_numpy())
+
+    return pd.concat([df, pd.DataFrame(derived, index=df.index)], axis=1)
+
+
+def province_of(codes: np.ndarray) -> np.ndarray:
+    """INE province code of municipality codes, e.g. 28001 → 28."""
+    return (np.asarray(codes) // 1000).astype(np.int32)
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents.
+
+    Args:
+        path: File to hash
+        chunk_size: Read size in bytes
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dataset_version(csv_path: Path) -> str:
+    """Version of the loaded dataset: CSV contents plus projection/dtype rules.
+
+    Args:
+        csv_path: Path to merged_dataset.csv
+
+    Returns:
+        16-character hex key
+    """
+    columns = required_columns()
+    rules = json.dumps(
+        {"version": CACHE_FORMAT_VERSION, "columns": {c: column_dtype(c) for c in columns}},
+        sort_keys=True,
+    )
+    digest = hashlib.sha256(file_digest(csv_path).encode())
+    digest.update(rules.encode())
+    return digest.hexdigest()[:16]
+
+
+def read_dataset_csv(csv_path: Path) -> pd.DataFrame:
+    """Parse the CSV keeping only required columns (plus any other travel-time
+    columns), with compact dtypes, and add the derived display columns.
+
+    Args:
+        csv_path: Path to merged_dataset.csv
+
+    Returns:
+        Typed DataFrame
+
+    Raises:
+        ValueError: If required columns are missing from the CSV
+    """
+    columns = required_columns()
+    header = pd.read_csv(csv_path, sep=CSV_SEPARATOR, nrows=0).columns
+    missing = [c for c in columns if c not in header]
+    if missing:
+        raise ValueError(f"Missing columns in {csv_path.name}: {missing}")
+
+    # Travel times of unconfigured services feed the accessibility tensor too
+    for modes in discover_acc_columns(header).values():
+        columns.extend(c for c in modes.values() if c not in columns)
+    columns.extend(BENEFIT_COLUMNS[crit] for crit in OPTIONAL_CRITERIA if BENEFIT_COLUMNS[crit] in header)
+
+    float_cols = {c: np.float32 for c in columns if column_dtype(c) == "float32"}
+    df = pd.read_csv(csv_path, sep=CSV_SEPARATOR, usecols=columns, dtype=float_cols)
+    return derive_columns(_apply_dtypes(df[columns]))
+
+
+def load_dataset(csv_path: Path, cache_dir: Path) -> pd.DataFrame:
+    """Load the municipality dataset through a Parquet cache.
+
+    The cache file is keyed on the CSV content hash, so editing the CSV (or
+    the column mappings) transparently rebuilds it. Stale cache files are
+    removed when a new one is written.
+
+    Args:
+        csv_path: Path to merged_dataset.csv
+        cache_dir: Directory for cached Parquet files
+
+    Returns:
+        Typed, column-projected DataFrame
+    """
+    cache_path = cache_dir / f"{csv_path.stem}-{dataset_version(csv_path)}.parquet"
+    if cache_path.exists():
+        try:
+            return pd.read_parquet(cache_path)
+        except (ImportError, ValueError, OSError):
+            return read_dataset_csv(csv_path)
+
+    df = read_dataset_csv(csv_path)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        df.to_parquet(tmp_path, index=False)
+        tmp_path.replace(cache_path)
+        for old in cache_dir.glob(f"{csv_path.stem}-*.parquet"):
+            if old != cache_path:
+                old.unlink(missing_ok=True)
+    except (ImportError, OSError):
+        pass
+    return df
+
+
+def enable_copy_on_write() -> None:
+    """Turn on pandas Copy-on-Write where it is still optional.
+
+    Shared, process-wide frames are handed to every session; with
+    Copy-on-Write, derived frames and in-place edits never write through to
+    them. Always on (and the option deprecated) from pandas 3.
+    """
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
+
+def index_by_code(df: pd.DataFrame) -> pd.DataFrame:
+    """Index the dataset by INE municipality code.
+
+    The index is left unnamed so ``codigo`` stays an unambiguous column for
+    sorting, filtering and export.
+
+    Args:
+        df: Dataset with a codigo column
+
+    Returns:
+        The same frame, indexed by codigo
+    """
+    df.index = pd.Index(df["codigo"].to_numpy())
+    return df
+
+
+def shard_path(shard_dir: Path, province: int) -> Path:
+    """Parquet file of one province's rows."""
+    return shard_dir / f"{province:02d}.parquet"
+
+
+def write_province_shards(df: pd.DataFrame, shard_dir: Path) -> Dict[int, int]:
+    """Split the dataset into one Parquet file per province.
+
+    Written to a temporary directory and renamed into place; when several
+    processes build the same shards, the first rename wins.
+
+    Args:
+        df: Dataset with PROVINCE_COLUMN
+        shard_dir: Destination directory (one per dataset version)
+
+    Returns:
+        Mapping {province: rows}
+    """
+    tmp_dir = shard_dir.with_name(f".{shard_dir.name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    counts: Dict[int, int] = {}
+    for province, rows in df.groupby(PROVINCE_COLUMN, sort=True, observed=True):
+        rows.to_parquet(shard_path(tmp_dir, int(province)), index=False)
+        counts[int(province)] = len(rows)
+    with open(tmp_dir / SHARD_MANIFEST, "w", encoding="utf-8") as f:
+        json.dump(counts, f)
+
+    try:
+        tmp_dir.rename(shard_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return counts
+
+
+def read_shard_manifest(shard_dir: Path) -> Optional[Dict[int, int]]:
+    """Row count per province, or None if the shards have not been written."""
+    try:
+        with open(shard_dir / SHARD_MANIFEST, encoding="utf-8") as f:
+            return {int(province): rows for province, rows in json.load(f).items()}
+    except (OSError, ValueError):
+        return None
+
+
+def read_province_shards(shard_dir: Path, provinces: Iterable[int]) -> pd.DataFrame:
+    """Read the rows of some provinces, touching only their shard files.
+
+    Args:
+        shard_dir: Directory written by write_province_shards
+        provinces: Province codes
+
+    Returns:
+        Rows of those provinces, in province order
+    """
+    frames = [pd.read_parquet(shard_path(shard_dir, province)) for province in sorted(provinces)]
+    df = pd.concat(frames, ignore_index=True)
+    # Categories differ per shard, so concat falls back to object columns
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+    return df
@@ -0,0 +1,79 @@
+# core/gravity.py
+"""Gravity-based service accessibility from local POI coordinates.
+
+The ACC_* columns only hold the time to the nearest facility. The gravity
+indicator also rewards having several facilities close by: for each service
+it sums a distance decay over the K nearest POIs of every municipality
+centroid,
+
+    A_s = Σ_k exp(-d_k / GRAVITY_DECAY_M)
+
+found through the grid index of core/routing.py. Each service potential is
+scaled by its maximum across municipalities and the mean over services is
+the ServiceOffer criterion column (GRV_OfertaServicios, 0-1). Computed by
+the gravity stage of scripts/build.py.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config.constants import BENEFIT_COLUMNS
+from core.routing import build_grid_index, k_nearest_points, project
+
+# Distance over which a POI's weight falls by a factor e
+GRAVITY_DECAY_M: float = 2000.0
+
+# Nearest POIs per service summed for each municipality
+GRAVITY_NEIGHBOURS: int = 20
+
+# Per-service potentials are stored as GRV_{service}
+GRAVITY_PREFIX: str = "GRV_"
+
+
+def gravity_potential(distances: np.ndarray, decay_m: float = GRAVITY_DECAY_M) -> np.ndarray:
+    """Distance-decay sum over each row of neighbour distances.
+
+    Args:
+        distances: Metres to the nearest POIs, shaped (points, k)
+        decay_m: Decay distance in metres
+
+    Returns:
+        Potential per point, shaped (points,)
+    """
+    return np.exp(-distances / decay_m).sum(axis=1)
+
+
+def compute_gravity(
+    pois_path: Path,
+    centroids: pd.DataFrame,
+    k: int = GRAVITY_NEIGHBOURS,
+    decay_m: float = GRAVITY_DECAY_M,
+) -> pd.DataFrame:
+    """Gravity accessibility of every municipality to each POI service.
+
+    Args:
+        pois_path: CSV with service, lon, lat
+        centroids: Municipality centroids (centroid_lon, centroid_lat)
+            indexed by INE code
+        k: Nearest POIs summed per service
+        decay_m: Decay distance in metres
+
+    Returns:
+        DataFrame with codigo, one GRV_{service} potential per service and
+        the combined ServiceOffer column
+    """
+    pois = pd.read_csv(pois_path, usecols=["service", "lon", "lat"])
+    origins = project(centroids["centroid_lon"], centroids["centroid_lat"])
+
+    out = pd.DataFrame({"codigo": centroids.index.to_numpy()})
+    for service, group in pois.groupby("service", sort=True):
+        grid = build_grid_index(project(group["lon"], group["lat"]), queries=origins)
+        _, distances = k_nearest_points(grid, origins, k)
+        out[f"{GRAVITY_PREFIX}{service}"] = gravity_potential(distances, decay_m)
+
+    potentials = out.drop(columns="codigo").to_numpy()
+    scaled = potentials / np.maximum(potentials.max(axis=0), np.finfo(float).tiny)
+    out[BENEFIT_COLUMNS["ServiceOffer"]] = scaled.mean(axis=1) if len(potentials.T) else 0.0
+    return out
@@ -0,0 +1,337 @@
+# core/images.py
+"""Municipality images: slug index, deterministic placeholders, a bounded
+in-memory cache of display-sized JPEG bytes and static derivative URLs."""
+
+import json
+import re
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from PIL import Image
+
+from config.paths import IMAGE_DERIVATIVES_DIR, MUNICIPALITY_IMAGES_DIR, PLACEHOLDER_IMAGES_DIR, STATIC_DIR
+from config.settings import IMAGE_MODE, STATIC_BASE_URL
+
+IMAGE_EXTENSIONS: Tuple[str, ...] = (".jpg", ".jpeg", ".png")
+
+PLACEHOLDER_COUNT: int = 6
+
+# Largest size any card displays; images are downscaled once to this box
+DISPLAY_MAX_SIZE: Tuple[int, int] = (640, 480)
+DISPLAY_JPEG_QUALITY: int = 85
+
+# Decoded images kept in memory (a few list pages plus comparisons)
+IMAGE_CACHE_SIZE: int = 128
+
+# Responsive derivatives built by scripts/build_image_derivatives.py
+DERIVATIVE_WIDTHS: Tuple[int, ...] = (160, 320, 640)
+DERIVATIVE_FORMATS: Dict[str, Dict[str, Any]] = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 6},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+DERIVATIVES_MANIFEST: str = "manifest.json"
+
+# Background threads warming the image cache for neighbouring list pages.
+# Decoding and file reads release the GIL, so a few threads overlap disk I/O.
+PREFETCH_WORKERS: int = 4
+
+_ACCENTS = str.maketrans("áàäâéèëêíìïîóòöôúùüûñ", "aaaaeeeeiiiioooouuuun")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+_prefetch_pool = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="image-prefetch")
+_prefetch_pending: Set[Tuple[str, int]] = set()
+_prefetch_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def slugify(text: str) -> str:
+    """Convert municipality name to filename slug.
+
+    Args:
+        text: Municipality name
+
+    Returns:
+        Lowercase ASCII slug, e.g. "Acebeda (La)" → "acebeda-la"
+    """
+    return _NON_ALNUM.sub("-", text.lower().translate(_ACCENTS)).strip("-")
+
+
+@lru_cache(maxsize=4)
+def build_image_index(images_dir: Path = MUNICIPALITY_IMAGES_DIR) -> Dict[str, Path]:
+    """Map slugs to image files with a single directory listing.
+
+    Slugs come from manifest.json when present; files added by hand without
+    a manifest entry are indexed too. When several extensions exist for a
+    slug, IMAGE_EXTENSIONS order wins.
+
+    Args:
+        images_dir: Directory with real images
+
+    Returns:
+        Dictionary {slug: image path}
+    """
+    if not images_dir.is_dir():
+        return {}
+
+    candidates: Dict[str, Dict[str, Path]] = {}
+    for path in images_dir.iterdir():
+        ext = path.suffix.lower()
+        if ext in IMAGE_EXTENSIONS:
+            candidates.setdefault(path.stem, {})[ext] = path
+
+    manifest_path = images_dir / "manifest.json"
+    slugs = list(candidates)
+    if manifest_path.exists():
+        with open(manifest_path, encoding="utf-8") as f:
+            slugs = list(dict.fromkeys(list(json.load(f)) + slugs))
+
+    index: Dict[str, Path] = {}
+    for slug in slugs:
+        files = candidates.get(slug, {})
+        for ext in IMAGE_EXTENSIONS:
+            if ext in files:
+                index[slug] = files[ext]
+                break
+    return index
+
+
+@lru_cache(maxsize=4)
+def build_placeholder_index(placeholder_dir: Path = PLACEHOLDER_IMAGES_DIR) -> Dict[int, Path]:
+    """Map placeholder numbers to the placeholder files that exist.
+
+    Args:
+        placeholder_dir: Directory with placeholder{n}.jpeg files
+
+    Returns:
+        Dictionary {n: path}
+    """
+    paths = {n: placeholder_dir / f"placeholder{n}.jpeg" for n in range(1, PLACEHOLDER_COUNT + 1)}
+    return {n: p for n, p in paths.items() if p.exists()}
+
+
+def build_source_index() -> Dict[str, Path]:
+    """All source images keyed by image key.
+
+    Municipality images use their slug; placeholders use "placeholder{n}".
+
+    Returns:
+        Dictionary {image key: source path}
+    """
+    sources = dict(build_image_index())
+    sources.update({f"placeholder{n}": p for n, p in build_placeholder_index().items()})
+    return sources
+
+
+def placeholder_number(nombre: str) -> int:
+    """Deterministic placeholder choice for a municipality.
+
+    Uses a stable checksum, so the same municipality gets the same
+    placeholder across sessions and processes without touching the global
+    random state.
+
+    Args:
+        nombre: Municipality name
+
+    Returns:
+        Placeholder number in 1..PLACEHOLDER_COUNT
+    """
+    return zlib.crc32(nombre.encode("utf-8")) % PLACEHOLDER_COUNT + 1
+
+
+@lru_cache(maxsize=IMAGE_CACHE_SIZE)
+def load_display_image(path: Path) -> Optional[bytes]:
+    """Decode, downscale and re-encode an image once.
+
+    Args:
+        path: Image file
+
+    Returns:
+        JPEG bytes no larger than DISPLAY_MAX_SIZE, or None if unreadable
+    """
+    try:
+        with Image.open(path) as img:
+            img = img.convert("RGB")
+            img.thumbnail(DISPLAY_MAX_SIZE, Image.Resampling.LANCZOS)
+            buffer = BytesIO()
+            img.save(buffer, "JPEG", quality=DISPLAY_JPEG_QUALITY, optimize=True)
+            return buffer.getvalue()
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=4)
+def load_derivative_manifest(derivatives_dir: Path = IMAGE_DERIVATIVES_DIR) -> Dict[str, Any]:
+    """Read the responsive derivative manifest, if it has been built.
+
+    Args:
+        derivatives_dir: Output directory of build_image_derivatives.py
+
+    Returns:
+        Dictionary {image key: entry with "variants"}, empty if not built
+    """
+    manifest_path = derivatives_dir / DERIVATIVES_MANIFEST
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path, encoding="utf-8") as f:
+        return json.load(f).get("images", {})
+
+
+def pick_variant(key: str, width: int, fmt: str = "jpeg") -> Optional[Dict[str, Any]]:
+    """Choose the smallest derivative at least `width` pixels wide.
+
+    Args:
+        key: Image key (slug or placeholder{n})
+        width: Display width in CSS pixels times device pixel ratio
+        fmt: Derivative format ("jpeg" or "webp")
+
+    Returns:
+        Variant record from the manifest, or None if there are no derivatives
+    """
+    entry = load_derivative_manifest().get(key)
+    if not entry:
+        return None
+    variants: List[Dict[str, Any]] = sorted(
+        (v for v in entry["variants"] if v["format"] == fmt), key=lambda v: v["width"]
+    )
+    if not variants:
+        return None
+    return next((v for v in variants if v["width"] >= width), variants[-1])
+
+
+@lru_cache(maxsize=IMAGE_CACHE_SIZE)
+def read_image_bytes(path: Path) -> Optional[bytes]:
+    """Read an already display-sized image file once.
+
+    Args:
+        path: Image file
+
+    Returns:
+        File bytes, or None if unreadable
+    """
+    try:
+        return path.read_bytes()
+    except OSError:
+        return None
+
+
+def image_key(nombre: str, slug: Optional[str] = None) -> Optional[str]:
+    """Image key for a municipality: its slug, or its placeholder.
+
+    Args:
+        nombre: Municipality name
+        slug: Precomputed slug (the dataset's slug column), derived if omitted
+
+    Returns:
+        Key into build_source_index(), or None if no image is available
+    """
+    slug = slug or slugify(nombre)
+    if slug in build_image_index():
+        return slug
+    number = placeholder_number(nombre)
+    if number in build_placeholder_index():
+        return f"placeholder{number}"
+    return None
+
+
+def get_municipality_image(
+    nombre: str, width: int = DISPLAY_MAX_SIZE[0], slug: Optional[str] = None
+) -> Optional[bytes]:
+    """Get real or placeholder image for municipality.
+
+    Serves a pre-built JPEG derivative when available, otherwise downscales
+    the source once. After the first call for a municipality this touches
+    neither the filesystem nor the image decoder.
+
+    Args:
+        nombre: Municipality name
+        width: Target display width in pixels
+        slug: Precomputed slug, derived from nombre if omitted
+
+    Returns:
+        JPEG bytes or None
+    """
+    key = image_key(nombre, slug)
+    if key is None:
+        return None
+    variant = pick_variant(key, width)
+    if variant is not None:
+        data = read_image_bytes(IMAGE_DERIVATIVES_DIR / variant["file"])
+        if data is not None:
+            return data
+    return load_display_image(build_source_index()[key])
+
+
+def _prefetch_one(nombre: str, width: int) -> None:
+    """Warm the caches for one municipality image (runs on the prefetch pool)."""
+    try:
+        get_municipality_image(nombre, width)
+    finally:
+        with _prefetch_lock:
+            _prefetch_pending.discard((nombre, width))
+
+
+def prefetch_municipality_images(nombres: Iterable[str], width: int = DISPLAY_MAX_SIZE[0]) -> None:
+    """Warm the image caches for municipalities about to be displayed.
+
+    Returns immediately; the slug lookup, file read and any downscaling run
+    on a shared thread pool so the next render finds the bytes in memory.
+    Images already queued are not submitted twice. Nothing is fetched when
+    cards use static URLs, since the browser loads those itself.
+
+    Args:
+        nombres: Municipality names
+        width: Target display width in pixels, as passed to get_municipality_image
+    """
+    if use_static_images():
+        return
+    with _prefetch_lock:
+        queued = [n for n in dict.fromkeys(nombres) if (n, width) not in _prefetch_pending]
+        _prefetch_pending.update((n, width) for n in queued)
+    for nombre in queued:
+        _prefetch_pool.submit(_prefetch_one, nombre, width)
+
+
+def use_static_images() -> bool:
+    """Whether cards should reference static URLs instead of pushing bytes.
+
+    Returns:
+        True in "static" mode, or in "auto" mode once derivatives exist
+    """
+    if IMAGE_MODE == "static":
+        return True
+    return IMAGE_MODE == "auto" and bool(load_derivative_manifest())
+
+
+def static_image_sources(nombre: str, slug: Optional[str] = None) -> Optional[Dict[str, str]]:
+    """Responsive static URLs for a municipality image.
+
+    Derivative file names embed their content hash, so the URLs never
+    change for the same bytes and can be cached indefinitely.
+
+    Args:
+        nombre: Municipality name
+        slug: Precomputed slug, derived from nombre if omitted
+
+    Returns:
+        Dictionary with "webp" and "jpeg" srcset strings and a fallback "src",
+        or None if no derivatives exist for this image
+    """
+    key = image_key(nombre, slug)
+    entry = load_derivative_manifest().get(key) if key else None
+    if not entry:
+        return None
+
+    base = f"{STATIC_BASE_URL}/{IMAGE_DERIVATIVES_DIR.relative_to(STATIC_DIR).as_posix()}"
+    srcsets: Dict[str, str] = {}
+    for fmt in DERIVATIVE_FORMATS:
+        variants = sorted((v for v in entry["variants"] if v["format"] == fmt), key=lambda v: v["width"])
+        srcsets[fmt] = ", ".join(f"{base}/{v['file']} {v['width']}w" for v in variants)
+
+    fallback = pick_variant(key, DISPLAY_MAX_SIZE[0] // 2)
+    srcsets["src"] = f"{base}/{fallback['file']}" if fallback else ""
+    return srcsets
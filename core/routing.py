@@ -0,0 +1,466 @@
+# core/routing.py
+"""Offline travel times from a local road/transit graph.
+
+Recomputes the ACC_* travel-time columns without any external service:
+
+    nodes.csv       node, lon, lat
+    edges.csv       source, target, minutes[, mode][, oneway]
+    facilities.csv  service, lon, lat
+
+Edges without a mode are "coche" and are traversable both ways unless
+oneway is 1. Facility services are ACC service keys ("pharmacy", "gp",
+"edu_prim_public", or discovered keys such as
+"sanidad_OfertaAsistencial_OdontologiaEstomatologia").
+
+Each mode's graph is stored as CSR arrays. For every (service, mode) a
+multi-source Dijkstra starts at all facilities of that service at once and
+stops as soon as every municipality centroid is settled, so one search
+gives the time to the nearest facility from every municipality. Searches
+run in parallel across services in a process pool. Facilities and
+centroids are snapped to their nearest graph node with a grid index.
+"""
+
+import heapq
+import math
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pyproj import Transformer
+
+from config.constants import TRAVEL_MODES, acc_column_name
+from core.boundaries import METRIC_CRS
+
+# Default mode of edges.csv rows without a mode column
+DEFAULT_EDGE_MODE: str = "coche"
+
+# Target number of graph nodes per grid cell of the snapping index
+NODES_PER_CELL: int = 4
+
+# Largest grid span in cells, across points and queries (see build_grid_index)
+GRID_MAX_SPAN: int = 4096
+
+# Query × point distances per chunk of the brute-force nearest search
+BRUTE_FORCE_PAIRS: int = 1 << 22
+
+Graph = Dict[str, np.ndarray]
+
+# Graph of the worker process, as Python lists (set by _init_worker)
+_worker_graphs: Dict[str, Tuple[List[int], List[int], List[float]]] = {}
+
+
+def project(lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+    """WGS84 coordinates to METRIC_CRS metres.
+
+    Returns:
+        float64 array shaped (points, 2)
+    """
+    transformer = Transformer.from_crs("EPSG:4326", METRIC_CRS, always_xy=True)
+    x, y = transformer.transform(np.asarray(lon, np.float64), np.asarray(lat, np.float64))
+    return np.column_stack([x, y])
+
+
+def build_csr(n_nodes: int, sources: np.ndarray, targets: np.ndarray, minutes: np.ndarray) -> Graph:
+    """Compressed sparse row adjacency of a directed graph.
+
+    Args:
+        n_nodes: Number of nodes (ids are 0..n_nodes-1)
+        sources, targets: Edge endpoints
+        minutes: Edge travel times
+
+    Returns:
+        Dictionary with "indptr" (n_nodes + 1), "indices" and "weights";
+        the out-edges of node u are indptr[u]:indptr[u + 1]
+    """
+    order = np.argsort(sources, kind="stable")
+    counts = np.bincount(sources, minlength=n_nodes)
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return {
+        "indptr": indptr,
+        "indices": targets[order].astype(np.int64),
+        "weights": minutes[order].astype(np.float64),
+    }
+
+
+def reverse_graph(graph: Graph) -> Graph:
+    """Same graph with every edge pointing the other way.
+
+    A search from a node on the reversed graph gives the time from every
+    other node to it.
+    """
+    n_nodes = len(graph["indptr"]) - 1
+    sources = np.repeat(np.arange(n_nodes), np.diff(graph["indptr"]))
+    return build_csr(n_nodes, graph["indices"], sources, graph["weights"])
+
+
+def load_graphs(nodes_path: Path, edges_path: Path) -> Tuple[np.ndarray, Dict[str, Graph]]:
+    """Read the node and edge lists into one CSR graph per travel mode.
+
+    Args:
+        nodes_path: CSV with node, lon, lat
+        edges_path: CSV with source, target, minutes and optional mode, oneway
+
+    Returns:
+        Tuple of (node coordinates in METRIC_CRS shaped (nodes, 2),
+        {mode: graph}) with node ids renumbered to row positions
+
+    Raises:
+        ValueError: If an edge references an unknown node
+    """
+    nodes = pd.read_csv(nodes_path, usecols=["node", "lon", "lat"])
+    position = pd.Series(np.arange(len(nodes)), index=nodes["node"].to_numpy())
+
+    edges = pd.read_csv(edges_path)
+    if "mode" not in edges.columns:
+        edges["mode"] = DEFAULT_EDGE_MODE
+    if "oneway" not in edges.columns:
+        edges["oneway"] = 0
+    src = position.reindex(edges["source"].to_numpy()).to_numpy()
+    dst = position.reindex(edges["target"].to_numpy()).to_numpy()
+    if np.isnan(src).any() or np.isnan(dst).any():
+        raise ValueError(f"{edges_path.name} references nodes missing from {nodes_path.name}")
+    src, dst = src.astype(np.int64), dst.astype(np.int64)
+
+    graphs: Dict[str, Graph] = {}
+    for mode in TRAVEL_MODES:
+        rows = (edges["mode"] == mode).to_numpy()
+        if not rows.any():
+            continue
+        both = rows & (edges["oneway"].to_numpy() == 0)
+        graphs[mode] = build_csr(
+            len(nodes),
+            np.concatenate([src[rows], dst[both]]),
+            np.concatenate([dst[rows], src[both]]),
+            np.concatenate([edges["minutes"].to_numpy()[rows], edges["minutes"].to_numpy()[both]]),
+        )
+    return project(nodes["lon"], nodes["lat"]), graphs
+
+
+def build_grid_index(
+    points: np.ndarray,
+    per_cell: int = NODES_PER_CELL,
+    queries: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    """Uniform grid over points for nearest-neighbour queries.
+
+    The cell size targets per_cell points per occupied cell, with two
+    floors: thin layouts (e.g. points along one road) are sized along their
+    long side, and when the queries are known the grid spans at most
+    GRID_MAX_SPAN cells across points and queries together, so that a query
+    far from every point is a bounded number of rings away.
+
+    Args:
+        points: Metric coordinates shaped (points, 2)
+        per_cell: Target points per occupied cell
+        queries: Metric coordinates of the queries to be run, if known
+
+    Returns:
+        Dictionary with the cell size, origin, span (last cell along each
+        axis), point order sorted by cell, and the sorted keys of occupied
+        cells with their start/end slices into that order
+    """
+    lo = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - lo, 1.0)
+    cell = max(
+        math.sqrt(extent[0] * extent[1] * per_cell / len(points)),
+        extent.max() * per_cell / len(points),
+        1.0,
+    )
+    if queries is not None and len(queries):
+        both = np.vstack([points, queries])
+        cell = max(cell, float((both.max(axis=0) - both.min(axis=0)).max()) / GRID_MAX_SPAN)
+    cells = np.floor((points - lo) / cell).astype(np.int64)
+    keys = _cell_keys(cells)
+    order = np.argsort(keys, kind="stable")
+    unique, starts = np.unique(keys[order], return_index=True)
+    return {
+        "cell": cell,
+        "origin": lo,
+        "span": cells.max(axis=0),
+        "points": points,
+        "order": order,
+        "keys": unique,
+        "starts": starts,
+        "ends": np.append(starts[1:], len(order)),
+    }
+
+
+def _cell_keys(cells: np.ndarray) -> np.ndarray:
+    """Single int64 key per (x, y) grid cell."""
+    return cells[..., 0] * (1 << 32) + cells[..., 1]
+
+
+def _ring_offsets(ring: int) -> np.ndarray:
+    """Cell offsets at Chebyshev distance ring, shaped (cells, 2)."""
+    if ring == 0:
+        return np.zeros((1, 2), dtype=np.int64)
+    side = np.arange(-ring, ring + 1)
+    inner = side[1:-1]
+    return np.concatenate([
+        np.column_stack([side, np.full_like(side, -ring)]),
+        np.column_stack([side, np.full_like(side, ring)]),
+        np.column_stack([np.full_like(inner, -ring), inner]),
+        np.column_stack([np.full_like(inner, ring), inner]),
+    ])
+
+
+def k_nearest_points(index: Dict[str, Any], queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """The k nearest indexed points of each query, closest first.
+
+    All queries search one ring of grid cells at a time, vectorized; a query
+    stops once its k-th closest candidate is nearer than any point outside
+    the cells searched so far, or once its rings cover the whole grid.
+    Queries far from the points (a single POI, a dense cluster, a thin
+    layout) would need very many rings, so once the cells searched per query
+    outnumber the occupied cells the remaining queries are answered by brute
+    force, which then costs about as much as the rings already searched.
+
+    Args:
+        index: Output of build_grid_index
+        queries: Metric coordinates shaped (queries, 2)
+        k: Neighbours per query (capped at the number of points)
+
+    Returns:
+        Tuple of (point positions, distances in metres), both shaped
+        (queries, k)
+    """
+    cell, points, order = index["cell"], index["points"], index["order"]
+    keys, starts, ends = index["keys"], index["starts"], index["ends"]
+    k = min(k, len(points))
+    scaled = (queries - index["origin"]) / cell
+    query_cells = np.floor(scaled).astype(np.int64)
+    # Distance from each query to the nearest edge of its own cell
+    edge = np.minimum(scaled - query_cells, 1 - (scaled - query_cells)).min(axis=1) * cell
+    # Ring at which the search has covered every cell of the grid
+    covered = np.maximum(query_cells, index["span"] - query_cells).max(axis=1)
+    nearest = np.full((len(queries), k), -1, dtype=np.int64)
+    distance = np.full((len(queries), k), np.inf)
+
+    active = np.arange(len(queries))
+    ring = 0
+    while len(active):
+        # Cells searched per query once this ring is done
+        if (2 * ring + 1) ** 2 > len(keys):
+            _brute_force_nearest(points, queries, active, nearest, distance)
+            break
+        # Occupied cells of this ring around every active query
+        ring_keys = _cell_keys(query_cells[active][:, None, :] + _ring_offsets(ring)[None])
+        pos = np.minimum(np.searchsorted(keys, ring_keys), len(keys) - 1)
+        owner, slot = np.nonzero(keys[pos] == ring_keys)
+        cell_pos = pos[owner, slot]
+
+        # Flatten their point slices into (owner, candidate) pairs
+        lengths = ends[cell_pos] - starts[cell_pos]
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        candidates = order[np.repeat(starts[cell_pos], lengths) + offsets]
+        owner = np.repeat(owner, lengths)
+        d = np.hypot(*(points[candidates] - queries[active[owner]]).T)
+
+        # Merge with the current best k of each query (padding included)
+        all_owner = np.concatenate([np.repeat(np.arange(len(active)), k), owner])
+        all_ids = np.concatenate([nearest[active].ravel(), candidates])
+        all_d = np.concatenate([distance[active].ravel(), d])
+        # One float sort key: owner, then distance as a fraction below 1
+        # (much faster than lexsort); padding sorts last within its owner
+        finite = all_d[np.isfinite(all_d)]
+        scale = 2.0 * (finite.max() + 1.0) if len(finite) else 1.0
+        by_owner = np.argsort(all_owner + np.minimum(all_d / scale, 0.75))
+        first = np.searchsorted(all_owner[by_owner], np.arange(len(active)))
+        rank = np.arange(len(by_owner)) - np.repeat(first, np.diff(np.append(first, len(by_owner))))
+        keep = by_owner[rank < k]
+        nearest[active] = all_ids[keep].reshape(-1, k)
+        distance[active] = all_d[keep].reshape(-1, k)
+
+        # Points beyond this ring are at least ring cells plus the edge away
+        pending = (distance[active, k - 1] > ring * cell + edge[active]) & (covered[active] > ring)
+        active = active[pending]
+        ring += 1
+    return nearest, distance
+
+
+def _brute_force_nearest(
+    points: np.ndarray,
+    queries: np.ndarray,
+    active: np.ndarray,
+    nearest: np.ndarray,
+    distance: np.ndarray,
+) -> None:
+    """Fill the k nearest points of the active queries from all points, in chunks."""
+    k = nearest.shape[1]
+    chunk = max(1, BRUTE_FORCE_PAIRS // len(points))
+    for i in range(0, len(active), chunk):
+        rows = active[i:i + chunk]
+        d = np.hypot(
+            queries[rows, 0, None] - points[None, :, 0],
+            queries[rows, 1, None] - points[None, :, 1],
+        )
+        ids = np.argpartition(d, k - 1, axis=1)[:, :k]
+        top = np.take_along_axis(d, ids, axis=1)
+        by_distance = np.argsort(top, axis=1, kind="stable")
+        nearest[rows] = np.take_along_axis(ids, by_distance, axis=1)
+        distance[rows] = np.take_along_axis(top, by_distance, axis=1)
+
+
+def nearest_points(index: Dict[str, Any], queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Nearest indexed point of each query.
+
+    Args:
+        index: Output of build_grid_index
+        queries: Metric coordinates shaped (queries, 2)
+
+    Returns:
+        Tuple of (point positions, distances in metres)
+    """
+    nearest, distance = k_nearest_points(index, queries, 1)
+    return nearest[:, 0], distance[:, 0]
+
+
+def multi_source_dijkstra(
+    indptr: List[int],
+    indices: List[int],
+    weights: List[float],
+    sources: List[int],
+    targets: List[int],
+    max_minutes: float = math.inf,
+) -> Dict[int, float]:
+    """Shortest time from the nearest source to each target node.
+
+    Args:
+        indptr, indices, weights: CSR graph as Python lists (list indexing
+            is several times faster than NumPy scalar access in this loop)
+        sources: Start nodes, all at time 0
+        targets: Nodes whose times are wanted; the search stops once all
+            of them are settled
+        max_minutes: Search radius; farther targets count as unreachable
+
+    Returns:
+        Dictionary {target: minutes}; unreachable targets are missing
+    """
+    dist: Dict[int, float] = {s: 0.0 for s in sources}
+    heap = [(0.0, s) for s in dist]
+    heapq.heapify(heap)
+    pending = set(targets)
+    settled: Dict[int, float] = {}
+
+    while heap and pending:
+        d, u = heapq.heappop(heap)
+        if d > max_minutes:
+            break
+        if u in settled:
+            continue
+        settled[u] = d
+        pending.discard(u)
+        for k in range(indptr[u], indptr[u + 1]):
+            v = indices[k]
+            nd = d + weights[k]
+            if nd < dist.get(v, math.inf):
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+
+    return {t: settled[t] for t in targets if t in settled}
+
+
+def _init_worker(graphs: Dict[str, Graph]) -> None:
+    """Convert the graphs to Python lists once per worker process."""
+    _worker_graphs.clear()
+    for mode, graph in graphs.items():
+        _worker_graphs[mode] = (graph["indptr"].tolist(), graph["indices"].tolist(), graph["weights"].tolist())
+
+
+def _route_task(task: Tuple[str, List[int], List[int], float]) -> Dict[int, float]:
+    """Run one (mode, sources, targets, max_minutes) search in a worker process."""
+    mode, sources, targets, max_minutes = task
+    return multi_source_dijkstra(*_worker_graphs[mode], sources, targets, max_minutes)
+
+
+def run_searches(
+    graphs: Dict[str, Graph],
+    tasks: List[Tuple[str, List[int], List[int], float]],
+    workers: Optional[int] = None,
+) -> List[Dict[int, float]]:
+    """Run searches in a process pool sharing the graphs (1 worker runs in-process).
+
+    Args:
+        graphs: {mode: graph}
+        tasks: (mode, sources, targets, max_minutes) per search
+        workers: Process pool size
+
+    Returns:
+        Output of multi_source_dijkstra for each task, in order
+    """
+    if workers == 1 or len(tasks) <= 1:
+        _init_worker(graphs)
+        return [_route_task(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(graphs,)) as pool:
+        # Batches amortize inter-process overhead over thousands of short searches
+        return list(pool.map(_route_task, tasks, chunksize=max(1, len(tasks) // 64)))
+
+
+def compute_travel_times(
+    nodes_path: Path,
+    edges_path: Path,
+    facilities_path: Path,
+    centroids: pd.DataFrame,
+    workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """Minutes from every municipality to the nearest facility of each service.
+
+    Args:
+        nodes_path: CSV with node, lon, lat
+        edges_path: CSV with source, target, minutes[, mode][, oneway]
+        facilities_path: CSV with service, lon, lat
+        centroids: Municipality centroids (centroid_lon, centroid_lat)
+            indexed by INE code
+        workers: Process pool size (1 runs in-process)
+
+    Returns:
+        DataFrame with codigo and one ACC column per (service, mode) with
+        facilities and edges; NaN where no facility is reachable
+    """
+    coords, graphs = load_graphs(nodes_path, edges_path)
+    origins = project(centroids["centroid_lon"], centroids["centroid_lat"])
+    facilities = pd.read_csv(facilities_path, usecols=["service", "lon", "lat"])
+    facility_points = project(facilities["lon"], facilities["lat"])
+    grid = build_grid_index(coords, queries=np.vstack([origins, facility_points]))
+
+    origin_nodes, _ = nearest_points(grid, origins)
+    facility_nodes, _ = nearest_points(grid, facility_points)
+    targets = sorted(set(origin_nodes.tolist()))
+
+    # One search per output column; services sharing a column keep the first
+    tasks: Dict[str, Tuple[str, List[int], List[int], float]] = {}
+    for service, service_nodes in pd.Series(facility_nodes).groupby(facilities["service"].to_numpy()):
+        for mode in graphs:
+            column = acc_column_name(str(service), mode)
+            if column is not None and column not in tasks:
+                tasks[column] = (mode, sorted(set(service_nodes.tolist())), targets, math.inf)
+    results = run_searches(graphs, list(tasks.values()), workers)
+
+    out = pd.DataFrame({"codigo": centroids.index.to_numpy()})
+    for column, times in zip(tasks, results):
+        out[column] = [times.get(node, np.nan) for node in origin_nodes.tolist()]
+    return out
+
+
+def apply_travel_times(df: pd.DataFrame, times: pd.DataFrame) -> pd.DataFrame:
+    """Overwrite dataset travel-time columns with routed values.
+
+    Municipalities the routing did not reach (or did not cover) keep their
+    previous value; columns new to the dataset are added.
+
+    Args:
+        df: Dataset with a codigo column
+        times: Output of compute_travel_times
+
+    Returns:
+        New DataFrame
+    """
+    routed = times.set_index("codigo").reindex(df["codigo"].to_numpy())
+    df = df.copy()
+    for column in routed.columns:
+        values = routed[column].to_numpy()
+        df[column] = np.where(np.isnan(values), df[column], values) if column in df.columns else values
+    return df
@@ -3,73 +3,132 @@
 
 import numpy as np
 import pandas as pd
-from typing import Dict
+from typing import Any, Dict, Optional
 
 
-def normalize_criteria(
+def scoring_frame(
     df: pd.DataFrame,
+    rows: np.ndarray,
     benefit_cols: Dict[str, str],
     cost_cols: Dict[str, str],
-    accessibility_col: str = "AccessibilityHoursWeekly",
-) -> pd.DataFrame:
+    accessibility_hours: np.ndarray,
+    breakdown: Optional[pd.DataFrame] = None,
+) -> Dict[str, Any]:
+    """Gather the raw criterion values of the selected municipalities.
+
+    The scoring frame holds one contiguous (municipalities × criteria) array
+    so that normalization and scoring are whole-array operations; the input
+    frames are only referenced, and materialize_scores builds the display
+    DataFrame once at the end.
+
+    Args:
+        df: Municipality dataset indexed by codigo (not modified)
+        rows: Positions in df of the municipalities to score
+        benefit_cols: Mapping {criterion: column_name} for benefits
+        cost_cols: Mapping {criterion: column_name} for costs
+        accessibility_hours: Weekly accessibility hours aligned with df rows
+        breakdown: Accessibility breakdown columns aligned with df rows,
+            appended to the display DataFrame
+
+    Returns:
+        Dictionary with "data", "breakdown", "rows", "codes", "criteria",
+        "cost" (bool mask per criterion) and "values" (float64, n × c)
+    """
+    columns = [df[col] for col in benefit_cols.values()] + [df[col] for col in cost_cols.values()]
+    criteria = list(benefit_cols) + list(cost_cols) + ["AccessibilityHoursWeekly"]
+    values = np.empty((len(rows), len(criteria)), dtype=np.float64)
+    for j, col in enumerate(columns):
+        values[:, j] = col.to_numpy(np.float64)[rows]
+    values[:, -1] = np.asarray(accessibility_hours, dtype=np.float64)[rows]
+    return {
+        "data": df,
+        "breakdown": breakdown,
+        "rows": rows,
+        "codes": df.index.to_numpy()[rows],
+        "criteria": criteria,
+        "cost": np.arange(len(criteria)) >= len(benefit_cols),
+        "values": values,
+    }
+
+
+def normalize_frame(frame: Dict[str, Any]) -> Dict[str, Any]:
     """Normalize all criteria to [0,1] with higher=better.
     
     Benefit criteria: (x - min) / (max - min)
     Cost criteria: 1 - (x - min) / (max - min)
     
     Args:
-        df: Municipality dataset
-        benefit_cols: Mapping {criterion: column_name} for benefits
-        cost_cols: Mapping {criterion: column_name} for costs
-        accessibility_col: Name of accessibility hours column
+        frame: Output of scoring_frame
         
     Returns:
-        DataFrame with NORM_{criterion} columns added
+        The frame with "norm" (n × c) added
     """
-    out = df.copy()
-
-    # Normalize benefits (higher is better)
-    for crit, col in benefit_cols.items():
-        x = out[col].astype(float)
-        rng = x.max() - x.min()
-        out[f"NORM_{crit}"] = (x - x.min()) / (rng if rng != 0 else 1.0)
-
-    # Normalize costs (lower is better → invert)
-    xp = out[cost_cols["HousePriceSqm"]].astype(float)
-    prng = xp.max() - xp.min()
-    out["NORM_HousePriceSqm"] = 1.0 - (xp - xp.min()) / (prng if prng != 0 else 1.0)
+    values = frame["values"]
+    if len(values):
+        lo = np.nanmin(values, axis=0)
+        rng = np.nanmax(values, axis=0) - lo
+        norm = (values - lo) / np.where(rng != 0, rng, 1.0)
+    else:
+        norm = values.copy()
 
-    xa = out[accessibility_col].astype(float)
-    arng = xa.max() - xa.min()
-    out["NORM_AccessibilityHoursWeekly"] = 1.0 - (xa - xa.min()) / (arng if arng != 0 else 1.0)
+    # Costs: lower is better → invert
+    norm[:, frame["cost"]] = 1.0 - norm[:, frame["cost"]]
+    frame["norm"] = norm
+    return frame
 
-    return out
 
-
-def compute_scores(df_norm: pd.DataFrame, weights: Dict[str, float]) -> pd.DataFrame:
+def score_frame(frame: Dict[str, Any], weights: Dict[str, float]) -> Dict[str, Any]:
     """Compute weighted scores and rank municipalities.
     
     Args:
-        df_norm: Normalized dataset with NORM_{criterion} columns
+        frame: Output of normalize_frame
         weights: Mapping {criterion: weight} (should sum to 1)
         
     Returns:
-        Sorted DataFrame with Score, weighted_score, and CONTRIB_{criterion} columns
+        The frame with "contrib" (n × c), "score", "weighted_score" and
+        "order" (positions sorted by Score, best first) added
     """
-    out = df_norm.copy()
-    score = np.zeros(len(out), dtype=float)
+    w = np.array([float(weights.get(crit, 0.0)) for crit in frame["criteria"]])
+    contrib = frame["norm"] * w
+    score = contrib.sum(axis=1)
+    max_score = np.nanmax(score) if len(score) else 0.0
+
+    frame["contrib"] = contrib
+    frame["score"] = score
+    frame["weighted_score"] = score / max_score * 100.0 if max_score > 0 else np.zeros_like(score)
+    # Stable sort of the negated scores keeps ties in dataset order, NaN last
+    frame["order"] = np.argsort(-score, kind="stable")
+    return frame
 
-    for crit, w in weights.items():
-        w = float(w)
-        col = f"NORM_{crit}"
-        contrib = w * out[col].astype(float)
-        out[f"CONTRIB_{crit}"] = contrib
-        score += contrib.values
 
-    out["Score"] = score
-    max_score = out["Score"].max()
-    out["weighted_score"] = (out["Score"] / max_score * 100.0) if max_score > 0 else 0.0
-    return out.sort_values("Score", ascending=False).reset_index(drop=True)
+def materialize_scores(frame: Dict[str, Any]) -> pd.DataFrame:
+    """Build the display DataFrame of a scored frame.
+    
+    Args:
+        frame: Output of score_frame
+        
+    Returns:
+        DataFrame sorted by Score (indexed by codigo) with the dataset and
+        breakdown columns, NORM_{criterion}, CONTRIB_{criterion}, Score and
+        weighted_score
+    """
+    order = frame["order"]
+    positions = frame["rows"][order]
+    criteria = frame["criteria"]
+    scores = pd.DataFrame(
+        np.hstack([
+            frame["norm"][order],
+            frame["contrib"][order],
+            frame["score"][order, None],
+            frame["weighted_score"][order, None],
+        ]),
+        index=frame["data"].index[positions],
+        columns=[f"NORM_{c}" for c in criteria] + [f"CONTRIB_{c}" for c in criteria] + ["Score", "weighted_score"],
+    )
+    blocks = [frame["data"].take(positions)]
+    if frame["breakdown"] is not None:
+        blocks.append(frame["breakdown"].take(positions))
+    return pd.concat(blocks + [scores], axis=1)
 
 
 def equal_weights(criteria: list) -> Dict[str, float]:
@@ -83,3 +142,15 @@ def equal_weights(criteria: list) -> Dict[str, float]:
     """
     w = 1.0 / len(criteria)
     return {c: w for c in criteria}
+
+
+def rank_positions(frame: Dict[str, Any]) -> pd.Series:
+    """Ranking position of each municipality (1 = best).
+
+    Args:
+        frame: Output of score_frame
+
+    Returns:
+        Positions indexed by codigo
+    """
+    return pd.Series(np.arange(1, len(frame["order"]) + 1), index=frame["codes"][frame["order"]])
@@ -0,0 +1,243 @@
+# core/shared_store.py
+"""Read-only municipality data memory-mapped across server processes.
+
+The numeric dataset columns and pre-serialized GeoJSON features are written
+once to a versioned directory (ideally on tmpfs such as /dev/shm). Every
+Streamlit process maps the same files read-only, so the operating system
+keeps a single copy per host instead of one per replica.
+
+Layout of a store directory:
+    meta.json                       column names and dtypes, text columns
+    float32.npy / int32.npy         column-major matrices (one row per column)
+    geometries_{level}.json         concatenated feature JSON
+    geometries_{level}.offsets.npy  byte offsets of each feature (n + 1)
+    geometries_{level}.codes.npy    INE code of each feature
+    bboxes.npy                      feature bounding boxes at the coarsest level
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Bump when the layout changes to invalidate published stores
+SHARED_STORE_FORMAT_VERSION: int = 2
+
+STORE_META: str = "meta.json"
+
+
+def store_key(dataset_version: str, geometry_version: str) -> str:
+    """Directory name for a store built from given dataset and geometries.
+
+    Args:
+        dataset_version: Content version of the dataset
+        geometry_version: Content version of the map geometries
+
+    Returns:
+        Short hex key
+    """
+    digest = hashlib.sha256(f"{SHARED_STORE_FORMAT_VERSION}:{dataset_version}:{geometry_version}".encode())
+    return digest.hexdigest()[:16]
+
+
+def _write_geometry_level(collection: Dict[str, Any], out_dir: Path, level: str) -> np.ndarray:
+    """Serialize one level's features back to back and index their offsets.
+
+    Returns:
+        Feature bounding boxes, shape (n, 4)
+    """
+    codes: List[int] = []
+    offsets: List[int] = [0]
+    with open(out_dir / f"geometries_{level}.json", "wb") as f:
+        for feature in collection["features"]:
+            data = json.dumps(feature, separators=(",", ":")).encode("utf-8")
+            f.write(data)
+            codes.append(feature["id"])
+            offsets.append(offsets[-1] + len(data))
+    np.save(out_dir / f"geometries_{level}.offsets.npy", np.asarray(offsets, dtype=np.int64))
+    np.save(out_dir / f"geometries_{level}.codes.npy", np.asarray(codes, dtype=np.int32))
+    return np.asarray([f["bbox"] for f in collection["features"]], dtype=np.float64).reshape(-1, 4)
+
+
+def publish_shared_store(
+    df: pd.DataFrame,
+    collections: Dict[str, Dict[str, Any]],
+    root: Path,
+    key: str,
+    bbox_level: str,
+) -> Path:
+    """Write a store atomically, unless it has already been published.
+
+    Several processes may publish the same key concurrently; each writes a
+    private temporary directory and the first rename wins. Stores with other
+    keys are removed afterwards (processes still mapping them keep their
+    open files until they restart).
+
+    Args:
+        df: Dataset with float32/int32 columns plus categorical text columns
+        collections: Output of build_geometry_levels
+        root: Parent directory of all stores
+        key: Output of store_key
+        bbox_level: Level whose feature bounding boxes are stored
+
+    Returns:
+        Path of the published store
+    """
+    store_dir = root / key
+    if (store_dir / STORE_META).exists():
+        return store_dir
+
+    root.mkdir(parents=True, exist_ok=True)
+    tmp_dir = root / f".{key}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir()
+
+    float_columns = [c for c in df.columns if df[c].dtype == np.float32]
+    int_columns = [c for c in df.columns if df[c].dtype == np.int32]
+    np.save(tmp_dir / "float32.npy", np.ascontiguousarray(df[float_columns].to_numpy(np.float32).T))
+    np.save(tmp_dir / "int32.npy", np.ascontiguousarray(df[int_columns].to_numpy(np.int32).T))
+
+    for level, collection in collections.items():
+        bboxes = _write_geometry_level(collection, tmp_dir, level)
+        if level == bbox_level:
+            np.save(tmp_dir / "bboxes.npy", bboxes)
+
+    meta = {
+        "version": SHARED_STORE_FORMAT_VERSION,
+        "rows": len(df),
+        "columns": list(df.columns),
+        "float_columns": float_columns,
+        "int_columns": int_columns,
+        "text_columns": {
+            c: df[c].astype(str).tolist() for c in df.columns if c not in float_columns and c not in int_columns
+        },
+        "levels": list(collections),
+        "bbox_level": bbox_level if bbox_level in collections else None,
+    }
+    with open(tmp_dir / STORE_META, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    try:
+        tmp_dir.rename(store_dir)
+    except OSError:
+        # Another process published the same store first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    for old in root.iterdir():
+        if old.is_dir() and old.name != key and not old.name.startswith("."):
+            shutil.rmtree(old, ignore_errors=True)
+    return store_dir
+
+
+def read_store_meta(store_dir: Path) -> Optional[Dict[str, Any]]:
+    """Metadata of a published store, or None if it is missing or outdated."""
+    meta_path = store_dir / STORE_META
+    if not meta_path.exists():
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    return meta if meta.get("version") == SHARED_STORE_FORMAT_VERSION else None
+
+
+def attach_shared_dataset(store_dir: Path) -> pd.DataFrame:
+    """Build a DataFrame whose numeric columns are read-only memory maps.
+
+    Each column is a contiguous row of the mapped matrix, so no numeric data
+    is copied into the process heap. Text columns (names, slugs) are small
+    and loaded as categoricals.
+
+    Args:
+        store_dir: Published store directory
+
+    Returns:
+        Dataset with the original column order
+    """
+    meta = read_store_meta(store_dir)
+    if meta is None:
+        raise FileNotFoundError(f"No shared store in {store_dir}")
+
+    columns: Dict[str, Any] = {}
+    for dtype, names in (("float32", meta["float_columns"]), ("int32", meta["int_columns"])):
+        if names:
+            matrix = np.load(store_dir / f"{dtype}.npy", mmap_mode="r")
+            columns.update({name: matrix[i] for i, name in enumerate(names)})
+    for name, values in meta["text_columns"].items():
+        columns[name] = pd.Categorical(values)
+
+    return pd.DataFrame({c: columns[c] for c in meta["columns"] if c in columns}, copy=False)
+
+
+def attach_shared_geometries(store_dir: Path) -> Dict[str, Any]:
+    """Map the pre-serialized geometry files of a store.
+
+    Args:
+        store_dir: Published store directory
+
+    Returns:
+        Dictionary with "levels" {level: {"codes", "offsets", "blob"}} and
+        "bbox_codes"/"bboxes" for the coarsest level
+    """
+    meta = read_store_meta(store_dir)
+    if meta is None:
+        raise FileNotFoundError(f"No shared store in {store_dir}")
+
+    levels = {
+        level: {
+            "codes": np.load(store_dir / f"geometries_{level}.codes.npy", mmap_mode="r"),
+            "offsets": np.load(store_dir / f"geometries_{level}.offsets.npy", mmap_mode="r"),
+            "blob": np.memmap(store_dir / f"geometries_{level}.json", dtype=np.uint8, mode="r"),
+        }
+        for level in meta["levels"]
+    }
+    bbox_level = meta["bbox_level"]
+    return {
+        "levels": levels,
+        "bbox_codes": levels[bbox_level]["codes"] if bbox_level else np.empty(0, dtype=np.int32),
+        "bboxes": np.load(store_dir / "bboxes.npy", mmap_mode="r") if bbox_level else np.empty((0, 4)),
+    }
+
+
+def shared_feature_collection(geometries: Dict[str, Any], level: str, codes: Iterable[int]) -> Dict[str, Any]:
+    """Decode only the requested features of one level.
+
+    Args:
+        geometries: Output of attach_shared_geometries
+        level: Level of detail
+        codes: INE codes to include
+
+    Returns:
+        GeoJSON FeatureCollection
+    """
+    entry = geometries["levels"][level]
+    offsets = entry["offsets"]
+    blob = entry["blob"]
+    positions = np.flatnonzero(np.isin(entry["codes"], np.fromiter(codes, dtype=np.int64)))
+    features = b",".join(blob[offsets[i]:offsets[i + 1]].tobytes() for i in positions)
+    return json.loads(b'{"type":"FeatureCollection","features":[' + features + b"]}")
+
+
+def shared_bounds(geometries: Dict[str, Any], codes: Iterable[int]) -> Optional[Tuple[float, float, float, float]]:
+    """Combined bounding box of the requested municipalities.
+
+    Args:
+        geometries: Output of attach_shared_geometries
+        codes: INE codes
+
+    Returns:
+        (minx, miny, maxx, maxy), or None if none of the codes has a geometry
+    """
+    mask = np.isin(geometries["bbox_codes"], np.fromiter(codes, dtype=np.int64))
+    if not mask.any():
+        return None
+    boxes = geometries["bboxes"][mask]
+    return (
+        float(boxes[:, 0].min()),
+        float(boxes[:, 1].min()),
+        float(boxes[:, 2].max()),
+        float(boxes[:, 3].max()),
+    )
@@ -0,0 +1,141 @@
+# core/snapshots.py
+"""Versioned dataset snapshots published by scripts/build.py.
+
+Each snapshot is an immutable directory named after the content hash of its
+dataset. CURRENT_SNAPSHOT points at the active one and is replaced
+atomically, so the app never sees a half-written dataset; caches keyed on
+the version are invalidated as soon as the pointer changes.
+
+A snapshot holds one dataset partition per padrón year
+(merged_dataset_{year}.csv); merged_dataset.csv is the latest year.
+"""
+
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from config.constants import DEFAULT_DATASET_YEAR
+from config.paths import CURRENT_SNAPSHOT, DATASET_CSV, SNAPSHOTS_DIR
+
+SNAPSHOT_DATASET: str = "merged_dataset.csv"
+
+_PARTITION_NAME = re.compile(r"^merged_dataset_(\d{4})\.csv$")
+
+
+def partition_name(year: int) -> str:
+    """File name of one year's dataset partition inside a snapshot."""
+    return f"merged_dataset_{year}.csv"
+
+
+def read_current_snapshot(pointer: Path = CURRENT_SNAPSHOT) -> Optional[Dict[str, str]]:
+    """Active snapshot record, or None if the pipeline has not published one.
+
+    Args:
+        pointer: CURRENT_SNAPSHOT file
+
+    Returns:
+        Dictionary with "version" and "path"
+    """
+    try:
+        with open(pointer, encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not (Path(record["path"]) / SNAPSHOT_DATASET).exists():
+        return None
+    return record
+
+
+def current_dataset(pointer: Path = CURRENT_SNAPSHOT, fallback: Path = DATASET_CSV) -> Tuple[Path, str]:
+    """Dataset file the app should load and its version.
+
+    Cheap enough to call on every rerun: it reads the small pointer file, or
+    stats the raw CSV when no snapshot has been published.
+
+    Args:
+        pointer: CURRENT_SNAPSHOT file
+        fallback: Raw dataset used without a snapshot
+
+    Returns:
+        Tuple of (CSV path, version string)
+    """
+    record = read_current_snapshot(pointer)
+    if record is not None:
+        return Path(record["path"]) / SNAPSHOT_DATASET, record["version"]
+    if not fallback.exists():
+        return fallback, "missing"
+    stat = fallback.stat()
+    return fallback, f"raw-{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def current_partitions(
+    pointer: Path = CURRENT_SNAPSHOT, fallback: Path = DATASET_CSV
+) -> Tuple[Dict[int, Path], str]:
+    """Dataset partition of every available year, without reading them.
+
+    Snapshots published before partitioning, and the raw fallback, expose
+    their single dataset as DEFAULT_DATASET_YEAR.
+
+    Args:
+        pointer: CURRENT_SNAPSHOT file
+        fallback: Raw dataset used without a snapshot
+
+    Returns:
+        Tuple of ({year: CSV path}, snapshot version)
+    """
+    path, version = current_dataset(pointer, fallback)
+    partitions = {}
+    if path != fallback:
+        for candidate in path.parent.iterdir():
+            match = _PARTITION_NAME.match(candidate.name)
+            if match:
+                partitions[int(match.group(1))] = candidate
+    return dict(sorted(partitions.items())) or {DEFAULT_DATASET_YEAR: path}, version
+
+
+def publish_snapshot(
+    files: Dict[str, Path],
+    version: str,
+    snapshots_dir: Path = SNAPSHOTS_DIR,
+    pointer: Path = CURRENT_SNAPSHOT,
+    keep: int = 3,
+) -> Path:
+    """Copy build outputs into a versioned snapshot and make it current.
+
+    Args:
+        files: Mapping {file name in snapshot: source path}
+        version: Snapshot version (content hash of the dataset)
+        snapshots_dir: Parent directory of all snapshots
+        pointer: CURRENT_SNAPSHOT file
+        keep: Number of most recent snapshots to retain
+
+    Returns:
+        Snapshot directory
+    """
+    snapshot_dir = snapshots_dir / version
+    if not snapshot_dir.exists():
+        tmp_dir = snapshots_dir / f".{version}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tmp_dir.mkdir(parents=True)
+        for name, source in files.items():
+            shutil.copy2(source, tmp_dir / name)
+        tmp_dir.rename(snapshot_dir)
+
+    tmp_pointer = pointer.with_suffix(".tmp")
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "path": str(snapshot_dir)}, f)
+    tmp_pointer.replace(pointer)
+    os.utime(snapshot_dir)
+
+    snapshots = sorted(
+        (d for d in snapshots_dir.iterdir() if d.is_dir() and not d.name.startswith(".")),
+        key=lambda d: d.stat().st_mtime,
+        reverse=True,
+    )
+    for old in snapshots[keep:]:
+        if old != snapshot_dir:
+            shutil.rmtree(old, ignore_errors=True)
+    return snapshot_dir
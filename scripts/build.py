@@ -0,0 +1,393 @@
+# scripts/build.py
+"""
+Incremental data build: demographics ETL / routing / gravity → merge → contract/validation → snapshot.
+
+Each stage is keyed by a hash of its code, parameters, input files and the
+outputs of the stages it depends on. Outputs are stored under that key in
+data/build/stages/, so a stage only reruns when something it reads has
+changed. The final dataset is published as an immutable, versioned snapshot
+in data/build/snapshots/ and data/build/CURRENT.json is switched to it
+atomically; the running app picks up the new version on its next rerun.
+
+The merge stage writes one dataset partition per padrón year (--years),
+so history can be added without the app loading it up front; the latest
+year is also published as merged_dataset.csv.
+
+The merged dataset is checked against the data contract (core/contract.py)
+and its result is published with the snapshot as contract.json; a dataset
+that breaks the contract is never published.
+
+When data/routing/ holds a road graph and facility locations, the routing
+stage recomputes the ACC_* travel times offline (core/routing.py) and the
+merge stage writes them over the columns of merged_dataset.csv. The
+gravity stage sums a distance decay over the nearest facilities of each
+service (core/gravity.py) and adds the optional ServiceOffer criterion.
+
+Stages whose external inputs are missing are skipped (e.g. without the raw
+INE file the existing demographic columns of merged_dataset.csv are kept).
+
+Usage:
+    python scripts/build.py
+    python scripts/build.py --force merge
+    python scripts/build.py --dry-run
+    python scripts/build.py --years 2020 2021 2022
+    python scripts/build.py --national
+"""
+
+import argparse
+import hashlib
+import json
+import shutil
+import sys
+import time
+from graphlib import TopologicalSorter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from clean_ine_demographics import (  # noqa: E402
+    DEFAULT_MAX_POPULATION,
+    clean_demographics_by_year,
+    drop_large_municipalities,
+)
+from config.constants import DEFAULT_DATASET_YEAR  # noqa: E402
+from config.paths import (  # noqa: E402
+    BOUNDARIES_SHP,
+    DATASET_CACHE_DIR,
+    DATASET_CSV,
+    FACILITIES_CSV,
+    INE_DEMOGRAPHICS_CSV,
+    ROAD_EDGES_CSV,
+    ROAD_NODES_CSV,
+    STAGE_CACHE_DIR,
+)
+from core.boundaries import MADRID_NUT2, municipality_centroids, municipality_codes, read_boundaries_shapefile  # noqa: E402
+from core.contract import CONTRACT_REPORT, contract_report  # noqa: E402
+from core.dataset import CSV_SEPARATOR, file_digest, load_dataset  # noqa: E402
+from core.gravity import GRAVITY_DECAY_M, GRAVITY_NEIGHBOURS, compute_gravity  # noqa: E402
+from core.routing import apply_travel_times, compute_travel_times  # noqa: E402
+from core.snapshots import (  # noqa: E402
+    SNAPSHOT_DATASET,
+    current_partitions,
+    partition_name,
+    publish_snapshot,
+    read_current_snapshot,
+)
+from merge_demographics import merge_demographics  # noqa: E402
+from validate_demographics import validate_demographics  # noqa: E402
+
+SCRIPTS_DIR = Path(__file__).parent
+CORE_DIR = SCRIPTS_DIR.parent / "core"
+
+
+def run_demographics(inputs: Dict[str, Optional[Path]], params: Dict[str, Any], output: Path) -> None:
+    """Aggregate the raw INE file into demographics_clean.csv (one row per municipality and year)."""
+    demo_df = clean_demographics_by_year(inputs["ine"], params["years"], params["provinces"])
+    demo_df = drop_large_municipalities(demo_df, params["max_population"])
+    demo_df.to_csv(output, index=False)
+
+
+def read_centroids(shp_path: Path, nut2: Optional[str]) -> pd.DataFrame:
+    """Municipality centroids indexed by INE code."""
+    gdf = read_boundaries_shapefile(shp_path, nut2)
+    gdf.index = pd.Index(municipality_codes(gdf).to_numpy())
+    return municipality_centroids(gdf)
+
+
+def run_routing(inputs: Dict[str, Optional[Path]], params: Dict[str, Any], output: Path) -> None:
+    """Route from every municipality centroid to the nearest facility of each service."""
+    centroids = read_centroids(inputs["boundaries"], params["nut2"])
+    times = compute_travel_times(inputs["nodes"], inputs["edges"], inputs["facilities"], centroids)
+    times.to_csv(output, index=False)
+
+
+def run_gravity(inputs: Dict[str, Optional[Path]], params: Dict[str, Any], output: Path) -> None:
+    """Sum the distance decay over the nearest facilities of each service."""
+    centroids = read_centroids(inputs["boundaries"], params["nut2"])
+    gravity = compute_gravity(inputs["facilities"], centroids, params["neighbours"], params["decay_m"])
+    gravity.to_csv(output, index=False)
+
+
+def run_merge(inputs: Dict[str, Optional[Path]], params: Dict[str, Any], output: Path) -> None:
+    """Write one merged dataset partition per year (or pass the master through)."""
+    output.mkdir()
+    master_df = pd.read_csv(inputs["base"], sep=CSV_SEPARATOR)
+    if inputs["routing"] is not None:
+        master_df = apply_travel_times(master_df, pd.read_csv(inputs["routing"]))
+    if inputs["gravity"] is not None:
+        gravity = pd.read_csv(inputs["gravity"])
+        columns = [c for c in gravity.columns if c != "codigo"]
+        master_df = master_df.drop(columns=columns, errors="ignore").merge(gravity, on="codigo", how="left")
+        # Municipalities without a boundary have no facilities nearby
+        master_df[columns] = master_df[columns].fillna(0.0)
+    if inputs["demographics"] is not None:
+        demo_df = pd.read_csv(inputs["demographics"])
+        partitions = {
+            int(year): merge_demographics(master_df, year_df.drop(columns=["year"]))
+            for year, year_df in demo_df.groupby("year")
+        }
+    else:
+        partitions = {params["base_year"]: master_df.drop_duplicates(subset=["codigo"], keep="first")}
+
+    for year, merged in partitions.items():
+        merged.to_csv(output / partition_name(year), index=False, sep=CSV_SEPARATOR)
+    shutil.copy2(output / partition_name(max(partitions)), output / SNAPSHOT_DATASET)
+
+
+def read_partitions(dataset_dir: Path) -> Dict[str, pd.DataFrame]:
+    """Read every yearly partition written by run_merge."""
+    return {
+        path.name: pd.read_csv(path, sep=CSV_SEPARATOR)
+        for path in sorted(dataset_dir.glob("*.csv"))
+        if path.name != SNAPSHOT_DATASET
+    }
+
+
+def run_contract(inputs: Dict[str, Optional[Path]], params: Dict[str, Any], output: Path) -> None:
+    """Evaluate the data contract on every partition and write the stamp."""
+    report = contract_report(read_partitions(inputs["merge"]))
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def run_validation(inputs: Dict[str, Optional[Path]], params: Dict[str, Any], output: Path) -> None:
+    """Write the demographics consistency report for the latest year as JSON."""
+    master_df = pd.read_csv(inputs["merge"] / SNAPSHOT_DATASET, sep=CSV_SEPARATOR)
+    if inputs["demographics"] is not None:
+        demo_df = pd.read_csv(inputs["demographics"])
+        demo_df = demo_df[demo_df["year"] == demo_df["year"].max()].drop(columns=["year"])
+    else:
+        demo_df = master_df[["codigo", "Nombre"] + [c for c in master_df.columns if c.startswith("DEM_")]]
+    report = validate_demographics(demo_df, master_df)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+# Stage graph. "inputs" are source files, "deps" are upstream stages whose
+# outputs are passed under the stage name; "optional" deps may be skipped.
+STAGES: Dict[str, Dict[str, Any]] = {
+    "demographics": {
+        "run": run_demographics,
+        "code": [SCRIPTS_DIR / "clean_ine_demographics.py"],
+        "inputs": {"ine": INE_DEMOGRAPHICS_CSV},
+        "deps": [],
+        "params": {"years": [DEFAULT_DATASET_YEAR], "provinces": ["28"], "max_population": DEFAULT_MAX_POPULATION},
+        "output": "demographics_clean.csv",
+    },
+    "routing": {
+        "run": run_routing,
+        "code": [CORE_DIR / "routing.py", CORE_DIR / "boundaries.py"],
+        "inputs": {
+            "nodes": ROAD_NODES_CSV,
+            "edges": ROAD_EDGES_CSV,
+            "facilities": FACILITIES_CSV,
+            "boundaries": BOUNDARIES_SHP,
+        },
+        "deps": [],
+        "params": {"nut2": MADRID_NUT2},
+        "output": "routing.csv",
+    },
+    "gravity": {
+        "run": run_gravity,
+        "code": [CORE_DIR / "gravity.py", CORE_DIR / "routing.py", CORE_DIR / "boundaries.py"],
+        "inputs": {"facilities": FACILITIES_CSV, "boundaries": BOUNDARIES_SHP},
+        "deps": [],
+        "params": {"nut2": MADRID_NUT2, "neighbours": GRAVITY_NEIGHBOURS, "decay_m": GRAVITY_DECAY_M},
+        "output": "gravity.csv",
+    },
+    "merge": {
+        "run": run_merge,
+        "code": [SCRIPTS_DIR / "merge_demographics.py"],
+        "inputs": {"base": DATASET_CSV},
+        "deps": ["demographics", "routing", "gravity"],
+        "optional": ["demographics", "routing", "gravity"],
+        "params": {"base_year": DEFAULT_DATASET_YEAR},
+        "output": "dataset",
+    },
+    "contract": {
+        "run": run_contract,
+        "code": [CORE_DIR / "contract.py", SCRIPTS_DIR.parent / "config" / "constants.py"],
+        "inputs": {},
+        "deps": ["merge"],
+        "params": {},
+        "output": CONTRACT_REPORT,
+    },
+    "validation": {
+        "run": run_validation,
+        "code": [SCRIPTS_DIR / "validate_demographics.py"],
+        "inputs": {},
+        "deps": ["merge", "demographics"],
+        "optional": ["demographics"],
+        "params": {},
+        "output": "validation.json",
+    },
+}
+
+
+def output_digest(path: Path) -> str:
+    """Content digest of a stage output file or directory."""
+    if path.is_file():
+        return file_digest(path)
+    listing = {p.name: file_digest(p) for p in sorted(path.iterdir())}
+    return hashlib.sha256(json.dumps(listing, sort_keys=True).encode()).hexdigest()
+
+
+def stage_key(name: str, stage: Dict[str, Any], dep_digests: Dict[str, Optional[str]]) -> str:
+    """Hash of everything a stage reads.
+
+    Args:
+        name: Stage name
+        stage: Stage definition
+        dep_digests: Output digest of each upstream stage (None if skipped)
+
+    Returns:
+        16-character hex key
+    """
+    payload = {
+        "name": name,
+        "params": stage["params"],
+        "code": {p.name: file_digest(p) for p in stage["code"] + [Path(__file__)]},
+        "inputs": {k: file_digest(p) for k, p in stage["inputs"].items()},
+        "deps": dep_digests,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def run_stage(name: str, stage: Dict[str, Any], key: str, inputs: Dict[str, Optional[Path]], force: bool) -> Path:
+    """Run a stage unless its output for this key already exists.
+
+    The output is written to a temporary directory and renamed into place,
+    so an interrupted run never leaves a partial result behind.
+
+    Returns:
+        Path of the stage output
+    """
+    out_dir = STAGE_CACHE_DIR / name / key
+    output = out_dir / stage["output"]
+    if output.exists() and not force:
+        print(f"  💾 {name}: up to date ({key})")
+        return output
+
+    tmp_dir = out_dir.with_name(f".{key}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+    start = time.perf_counter()
+    stage["run"](inputs, stage["params"], tmp_dir / stage["output"])
+    shutil.rmtree(out_dir, ignore_errors=True)
+    tmp_dir.rename(out_dir)
+    print(f"  🔨 {name}: built in {time.perf_counter() - start:.1f}s ({key})")
+
+    # Older results of this stage are no longer reachable
+    for old in out_dir.parent.iterdir():
+        if old != out_dir:
+            shutil.rmtree(old, ignore_errors=True)
+    return output
+
+
+def build(force: List[str], dry_run: bool = False) -> Optional[Dict[str, Path]]:
+    """Run stages in dependency order.
+
+    Args:
+        force: Stage names to rerun regardless of their key
+        dry_run: Only report which stages would run
+
+    Returns:
+        Mapping {stage: output path}, or None if a required stage was skipped
+    """
+    order = TopologicalSorter({name: stage["deps"] for name, stage in STAGES.items()}).static_order()
+    outputs: Dict[str, Optional[Path]] = {}
+    digests: Dict[str, Optional[str]] = {}
+
+    for name in order:
+        stage = STAGES[name]
+        missing_inputs = [str(p) for p in stage["inputs"].values() if not p.exists()]
+        missing_deps = [d for d in stage["deps"] if outputs.get(d) is None and d not in stage.get("optional", [])]
+        if missing_inputs or missing_deps:
+            print(f"  ⏭️  {name}: skipped (missing {', '.join(missing_inputs + missing_deps)})")
+            outputs[name] = digests[name] = None
+            continue
+
+        key = stage_key(name, stage, {d: digests[d] for d in stage["deps"]})
+        if dry_run:
+            output = STAGE_CACHE_DIR / name / key / stage["output"]
+            cached = output.exists() and name not in force
+            print(f"  {'💾' if cached else '🔨'} {name} ({key})")
+            outputs[name] = output
+            digests[name] = output_digest(output) if cached else f"pending-{key}"
+            continue
+
+        inputs: Dict[str, Optional[Path]] = {**stage["inputs"], **{d: outputs[d] for d in stage["deps"]}}
+        outputs[name] = run_stage(name, stage, key, inputs, name in force)
+        digests[name] = output_digest(outputs[name])
+
+    if outputs.get("merge") is None:
+        return None
+    return {name: path for name, path in outputs.items() if path is not None}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--force", nargs="*", default=[], choices=list(STAGES), help="Stages to rerun")
+    parser.add_argument("--dry-run", action="store_true", help="Show what would run")
+    parser.add_argument("--keep", type=int, default=3, help="Snapshots to retain")
+    parser.add_argument("--years", nargs="*", type=int, default=[DEFAULT_DATASET_YEAR], help="Padrón years to build")
+    parser.add_argument("--national", action="store_true", help="All provinces, without the population cap")
+    args = parser.parse_args()
+    STAGES["demographics"]["params"]["years"] = sorted(args.years)
+    if args.national:
+        STAGES["demographics"]["params"].update({"provinces": None, "max_population": None})
+        STAGES["routing"]["params"]["nut2"] = None
+        STAGES["gravity"]["params"]["nut2"] = None
+
+    print("🏗️  Building dataset...")
+    outputs = build(args.force, args.dry_run)
+    if outputs is None:
+        print("❌ Dataset stage could not run")
+        return
+    if args.dry_run:
+        return
+
+    with open(outputs["contract"], encoding="utf-8") as f:
+        contract = json.load(f)
+    if not contract["passed"]:
+        print(f"❌ Dataset breaks the data contract ({len(contract['violations'])} violations):")
+        for v in contract["violations"]:
+            print(f"  {v['partition']} {v['column']}: {v['rule']} ({v['rows']} rows, e.g. {', '.join(v['examples'][:3])})")
+        print("   Snapshot not published")
+        sys.exit(1)
+    rows = sum(contract["partitions"].values())
+    print(f"📜 Contract {contract['contract']}: {len(contract['partitions'])} partitions, {rows} rows OK")
+
+    dataset_dir = outputs["merge"]
+    dataset = dataset_dir / SNAPSHOT_DATASET
+    # The stamp is part of the snapshot, so a new contract publishes a new one
+    version = hashlib.sha256(f"{output_digest(dataset_dir)}:{contract['contract']}".encode()).hexdigest()[:16]
+    current = read_current_snapshot()
+    if current is not None and current["version"] == version:
+        print(f"✅ Snapshot {version} already current")
+    else:
+        files = {STAGES[name]["output"]: path for name, path in outputs.items() if name != "merge"}
+        files.update({path.name: path for path in dataset_dir.iterdir()})
+        snapshot_dir = publish_snapshot(files, version, keep=args.keep)
+        print(f"✅ Published snapshot {version} → {snapshot_dir}")
+
+    # Warm the app's typed Parquet cache for the year it opens with; other
+    # years are converted when first requested
+    partitions, _ = current_partitions()
+    load_dataset(partitions[max(partitions)], DATASET_CACHE_DIR)
+
+    if "validation" in outputs:
+        with open(outputs["validation"], encoding="utf-8") as f:
+            report = json.load(f)
+        print("📋 Validation:")
+        print(f"  Missing demographics: {len(report['missing_demographics'])}")
+        print(f"  Invalid percentages: {len(report['invalid_percentages'])}")
+        print(f"  Gender mismatches: {report['gender_mismatches']}")
+
+
+if __name__ == "__main__":
+    main()
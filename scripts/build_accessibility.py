@@ -0,0 +1,65 @@
+# scripts/build_accessibility.py
+"""
+Precompute weekly accessibility hours for every questionnaire profile.
+
+Each dataset partition gets a float32 tensor (profiles × municipalities ×
+breakdown) that the app memory-maps and reads with a lookup per profile. The
+output is keyed on the partition's content, so rerun this after building a
+new snapshot; outdated tensors are ignored and the app computes live.
+
+Usage:
+    python scripts/build_accessibility.py
+    python scripts/build_accessibility.py --years 2021 2022
+"""
+
+import argparse
+import shutil
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.paths import ACCESSIBILITY_DIR, DATASET_CACHE_DIR  # noqa: E402
+from core.accessibility import PROFILE_SLOTS, profile_tensor_dir, write_profile_tensor  # noqa: E402
+from core.dataset import dataset_version, index_by_code, load_dataset  # noqa: E402
+from core.snapshots import current_partitions  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--years", nargs="*", type=int, default=None, help="Partitions to build (default: latest)")
+    args = parser.parse_args()
+
+    partitions, _ = current_partitions()
+    years = args.years or [max(partitions)]
+    missing = [year for year in years if year not in partitions]
+    if missing:
+        print(f"❌ No dataset partition for {missing}; available: {list(partitions)}")
+        return
+
+    keep = set()
+    for year in years:
+        csv_path = partitions[year]
+        start = time.perf_counter()
+        # Same rows, in the same order, as the app loads them
+        df = index_by_code(load_dataset(csv_path, DATASET_CACHE_DIR))
+        version = dataset_version(csv_path)
+        out_dir = profile_tensor_dir(csv_path, version)
+        count = write_profile_tensor(df, out_dir, version)
+        keep.add(out_dir.name)
+
+        elapsed = time.perf_counter() - start
+        size_mb = sum(f.stat().st_size for f in out_dir.iterdir()) / 1e6
+        print(f"✅ {year}: {count} profiles × {len(df)} municipalities × {len(PROFILE_SLOTS) + 1} values "
+              f"in {elapsed:.1f}s → {out_dir} ({size_mb:,.1f} MB)")
+
+    # Tensors of older versions of the same partitions are never read again
+    stems = {partitions[year].stem for year in years}
+    for old in ACCESSIBILITY_DIR.iterdir():
+        if old.is_dir() and old.name not in keep and old.name.rsplit("-", 1)[0] in stems:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
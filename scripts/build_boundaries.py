@@ -0,0 +1,52 @@
+# scripts/build_boundaries.py
+"""
+Build the Madrid-only (or, with --national, all-Spain) boundary artifact
+from the national INSPIRE shapefile.
+
+Usage:
+    python scripts/build_boundaries.py
+    python scripts/build_boundaries.py --force
+    python scripts/build_boundaries.py --national
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.paths import BOUNDARIES_ARTIFACT, BOUNDARIES_SHP, NATIONAL_BOUNDARIES_ARTIFACT  # noqa: E402
+from core.boundaries import MADRID_NUT2, artifact_is_fresh, write_boundary_artifact  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shp", default=str(BOUNDARIES_SHP))
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the artifact is up to date")
+    parser.add_argument("--national", action="store_true", help="Keep every municipality, not only Madrid")
+    args = parser.parse_args()
+
+    shp_path = Path(args.shp)
+    default_output = NATIONAL_BOUNDARIES_ARTIFACT if args.national else BOUNDARIES_ARTIFACT
+    output_path = Path(args.output) if args.output else default_output
+
+    if not shp_path.exists():
+        print(f"❌ Shapefile not found: {shp_path}")
+        return
+
+    if not args.force and artifact_is_fresh(output_path, shp_path):
+        print(f"💾 Artifact up to date: {output_path}")
+        return
+
+    start = time.perf_counter()
+    gdf = write_boundary_artifact(shp_path, output_path, nut2=None if args.national else MADRID_NUT2)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ Exported {len(gdf)} municipalities to {output_path} in {elapsed:.1f}s")
+    print(f"Columns: {list(gdf.columns)}")
+
+
+if __name__ == "__main__":
+    main()
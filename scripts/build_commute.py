@@ -0,0 +1,61 @@
+# scripts/build_commute.py
+"""
+Precompute home → workplace travel minutes between all municipalities.
+
+Routes over the local road graph in data/routing/ (see core/routing.py) from
+every municipality centroid to every other, for each travel mode in the
+graph, and stores a uint16 minutes matrix that the app memory-maps to read
+one workplace row per request. Pairs beyond --max-minutes, modes without
+edges, and workplaces entered as coordinates use a straight-line estimate.
+
+Usage:
+    python scripts/build_commute.py
+    python scripts/build_commute.py --national --max-minutes 120
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.paths import BOUNDARIES_SHP, COMMUTE_DIR, ROAD_EDGES_CSV, ROAD_NODES_CSV  # noqa: E402
+from core.boundaries import (  # noqa: E402
+    MADRID_NUT2,
+    municipality_centroids,
+    municipality_codes,
+    read_boundaries_shapefile,
+)
+from core.commute import COMMUTE_MAX_MINUTES, write_commute_matrix  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--national", action="store_true", help="All municipalities of Spain")
+    parser.add_argument("--max-minutes", type=float, default=COMMUTE_MAX_MINUTES, help="Routing radius")
+    parser.add_argument("--workers", type=int, default=None, help="Routing processes (default: all CPUs)")
+    args = parser.parse_args()
+
+    missing = [str(p) for p in (ROAD_NODES_CSV, ROAD_EDGES_CSV, BOUNDARIES_SHP) if not p.exists()]
+    if missing:
+        print(f"❌ Missing {', '.join(missing)}; the app will estimate commutes from distances")
+        return
+
+    start = time.perf_counter()
+    gdf = read_boundaries_shapefile(BOUNDARIES_SHP, None if args.national else MADRID_NUT2)
+    gdf.index = pd.Index(municipality_codes(gdf).to_numpy())
+    gdf = gdf.sort_index()
+    count = write_commute_matrix(
+        ROAD_NODES_CSV, ROAD_EDGES_CSV, municipality_centroids(gdf), COMMUTE_DIR, args.max_minutes, args.workers
+    )
+
+    elapsed = time.perf_counter() - start
+    size_mb = sum(f.stat().st_size for f in COMMUTE_DIR.iterdir()) / 1e6
+    print(f"✅ {count} × {count} municipalities in {elapsed:.1f}s → {COMMUTE_DIR} ({size_mb:,.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# scripts/build_geometries.py
+"""
+Build simplified, WGS84 map geometries at several levels of detail.
+
+With --national, every Spanish municipality is simplified and the output is
+split into one file per province and level, which the app loads on demand.
+
+Usage:
+    python scripts/build_geometries.py
+    python scripts/build_geometries.py --workers 8
+    python scripts/build_geometries.py --national
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.paths import (  # noqa: E402
+    BOUNDARIES_ARTIFACT,
+    BOUNDARIES_SHP,
+    GEOMETRY_LOD_DIR,
+    GEOMETRY_SHARD_DIR,
+    NATIONAL_BOUNDARIES_ARTIFACT,
+)
+from core.boundaries import (  # noqa: E402
+    GEOMETRY_LEVELS,
+    build_geometry_levels,
+    geometry_level_path,
+    load_boundaries,
+    load_madrid_boundaries,
+    write_geometry_levels,
+    write_geometry_shards,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--national", action="store_true", help="All of Spain, one file per province")
+    args = parser.parse_args()
+
+    artifact = NATIONAL_BOUNDARIES_ARTIFACT if args.national else BOUNDARIES_ARTIFACT
+    output_dir = Path(args.output) if args.output else (GEOMETRY_SHARD_DIR if args.national else GEOMETRY_LOD_DIR)
+
+    if not artifact.exists() and not BOUNDARIES_SHP.exists():
+        print(f"❌ Boundaries not found: {BOUNDARIES_SHP}")
+        return
+
+    start = time.perf_counter()
+    if args.national:
+        gdf = load_boundaries(artifact, BOUNDARIES_SHP, nut2=None)
+    else:
+        gdf = load_madrid_boundaries(artifact, BOUNDARIES_SHP)
+    collections = build_geometry_levels(gdf, GEOMETRY_LEVELS, workers=args.workers)
+    if args.national:
+        counts = write_geometry_shards(collections, output_dir)
+        elapsed = time.perf_counter() - start
+        print(f"✅ Simplified {len(gdf)} municipalities in {elapsed:.1f}s")
+        print(f"  {len(counts)} provinces × {len(GEOMETRY_LEVELS)} levels → {output_dir}")
+        return
+    write_geometry_levels(collections, output_dir)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ Simplified {len(gdf)} municipalities in {elapsed:.1f}s")
+    for level, tolerance in GEOMETRY_LEVELS.items():
+        path = geometry_level_path(output_dir, level)
+        size_kb = path.stat().st_size / 1024
+        print(f"  {level:>6}: tolerance {tolerance:>5.0f} m → {path.name} ({size_kb:,.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# scripts/build_image_derivatives.py
+"""
+Build responsive WebP/JPEG derivatives of municipality images.
+
+Every source image in assets/municipalities/ (and the placeholders in
+photos/) is resized to each width in DERIVATIVE_WIDTHS. Output files are
+named after their content hash, and static/municipalities/manifest.json
+records dimensions, sizes and hashes. Sources whose hash and settings are
+unchanged since the last run are skipped.
+
+Usage:
+    python scripts/build_image_derivatives.py
+    python scripts/build_image_derivatives.py --workers 4 --force
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+from tqdm import tqdm
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config.paths import IMAGE_DERIVATIVES_DIR  # noqa: E402
+from core.images import (  # noqa: E402
+    DERIVATIVE_FORMATS,
+    DERIVATIVE_WIDTHS,
+    DERIVATIVES_MANIFEST,
+    build_source_index,
+)
+
+MANIFEST_VERSION = 1
+
+
+def settings_signature() -> str:
+    """Hash of the widths and encoder settings, so changing them forces a rebuild."""
+    settings = json.dumps({"widths": DERIVATIVE_WIDTHS, "formats": DERIVATIVE_FORMATS}, sort_keys=True)
+    return hashlib.sha256(settings.encode()).hexdigest()[:16]
+
+
+def render_derivatives(task: Tuple[str, str, str, str]) -> Dict[str, Any]:
+    """Resize and encode one source image at every width and format.
+
+    Runs in a worker process.
+
+    Args:
+        task: (image key, source path, source sha256, output directory)
+
+    Returns:
+        Manifest entry for the image
+    """
+    key, source, source_hash, output_dir = task
+    out_dir = Path(output_dir)
+    variants: List[Dict[str, Any]] = []
+
+    with Image.open(source) as img:
+        img = img.convert("RGB")
+        src_w, src_h = img.size
+
+        for width in DERIVATIVE_WIDTHS:
+            if width > src_w and variants:
+                # Never upscale; the largest variant already covers this width
+                break
+            target_w = min(width, src_w)
+            target_h = max(1, round(src_h * target_w / src_w))
+            resized = img.resize((target_w, target_h), Image.Resampling.LANCZOS)
+
+            for fmt, options in DERIVATIVE_FORMATS.items():
+                buffer = BytesIO()
+                resized.save(buffer, **options)
+                data = buffer.getvalue()
+                digest = hashlib.sha256(data).hexdigest()
+                filename = f"{key}-{target_w}w.{digest[:10]}.{'jpg' if fmt == 'jpeg' else fmt}"
+                (out_dir / filename).write_bytes(data)
+                variants.append({
+                    "width": target_w,
+                    "height": target_h,
+                    "format": fmt,
+                    "file": filename,
+                    "bytes": len(data),
+                    "sha256": digest,
+                })
+
+    return {
+        "source": Path(source).name,
+        "source_sha256": source_hash,
+        "source_width": src_w,
+        "source_height": src_h,
+        "variants": variants,
+    }
+
+
+def load_manifest(path: Path) -> Dict[str, Any]:
+    """Load the previous derivative manifest, or an empty one."""
+    if not path.exists():
+        return {"version": MANIFEST_VERSION, "settings": None, "images": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_up_to_date(entry: Dict[str, Any], source_hash: str, output_dir: Path) -> bool:
+    """Check that a manifest entry matches the source and its files exist."""
+    return (
+        entry.get("source_sha256") == source_hash
+        and all((output_dir / v["file"]).exists() for v in entry.get("variants", []))
+    )
+
+
+def build_derivatives(output_dir: Path, workers: Optional[int] = None, force: bool = False) -> Dict[str, int]:
+    """Build derivatives for all changed sources and rewrite the manifest.
+
+    Args:
+        output_dir: Destination for derivatives and manifest
+        workers: Process pool size (default: CPU count)
+        force: Rebuild every source
+
+    Returns:
+        Counts of built, skipped and removed images
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_dir / DERIVATIVES_MANIFEST
+    manifest = load_manifest(manifest_path)
+    signature = settings_signature()
+    if manifest.get("settings") != signature:
+        force = True
+
+    sources = build_source_index()
+    old_images: Dict[str, Any] = manifest.get("images", {})
+    images: Dict[str, Any] = {}
+    tasks: List[Tuple[str, str, str, str]] = []
+
+    for key, path in sorted(sources.items()):
+        source_hash = hashlib.sha256(path.read_bytes()).hexdigest()
+        entry = old_images.get(key)
+        if not force and entry and is_up_to_date(entry, source_hash, output_dir):
+            images[key] = entry
+        else:
+            tasks.append((key, str(path), source_hash, str(output_dir)))
+
+    if tasks:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(render_derivatives, tasks, chunksize=4)
+            for (key, *_), entry in tqdm(zip(tasks, results), total=len(tasks), desc="Rendering"):
+                images[key] = entry
+
+    # Drop derivative files no longer referenced by the manifest
+    referenced = {v["file"] for entry in images.values() for v in entry["variants"]}
+    removed = 0
+    for path in output_dir.iterdir():
+        if path.name != DERIVATIVES_MANIFEST and path.name not in referenced:
+            path.unlink()
+            removed += 1
+
+    manifest = {"version": MANIFEST_VERSION, "settings": signature, "images": images}
+    tmp_path = manifest_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    tmp_path.replace(manifest_path)
+
+    return {"built": len(tasks), "skipped": len(images) - len(tasks), "removed": removed}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", default=str(IMAGE_DERIVATIVES_DIR))
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Rebuild all derivatives")
+    args = parser.parse_args()
+
+    output_dir = Path(args.output)
+    counts = build_derivatives(output_dir, args.workers, args.force)
+
+    manifest = load_manifest(output_dir / DERIVATIVES_MANIFEST)
+    total_bytes = sum(v["bytes"] for e in manifest["images"].values() for v in e["variants"])
+
+    print("\n" + "="*60)
+    print("📊 Summary:")
+    print(f"  🖼️  Built: {counts['built']}")
+    print(f"  💾 Unchanged: {counts['skipped']}")
+    print(f"  🗑️  Removed stale files: {counts['removed']}")
+    print(f"  📁 {output_dir} ({total_bytes / 1024 / 1024:.1f} MB)")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
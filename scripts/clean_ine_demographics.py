@@ -1,9 +1,26 @@
 # scripts/clean_ine_demographics.py
 
-"""Clean INE demographics data and prepare for merge."""
+"""Clean INE demographics data and prepare for merge.
 
-import pandas as pd
+The INE export is read in chunks with only the needed columns. Rows outside
+the requested period and provinces are dropped before any other work, and
+each chunk is reduced to per-municipality sums, so memory stays bounded by
+the chunk size even for the national file. A single pivot at the end
+produces one row per municipality (and year, when several are requested in
+one pass).
+
+Usage:
+    python scripts/clean_ine_demographics.py
+    python scripts/clean_ine_demographics.py --provinces 28 45 --period "1 de enero de 2023"
+    python scripts/clean_ine_demographics.py --years 2020 2021 2022
+"""
+
+import argparse
+import time
 from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
 
 # Age group mappings (INE bracket → our group)
 AGE_GROUPS = {
@@ -14,67 +31,180 @@ AGE_GROUPS = {
     "80+": ["De 80 a 84 años", "De 85 a 89 años", "De 90 a 94 años", "De 95 a 99 años", "100 y más años"],
 }
 
-def parse_ine_number(value):
-    """Parse INE number format (dots as thousand separators)."""
-    if pd.isna(value):
-        return 0
-    return int(str(value).replace(".", ""))
+GENDERS = ["Total", "Hombres", "Mujeres"]
+
+# INE export columns
+MUNICIPALITY_COL = "Municipios"
+SEX_COL = "Sexo"
+AGE_COL = "Edad (grupos quinquenales)"
+PERIOD_COL = "Periodo"
+VALUE_COL = "Total"
+
+DEFAULT_PERIOD = "1 de enero de 2022"
+DEFAULT_CHUNK_SIZE = 500_000
+DEFAULT_MAX_POPULATION = 50000
+
+# Reverse lookup used to map every row's bracket in one vectorized step
+BRACKET_TO_GROUP: Dict[str, str] = {
+    bracket: group for group, brackets in AGE_GROUPS.items() for bracket in brackets
+}
+
+
+def output_column(group: str, gender: str) -> str:
+    """Name of the merged dataset column for an age group and sex."""
+    return f"DEM_Edad_{group.replace('-', '_').replace('+', 'Plus')}_{gender}"
+
+
+def year_period(year: int) -> str:
+    """Value of the Periodo column for a year's 1 January padrón."""
+    return f"1 de enero de {year}"
+
+
+def period_year(period: str) -> int:
+    """Year of a Periodo value, e.g. "1 de enero de 2022" → 2022."""
+    return int(period.rsplit(" ", 1)[-1])
+
+
+def parse_ine_numbers(values: pd.Series) -> pd.Series:
+    """Parse INE number format (dots as thousand separators) for a whole column.
+
+    Missing or unparseable values count as 0.
+    """
+    digits = values.str.replace(".", "", regex=False)
+    return pd.to_numeric(digits, errors="coerce").fillna(0).astype("int64")
+
+
+def aggregate_chunk(chunk: pd.DataFrame, periods: Sequence[str], provinces: Optional[List[str]]) -> pd.DataFrame:
+    """Filter one chunk and sum it per municipality, year, age group and sex.
+
+    Args:
+        chunk: Raw rows with the INE export columns
+        periods: Values of the Periodo column to keep
+        provinces: Two-digit province codes to keep (None keeps all)
+
+    Returns:
+        Partial sums with columns codigo, Nombre, year, group, Sexo, Total
+    """
+    chunk = chunk[chunk[PERIOD_COL].isin(periods) & chunk[MUNICIPALITY_COL].notna()]
+    if provinces:
+        chunk = chunk[chunk[MUNICIPALITY_COL].str[:2].isin(provinces)]
+
+    groups = chunk[AGE_COL].map(BRACKET_TO_GROUP)
+    chunk = chunk[groups.notna() & chunk[SEX_COL].isin(GENDERS)]
+    if chunk.empty:
+        return pd.DataFrame(columns=["codigo", "Nombre", "year", "group", SEX_COL, VALUE_COL])
+
+    # "28001 Acebeda, La" → codigo 28001, Nombre "Acebeda, La"
+    parts = chunk[MUNICIPALITY_COL].str.extract(r"^(\d+)\s+(.+)$")
+    rows = pd.DataFrame({
+        "codigo": parts[0].astype(int),
+        "Nombre": parts[1],
+        "year": chunk[PERIOD_COL].map({period: period_year(period) for period in periods}),
+        "group": groups.loc[chunk.index],
+        SEX_COL: chunk[SEX_COL],
+        VALUE_COL: parse_ine_numbers(chunk[VALUE_COL]),
+    })
+    return rows.groupby(["codigo", "Nombre", "year", "group", SEX_COL], sort=False, as_index=False)[VALUE_COL].sum()
+
+
+def clean_demographics_by_year(
+    input_path: Path,
+    years: Sequence[int],
+    provinces: Optional[List[str]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> pd.DataFrame:
+    """Aggregate several padrón years in a single pass over the INE file.
+
+    Args:
+        input_path: Tab-separated INE export
+        years: Years whose 1 January figures are kept
+        provinces: Two-digit province codes to keep (None keeps all)
+        chunk_size: Rows read per chunk
+
+    Returns:
+        DataFrame with codigo, Nombre, year and DEM_Edad_{group}_{sex}
+        columns, one row per municipality and year
+    """
+    periods = [year_period(year) for year in years]
+    reader = pd.read_csv(
+        input_path,
+        sep="\t",
+        usecols=[MUNICIPALITY_COL, SEX_COL, AGE_COL, PERIOD_COL, VALUE_COL],
+        dtype=str,
+        chunksize=chunk_size,
+    )
+    partials = [aggregate_chunk(chunk, periods, provinces) for chunk in reader]
+    sums = pd.concat(partials, ignore_index=True)
+
+    # Single pivot: rows=municipios+year, cols=age_group+gender
+    demo_df = sums.pivot_table(
+        index=["codigo", "Nombre", "year"],
+        columns=["group", SEX_COL],
+        values=VALUE_COL,
+        aggfunc="sum",
+        fill_value=0,
+    )
+    columns = [(group, gender) for group in AGE_GROUPS for gender in GENDERS]
+    demo_df = demo_df.reindex(columns=pd.MultiIndex.from_tuples(columns), fill_value=0).astype("int64")
+    demo_df.columns = [output_column(group, gender) for group, gender in columns]
+    return demo_df.reset_index()
+
+
+def clean_demographics(
+    input_path: Path,
+    period: str = DEFAULT_PERIOD,
+    provinces: Optional[List[str]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> pd.DataFrame:
+    """Aggregate the INE file into one row per municipality.
+
+    Args:
+        input_path: Tab-separated INE export
+        period: Value of the Periodo column to keep
+        provinces: Two-digit province codes to keep (None keeps all)
+        chunk_size: Rows read per chunk
+
+    Returns:
+        DataFrame with codigo, Nombre and DEM_Edad_{group}_{sex} columns
+    """
+    demo_df = clean_demographics_by_year(input_path, [period_year(period)], provinces, chunk_size)
+    return demo_df.drop(columns=["year"])
+
+
+def drop_large_municipalities(demo_df: pd.DataFrame, max_population: Optional[int]) -> pd.DataFrame:
+    """Keep municipalities whose age group totals sum below max_population (None keeps all)."""
+    if max_population is None:
+        return demo_df
+    total_pop = demo_df[[output_column(group, "Total") for group in AGE_GROUPS]].sum(axis=1)
+    return demo_df[total_pop < max_population]
+
 
 def main():
     script_dir = Path(__file__).parent.parent
-    input_path = script_dir / "data" / "population_by_age_and_gender.csv"
-    output_path = script_dir / "data" / "demographics_clean.csv"
-    
-    # Load INE data
-    df = pd.read_csv(input_path, sep="\t", dtype={"Total": str})
-    
-    # Parse Total column
-    df["Total"] = df["Total"].apply(parse_ine_number)
-    
-    # Filter: 2022 data only, municipality level
-    df = df[df["Periodo"] == "1 de enero de 2022"].copy()
-    df = df[df["Municipios"].notna()].copy()
-    
-    # Extract codigo from "Municipios" column (format: "28001 Acebeda, La")
-    df["codigo"] = df["Municipios"].str.extract(r"^(\d+)")[0].astype(int)
-    df["Nombre"] = df["Municipios"].str.extract(r"^\d+\s+(.+)$")[0]
-    
-    # Pivot: rows=municipios, cols=age_group+gender
-    result = []
-    
-    for codigo in df["codigo"].unique():
-        muni_data = df[df["codigo"] == codigo]
-        nombre = muni_data["Nombre"].iloc[0]
-        
-        row = {"codigo": codigo, "Nombre": nombre}
-        
-        for group_name, ine_brackets in AGE_GROUPS.items():
-            for gender in ["Total", "Hombres", "Mujeres"]:
-                col_name = f"DEM_Edad_{group_name.replace('-', '_').replace('+', 'Plus')}_{gender}"
-                
-                # Sum across INE brackets
-                mask = (muni_data["Sexo"] == gender) & (muni_data["Edad (grupos quinquenales)"].isin(ine_brackets))
-                total = muni_data[mask]["Total"].sum()
-                
-                row[col_name] = int(total)
-        
-        result.append(row)
-    
-    # Create DataFrame
-    demo_df = pd.DataFrame(result)
-    print(f"DEBUG - Columns created: {list(demo_df.columns)}")
 
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default=str(script_dir / "data" / "population_by_age_and_gender.csv"))
+    parser.add_argument("--output", default=str(script_dir / "data" / "demographics_clean.csv"))
+    parser.add_argument("--period", default=DEFAULT_PERIOD, help="Value of the Periodo column to keep")
+    parser.add_argument("--years", nargs="*", type=int, default=None, help="Several padrón years (adds a year column)")
+    parser.add_argument("--provinces", nargs="*", default=None, help="Two-digit province codes (default: all)")
+    parser.add_argument("--max-population", type=int, default=DEFAULT_MAX_POPULATION, help="Keep municipalities below this size")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.years:
+        demo_df = clean_demographics_by_year(Path(args.input), args.years, args.provinces, args.chunk_size)
+    else:
+        demo_df = clean_demographics(Path(args.input), args.period, args.provinces, args.chunk_size)
 
     # Filter: municipalities < 50k (sum all age group totals)
-    total_pop = (demo_df["DEM_Edad_0_19_Total"] + demo_df["DEM_Edad_20_39_Total"] + 
-                demo_df["DEM_Edad_40_59_Total"] + demo_df["DEM_Edad_60_79_Total"] + 
-                demo_df["DEM_Edad_80Plus_Total"])
-    demo_df = demo_df[total_pop < 50000]
+    demo_df = drop_large_municipalities(demo_df, args.max_population)
 
-    
     # Export
-    demo_df.to_csv(output_path, index=False)
-    print(f"✅ Exported {len(demo_df)} municipalities to {output_path}")
+    demo_df.to_csv(args.output, index=False)
+    elapsed = time.perf_counter() - start
+    print(f"✅ Exported {len(demo_df)} municipalities to {args.output} in {elapsed:.1f}s")
     print(f"Columns: {list(demo_df.columns)}")
 
 if __name__ == "__main__":
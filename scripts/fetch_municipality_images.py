@@ -2,47 +2,146 @@
 """
 Fetch municipality images from Comunidad de Madrid plaza thumbnails.
 
+Downloads run on a bounded thread pool sharing one pooled HTTP session,
+throttled by a token bucket. Each image's ETag/Last-Modified is recorded in
+the manifest, so later runs revalidate with conditional requests and only
+download images that changed. Failed requests are retried with exponential
+backoff; decoding and resizing run on a process pool.
+
+The index page URL is configurable, so the job can be run against a local
+stand-in server (e.g. `python -m http.server`) serving a copy of the page.
+
 Usage:
     python scripts/fetch_municipality_images.py --limit 10
+    python scripts/fetch_municipality_images.py --workers 8 --rate 4
+    python scripts/fetch_municipality_images.py --index-url http://localhost:8000/plaza.html
 """
 
 import argparse
 import json
+import random
 import re
+import sys
+import threading
 import time
-from pathlib import Path
-from typing import Dict, Optional, List, Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urljoin
 
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
 from PIL import Image
 from tqdm import tqdm
 from bs4 import BeautifulSoup
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.dataset import CSV_SEPARATOR  # noqa: E402
+from core.images import slugify  # noqa: E402
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
 }
 
+PLAZA_INDEX_URL = "https://www.comunidad.madrid/actividades/2024/plaza-plaza"
+
+MAX_IMAGE_SIZE = (800, 600)
+JPEG_QUALITY = 95
+
+# Status codes worth retrying; anything else fails immediately
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second, bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a token is available, then take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
 
-def slugify(text: str) -> str:
-    """Convert municipality name to filename slug."""
-    text = text.lower()
-    text = re.sub(r'[áàäâ]', 'a', text)
-    text = re.sub(r'[éèëê]', 'e', text)
-    text = re.sub(r'[íìïî]', 'i', text)
-    text = re.sub(r'[óòöô]', 'o', text)
-    text = re.sub(r'[úùüû]', 'u', text)
-    text = re.sub(r'[ñ]', 'n', text)
-    text = re.sub(r'[^a-z0-9]+', '-', text)
-    return text.strip('-')
+def create_session(pool_size: int) -> requests.Session:
+    """HTTP session with a connection pool sized for the worker pool."""
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 
-def fetch_all_plaza_images() -> Dict[str, str]:
+def request_with_retry(
+    session: requests.Session,
+    url: str,
+    bucket: TokenBucket,
+    headers: Optional[Dict[str, str]] = None,
+    retries: int = 4,
+    backoff: float = 0.5,
+    timeout: float = 15,
+) -> requests.Response:
+    """GET with rate limiting and exponential backoff on transient errors.
+
+    Honors Retry-After on 429/503 responses. Each attempt takes a token.
+
+    Args:
+        session: Shared session
+        url: Resource URL
+        bucket: Shared rate limiter
+        headers: Extra request headers (conditional request validators)
+        retries: Retries after the first attempt
+        backoff: Base delay in seconds, doubled on each retry
+        timeout: Per-request timeout in seconds
+
+    Returns:
+        Final response (may be an error status once retries are exhausted)
+
+    Raises:
+        requests.RequestException: If the last attempt fails to connect
+    """
+    for attempt in range(retries):
+        bucket.acquire()
+        try:
+            response = session.get(url, headers=headers, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout):
+            response = None
+
+        if response is not None and response.status_code not in RETRY_STATUSES:
+            return response
+
+        delay = backoff * 2 ** attempt * (1 + random.random() / 2)
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        time.sleep(delay)
+
+    # Last attempt: return whatever comes back, let connection errors propagate
+    bucket.acquire()
+    return session.get(url, headers=headers, timeout=timeout)
+
+
+def fetch_all_plaza_images(session: requests.Session, bucket: TokenBucket, index_url: str = PLAZA_INDEX_URL) -> Dict[str, str]:
     """Fetch all plaza images from Comunidad de Madrid site once."""
     try:
-        url = "https://www.comunidad.madrid/actividades/2024/plaza-plaza"
-        response = requests.get(url, headers=HEADERS, timeout=10)
+        response = request_with_retry(session, index_url, bucket, timeout=10)
         response.raise_for_status()
         
         soup = BeautifulSoup(response.text, 'html.parser')
@@ -65,10 +164,7 @@ def fetch_all_plaza_images() -> Dict[str, str]:
                     img_url = img_url.split('?')[0].split('&')[0]
                     img_url = img_url.replace('/styles/block_teaser_image_horizontal/public', '')
                     
-                    if not img_url.startswith('http'):
-                        img_url = f"https://www.comunidad.madrid{img_url}"
-                    
-                    plaza_images[muni_name] = img_url
+                    plaza_images[muni_name] = urljoin(index_url, img_url)
         
         return plaza_images
         
@@ -97,70 +193,143 @@ def match_municipality(muni: str, plaza_images: Dict[str, str]) -> Optional[str]
     return None
 
 
-def download_image(url: str, output_path: Path) -> bool:
-    """Download and save image."""
+def process_image(content: bytes, output_path: str) -> bool:
+    """Decode, downscale and save an image (runs in a worker process)."""
     try:
-        response = requests.get(url, headers=HEADERS, timeout=15)
-        response.raise_for_status()
-        
-        img = Image.open(BytesIO(response.content))
+        img = Image.open(BytesIO(content))
         img = img.convert("RGB")
-        
-        max_size = (800, 600)
-        img.thumbnail(max_size, Image.Resampling.LANCZOS)
-        
-        img.save(output_path, "JPEG", quality=95, optimize=True)
+        img.thumbnail(MAX_IMAGE_SIZE, Image.Resampling.LANCZOS)
+
+        tmp_path = Path(output_path).with_suffix(".tmp")
+        img.save(tmp_path, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        tmp_path.replace(output_path)
         return True
-        
     except Exception:
         return False
 
 
-def fetch_all_images(csv_path: str, output_dir: Path, limit: Optional[int] = None) -> Dict[str, str]:
-    """Fetch images for all municipalities."""
+def download_image(
+    url: str,
+    output_path: Path,
+    previous: Dict[str, Any],
+    session: requests.Session,
+    bucket: TokenBucket,
+    decoder: Executor,
+) -> Dict[str, Any]:
+    """Download (or revalidate) one image and hand it to the decoder pool.
+
+    Args:
+        url: Image URL
+        output_path: Destination JPEG
+        previous: Manifest entry from the last run
+        session: Shared session
+        bucket: Shared rate limiter
+        decoder: Process pool for decode/resize
+
+    Returns:
+        New manifest entry
+    """
+    headers: Dict[str, str] = {}
+    if output_path.exists() and previous.get("url") == url:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+
+    entry: Dict[str, Any] = {"url": url}
+    try:
+        response = request_with_retry(session, url, bucket, headers=headers)
+    except requests.RequestException:
+        return {**entry, "status": "failed"}
+
+    if response.status_code == 304:
+        return {**previous, "status": "not_modified"}
+    if not response.ok:
+        return {**entry, "status": "failed", "http_status": response.status_code}
+
+    entry["etag"] = response.headers.get("ETag")
+    entry["last_modified"] = response.headers.get("Last-Modified")
+    success = decoder.submit(process_image, response.content, str(output_path)).result()
+    return {**entry, "status": "success" if success else "failed"}
+
+
+def load_manifest(manifest_path: Path) -> Dict[str, Dict[str, Any]]:
+    """Load the previous manifest; old entries were bare status strings."""
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    return {slug: entry if isinstance(entry, dict) else {"status": entry} for slug, entry in manifest.items()}
+
+
+def fetch_all_images(
+    csv_path: str,
+    output_dir: Path,
+    limit: Optional[int] = None,
+    workers: int = 8,
+    rate: float = 4.0,
+    index_url: str = PLAZA_INDEX_URL,
+) -> Dict[str, Dict[str, Any]]:
+    """Fetch images for all municipalities.
+
+    Args:
+        csv_path: Dataset with a Nombre column
+        output_dir: Destination directory (also holds manifest.json)
+        limit: Only process the first N municipalities
+        workers: Concurrent downloads
+        rate: Maximum requests per second
+        index_url: Page listing the plaza images
+
+    Returns:
+        Manifest {slug: entry}
+    """
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    df = pd.read_csv(csv_path)
+    df = pd.read_csv(csv_path, sep=CSV_SEPARATOR, usecols=["Nombre"])
     municipalities = df["Nombre"].unique().tolist()
     
     print(f"📊 Total municipalities in CSV: {len(municipalities)}")
     
     if limit:
         municipalities = municipalities[:limit]
+
+    session = create_session(workers)
+    bucket = TokenBucket(rate, capacity=max(1, workers))
     
     # Fetch all plaza images once
     print("🔍 Fetching plaza images from Comunidad de Madrid...")
-    plaza_images = fetch_all_plaza_images()
+    plaza_images = fetch_all_plaza_images(session, bucket, index_url)
     print(f"✅ Found {len(plaza_images)} plaza images on site\n")
     
-    manifest = {}
+    manifest_path = output_dir / "manifest.json"
+    previous = load_manifest(manifest_path)
+    manifest: Dict[str, Dict[str, Any]] = {}
     not_found = []
     
     print(f"🖼️  Matching and downloading {len(municipalities)} municipalities...")
     print(f"📁 Output: {output_dir}\n")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool, ProcessPoolExecutor() as decoder:
+        futures = {}
+        for muni in municipalities:
+            slug = slugify(muni)
+            img_url = match_municipality(muni, plaza_images)
+            if img_url:
+                output_path = output_dir / f"{slug}.jpg"
+                future = pool.submit(download_image, img_url, output_path, previous.get(slug, {}), session, bucket, decoder)
+                futures[future] = slug
+            else:
+                manifest[slug] = {"status": "not_found"}
+                not_found.append(muni)
+
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Downloading"):
+            manifest[futures[future]] = future.result()
     
-    for muni in tqdm(municipalities, desc="Downloading"):
-        slug = slugify(muni)
-        output_path = output_dir / f"{slug}.jpg"
-        
-        if output_path.exists():
-            manifest[slug] = "cached"
-            continue
-        
-        img_url = match_municipality(muni, plaza_images)
-        
-        if img_url:
-            success = download_image(img_url, output_path)
-            manifest[slug] = "success" if success else "failed"
-        else:
-            manifest[slug] = "not_found"
-            not_found.append(muni)
-        
-        time.sleep(0.5)
-    
-    manifest_path = output_dir / "manifest.json"
-    with open(manifest_path, "w", encoding="utf-8") as f:
+    manifest = {slugify(muni): manifest[slugify(muni)] for muni in municipalities}
+    tmp_path = manifest_path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(manifest, f, indent=2, ensure_ascii=False)
+    tmp_path.replace(manifest_path)
     
     # Report missing municipalities
     if not_found:
@@ -176,6 +345,9 @@ def main():
     parser.add_argument("--limit", type=int, help="Test with N municipalities")
     parser.add_argument("--csv", default="data/merged_dataset.csv")
     parser.add_argument("--output", default="assets/municipalities")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent downloads")
+    parser.add_argument("--rate", type=float, default=4.0, help="Maximum requests per second")
+    parser.add_argument("--index-url", default=PLAZA_INDEX_URL, help="Page listing the plaza images")
     args = parser.parse_args()
     
     script_dir = Path(__file__).parent.parent
@@ -186,14 +358,15 @@ def main():
         print(f"❌ CSV not found: {csv_path}")
         return
     
-    manifest = fetch_all_images(str(csv_path), output_dir, args.limit)
+    manifest = fetch_all_images(str(csv_path), output_dir, args.limit, args.workers, args.rate, args.index_url)
+    statuses = [entry["status"] for entry in manifest.values()]
     
     print("\n" + "="*60)
     print("📊 Summary:")
-    print(f"  ✅ Success: {sum(1 for v in manifest.values() if v == 'success')}")
-    print(f"  💾 Cached: {sum(1 for v in manifest.values() if v == 'cached')}")
-    print(f"  ❌ Failed: {sum(1 for v in manifest.values() if v == 'failed')}")
-    print(f"  🔍 Not found: {sum(1 for v in manifest.values() if v == 'not_found')}")
+    print(f"  ✅ Success: {statuses.count('success')}")
+    print(f"  💾 Not modified: {statuses.count('not_modified')}")
+    print(f"  ❌ Failed: {statuses.count('failed')}")
+    print(f"  🔍 Not found: {statuses.count('not_found')}")
     print("="*60)
 
 
@@ -4,6 +4,24 @@ import pandas as pd
 from pathlib import Path
 from datetime import datetime
 
+def merge_demographics(master_df: pd.DataFrame, demo_df: pd.DataFrame) -> pd.DataFrame:
+    """Attach demographics to the master dataset by INE code.
+
+    Duplicate codes keep their first row, and demographic columns already
+    in the master are replaced, so merging again gives the same result.
+
+    Args:
+        master_df: Master dataset with codigo
+        demo_df: Output of clean_ine_demographics.py
+
+    Returns:
+        Master dataset with DEM_* columns
+    """
+    master_df = master_df.drop_duplicates(subset=["codigo"], keep="first")
+    master_df = master_df.drop(columns=[c for c in master_df.columns if c.startswith("DEM_")])
+    return master_df.merge(demo_df.drop(columns=["Nombre"]), on="codigo", how="left")
+
+
 def main():
     script_dir = Path(__file__).parent.parent
     demo_path = script_dir / "data" / "demographics_clean.csv"
@@ -19,7 +37,7 @@ def main():
     master_df = pd.read_csv(master_path)
     
     # Merge
-    merged = master_df.merge(demo_df.drop(columns=["Nombre"]), on="codigo", how="left")
+    merged = merge_demographics(master_df, demo_df)
     
     # Validate
     missing = merged[merged["DEM_Edad_0_19_Total"].isna()]
@@ -3,65 +3,90 @@
 
 import pandas as pd
 from pathlib import Path
+from typing import Any, Dict
 
-def main():
-    script_dir = Path(__file__).parent.parent
-    demo_path = script_dir / "data" / "demographics_clean.csv"
-    master_path = script_dir / "data" / "merged_dataset.csv"
-    
-    # Load data
-    demo_df = pd.read_csv(demo_path)
-    master_df = pd.read_csv(master_path)
-    
+AGE_GROUP_KEYS = ["0_19", "20_39", "40_59", "60_79", "80Plus"]
+
+
+def validate_demographics(demo_df: pd.DataFrame, master_df: pd.DataFrame) -> Dict[str, Any]:
+    """Check demographics consistency.
+
+    Args:
+        demo_df: Output of clean_ine_demographics.py
+        master_df: Merged dataset
+
+    Returns:
+        Report with municipality names per check and a gender mismatch count
+    """
+    totals = demo_df[[f"DEM_Edad_{g}_Total" for g in AGE_GROUP_KEYS]]
+    total_pop = totals.sum(axis=1)
+
+    # Check 1: Age groups sum to 100%
+    pct_sum = totals.div(total_pop, axis=0).sum(axis=1) * 100
+    invalid = demo_df.loc[(pct_sum - 100).abs() > 0.01, "Nombre"]
+
+    # Check 2: Missing municipalities in master
+    missing = master_df.loc[master_df["DEM_Edad_0_19_Total"].isna(), "Nombre"]
+
+    # Check 3: Gender consistency
+    gender_diff = pd.concat(
+        [
+            (demo_df[f"DEM_Edad_{g}_Hombres"] + demo_df[f"DEM_Edad_{g}_Mujeres"] - demo_df[f"DEM_Edad_{g}_Total"]).abs()
+            for g in AGE_GROUP_KEYS
+        ],
+        axis=1,
+    ).max(axis=1)
+
+    return {
+        "municipalities": len(demo_df),
+        "master_municipalities": len(master_df),
+        "invalid_percentages": invalid.astype(str).tolist(),
+        "missing_demographics": missing.astype(str).tolist(),
+        "gender_mismatches": int((gender_diff > 0).sum()),
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Print a validation report."""
     print("=" * 60)
     print("DEMOGRAPHICS VALIDATION")
     print("=" * 60)
-    
-    # Check 1: Age groups sum to 100%
+
     print("\n1. Checking age group percentages sum to ~100%...")
-    demo_df["total_pop"] = (demo_df["DEM_Edad_0_19_Total"] + demo_df["DEM_Edad_20_39_Total"] + 
-                            demo_df["DEM_Edad_40_59_Total"] + demo_df["DEM_Edad_60_79_Total"] + 
-                            demo_df["DEM_Edad_80Plus_Total"])
-    
-    demo_df["pct_0_19"] = demo_df["DEM_Edad_0_19_Total"] / demo_df["total_pop"] * 100
-    demo_df["pct_20_39"] = demo_df["DEM_Edad_20_39_Total"] / demo_df["total_pop"] * 100
-    demo_df["pct_40_59"] = demo_df["DEM_Edad_40_59_Total"] / demo_df["total_pop"] * 100
-    demo_df["pct_60_79"] = demo_df["DEM_Edad_60_79_Total"] / demo_df["total_pop"] * 100
-    demo_df["pct_80plus"] = demo_df["DEM_Edad_80Plus_Total"] / demo_df["total_pop"] * 100
-    demo_df["pct_sum"] = demo_df[["pct_0_19", "pct_20_39", "pct_40_59", "pct_60_79", "pct_80plus"]].sum(axis=1)
-    
-    invalid = demo_df[abs(demo_df["pct_sum"] - 100) > 0.01]
-    if len(invalid) > 0:
-        print(f"   ❌ {len(invalid)} municipalities have invalid percentages:")
-        print(invalid[["Nombre", "pct_sum"]])
+    if report["invalid_percentages"]:
+        print(f"   ❌ {len(report['invalid_percentages'])} municipalities have invalid percentages:")
+        print("\n".join(report["invalid_percentages"]))
     else:
-        print(f"   ✅ All {len(demo_df)} municipalities sum to 100%")
-    
-    # Check 2: Missing municipalities in master
+        print(f"   ✅ All {report['municipalities']} municipalities sum to 100%")
+
     print("\n2. Checking for missing municipalities in master dataset...")
-    missing = master_df[master_df["DEM_Edad_0_19_Total"].isna()]
-    if len(missing) > 0:
-        print(f"   ⚠️  {len(missing)} municipalities missing demographics:")
-        print(missing[["Nombre"]].to_string(index=False))
+    if report["missing_demographics"]:
+        print(f"   ⚠️  {len(report['missing_demographics'])} municipalities missing demographics:")
+        print("\n".join(report["missing_demographics"]))
     else:
-        print(f"   ✅ All {len(master_df)} municipalities have demographics")
-    
-    # Check 3: Gender consistency
+        print(f"   ✅ All {report['master_municipalities']} municipalities have demographics")
+
     print("\n3. Checking gender totals match...")
-    for group in ["0_19", "20_39", "40_59", "60_79", "80Plus"]:
-        demo_df[f"gender_sum_{group}"] = (demo_df[f"DEM_Edad_{group}_Hombres"] + 
-                                          demo_df[f"DEM_Edad_{group}_Mujeres"])
-        demo_df[f"gender_diff_{group}"] = abs(demo_df[f"gender_sum_{group}"] - demo_df[f"DEM_Edad_{group}_Total"])
-    
-    gender_issues = demo_df[demo_df[[f"gender_diff_{g}" for g in ["0_19", "20_39", "40_59", "60_79", "80Plus"]]].max(axis=1) > 0]
-    if len(gender_issues) > 0:
-        print(f"   ❌ {len(gender_issues)} municipalities have gender mismatches")
+    if report["gender_mismatches"]:
+        print(f"   ❌ {report['gender_mismatches']} municipalities have gender mismatches")
     else:
         print(f"   ✅ All gender totals match")
-    
+
     print("\n" + "=" * 60)
     print("VALIDATION COMPLETE")
     print("=" * 60)
 
+
+def main():
+    script_dir = Path(__file__).parent.parent
+    demo_path = script_dir / "data" / "demographics_clean.csv"
+    master_path = script_dir / "data" / "merged_dataset.csv"
+    
+    # Load data
+    demo_df = pd.read_csv(demo_path)
+    master_df = pd.read_csv(master_path, sep=None, engine="python")
+    
+    print_report(validate_demographics(demo_df, master_df))
+
 if __name__ == "__main__":
     main()
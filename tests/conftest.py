@@ -0,0 +1,7 @@
+# tests/conftest.py
+"""Make the repository packages (config, core) importable from the tests."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
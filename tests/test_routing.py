@@ -0,0 +1,68 @@
+# tests/test_routing.py
+"""Grid nearest-neighbour search (core/routing.py) against brute force.
+
+Covers the layouts that make a ring-by-ring search expand far: a service
+with one POI, co-located POIs, clusters far from the queries and points
+along a line, plus a dense uniform layout; each must finish within
+CASE_TIME_LIMIT.
+"""
+
+import time
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+import pytest
+
+from core.gravity import GRAVITY_NEIGHBOURS
+from core.routing import build_grid_index, k_nearest_points
+
+# Seconds allowed per layout (the slowest takes about one on a laptop)
+CASE_TIME_LIMIT: float = 10.0
+
+Layout = Callable[[np.random.Generator], Tuple[np.ndarray, np.ndarray]]
+
+
+def _spread(rng: np.random.Generator, half_width: float, count: int = 2_000) -> np.ndarray:
+    """Queries spread uniformly over a square centred on the origin."""
+    return rng.uniform(-half_width, half_width, (count, 2))
+
+
+LAYOUTS: Dict[str, Layout] = {
+    "single POI": lambda rng: (np.zeros((1, 2)), _spread(rng, 20_000)),
+    "co-located POIs": lambda rng: (np.full((25, 2), 3_000.0), _spread(rng, 20_000)),
+    "small far cluster": lambda rng: (rng.normal(0, 50, (30, 2)), _spread(rng, 300_000)),
+    "dense far cluster": lambda rng: (rng.uniform(-1_000, 1_000, (20_000, 2)), _spread(rng, 100_000)),
+    "elongated": lambda rng: (
+        np.column_stack([rng.uniform(-50_000, 50_000, 20_000), rng.uniform(0, 1, 20_000)]),
+        _spread(rng, 20_000),
+    ),
+    "uniform": lambda rng: (rng.uniform(-20_000, 20_000, (20_000, 2)), _spread(rng, 20_000)),
+}
+
+
+def brute_force_distances(points: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Sorted distances to the k nearest points, in chunks of queries."""
+    k = min(k, len(points))
+    out = np.empty((len(queries), k))
+    for i in range(0, len(queries), 200):
+        d = np.hypot(queries[i:i + 200, None, 0] - points[None, :, 0], queries[i:i + 200, None, 1] - points[None, :, 1])
+        out[i:i + 200] = np.sort(np.partition(d, k - 1, axis=1)[:, :k], axis=1)
+    return out
+
+
+@pytest.mark.parametrize("k", [1, GRAVITY_NEIGHBOURS])
+@pytest.mark.parametrize("with_queries", [False, True], ids=["points only", "with queries"])
+@pytest.mark.parametrize("layout", list(LAYOUTS))
+def test_k_nearest_points_matches_brute_force(layout: str, with_queries: bool, k: int):
+    points, queries = LAYOUTS[layout](np.random.default_rng(0))
+
+    start = time.perf_counter()
+    index = build_grid_index(points, queries=queries if with_queries else None)
+    nearest, distance = k_nearest_points(index, queries, k)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < CASE_TIME_LIMIT
+    np.testing.assert_allclose(distance, brute_force_distances(points, queries, k), rtol=0, atol=1e-6)
+    # Reported positions are the points at the reported distances
+    found = np.hypot(*(points[nearest] - queries[:, None, :]).transpose(2, 0, 1))
+    np.testing.assert_allclose(found, distance, rtol=0, atol=1e-6)
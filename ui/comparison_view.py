@@ -8,7 +8,9 @@ import plotly.graph_objects as go
 import streamlit as st
 from PIL import Image
 
-from config.constants import CRITERIA, CRITERIA_LABELS, CRITERIA_ICONS
+from config.constants import CRITERIA_LABELS, CRITERIA_ICONS, available_criteria
+from ui.details_view import municipality_option_labels
+from ui.media import COMPARISON_CARD_SIZES, render_municipality_image
 
 
 def render_municipality_comparison_card(muni: pd.Series, images: Dict[str, Optional[Image.Image]], index: int) -> None:
@@ -42,10 +44,7 @@ def render_municipality_comparison_card(muni: pd.Series, images: Dict[str, Optio
     
     with col_content:
         # Image
-        from core.data_loader import get_municipality_image
-        img = get_municipality_image(muni["Nombre"])
-        if img:
-            st.image(img, width='stretch')
+        render_municipality_image(muni["Nombre"], COMPARISON_CARD_SIZES, muni["slug"])
         
         # Name and score
         st.markdown(f"<div class='municipality-name'>{muni['Nombre']}</div>", unsafe_allow_html=True)
@@ -74,14 +73,15 @@ def create_radar_chart(municipalities: List[pd.Series]) -> go.Figure:
     colors = ["#568EE2", "#6FB5BA", "#C35309", "#A59FD0"]
     
     fig = go.Figure()
+    criteria = available_criteria(municipalities[0].index) if municipalities else []
     
     for idx, muni in enumerate(municipalities):
         # Get normalized values for all criteria (0-100 scale)
-        values = [float(muni[f"NORM_{crit}"]) * 100 for crit in CRITERIA]
+        values = [float(muni[f"NORM_{crit}"]) * 100 for crit in criteria]
         values.append(values[0])  # Close the polygon
         
         # Get criterion labels
-        labels = [CRITERIA_LABELS[crit] for crit in CRITERIA]
+        labels = [CRITERIA_LABELS[crit] for crit in criteria]
         labels.append(labels[0])  # Close the polygon
         
         fig.add_trace(go.Scatterpolar(
@@ -153,11 +153,7 @@ def render_comparison_view(scores_df: pd.DataFrame, images: Dict[str, Optional[I
     st.markdown("Compara hasta 4 municipios lado a lado y visualiza sus fortalezas en el gráfico radar.")
     
     # Get municipality data
-    comparison_munis = []
-    for code in comparison_codes:
-        muni_data = scores_df[scores_df["codigo"] == code]
-        if len(muni_data) > 0:
-            comparison_munis.append(muni_data.iloc[0])
+    comparison_munis = [scores_df.loc[code] for code in comparison_codes if code in scores_df.index]
     
     # Municipality cards
     num_munis = len(comparison_munis)
@@ -183,20 +179,18 @@ def render_comparison_view(scores_df: pd.DataFrame, images: Dict[str, Optional[I
             
             # Searchable selectbox
             available_munis = scores_df[~scores_df["codigo"].isin(comparison_codes)]
-            options = [f"{row['Nombre']} (Puntuación: {row['weighted_score']:.1f})" 
-                      for _, row in available_munis.iterrows()]
+            options = available_munis.index.tolist()
             
             if options:
                 selected = st.selectbox(
                     "Buscar municipio:",
-                    ["Selecciona un municipio..."] + options,
+                    [None] + options,
+                    format_func=municipality_option_labels(scores_df).__getitem__,
                     key=f"add_comparison_{num_munis}"
                 )
                 
-                if selected != "Selecciona un municipio...":
-                    muni_name = selected.split(" (Puntuación:")[0]
-                    muni_code = available_munis[available_munis["Nombre"] == muni_name].iloc[0]["codigo"]
-                    comparison_codes.append(muni_code)
+                if selected is not None:
+                    comparison_codes.append(selected)
                     st.session_state["comparison_municipalities"] = comparison_codes
                     st.rerun()
     
@@ -2,7 +2,7 @@
 """Municipality details and comparison panel."""
 
 import random
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 import pandas as pd
 import streamlit as st
@@ -12,8 +12,62 @@ from PIL import Image
 
 from config.constants import (
     CRITERIA, CRITERIA_ICONS, CRITERIA_LABELS, BENEFIT_COLUMNS, COST_COLUMNS,
-    DEMOGRAPHIC_COLUMNS, AGE_GROUP_LABELS, AGE_60_PLUS_GROUPS
+    AGE_GROUP_LABELS, AGE_GROUP_COUNT_COLUMNS, AGE_GROUP_SHARE_COLUMNS,
+    GENDER_TOTAL_COLUMNS, GENDER_SHARE_COLUMNS,
 )
+from core.accessibility import MEMBER_PREFIX
+from ui.media import DETAILS_SIZES, render_municipality_image
+
+# Breakdown keys of the transport bar and their categories ("edu" covers every edu_* key)
+TRANSPORT_CATEGORIES: Dict[str, str] = {
+    "gas": "Gasolineras",
+    "supermarket": "Supermercados",
+    "sport": "Deportes",
+    "gp": "Salud",
+    "pharmacy": "Salud",
+    "edu": "Educación",
+    "commute": "Trabajo",
+}
+
+
+def municipality_option_labels(scores_df: pd.DataFrame) -> Dict[Optional[int], str]:
+    """Selectbox labels for every municipality code, built in one pass.
+    
+    Selectboxes call their format function once per option on every rerun;
+    a prebuilt dictionary keeps that cheap with thousands of municipalities.
+    
+    Args:
+        scores_df: Scores DataFrame indexed by codigo
+        
+    Returns:
+        Mapping {code: label}, with None for the placeholder entry
+    """
+    labels = scores_df["Nombre"].astype(str) + " (Puntuación: " + scores_df["weighted_score"].map("{:.1f}".format) + ")"
+    return {None: "Selecciona un municipio...", **dict(zip(scores_df.index, labels))}
+
+
+def member_breakdown(muni: pd.Series, labels: List[str]) -> pd.DataFrame:
+    """Weekly hours of each household member by service category.
+    
+    Args:
+        muni: Municipality row with mhrs_{member}_{key} columns
+        labels: Member labels, in member order
+        
+    Returns:
+        DataFrame indexed by label with one column per category plus Total
+    """
+    rows = {}
+    for m, label in enumerate(labels):
+        prefix = f"{MEMBER_PREFIX}{m}_"
+        row = dict.fromkeys(TRANSPORT_CATEGORIES.values(), 0.0)
+        for col in muni.index:
+            if col.startswith(prefix) and col != f"{prefix}total":
+                key = col[len(prefix):]
+                category = TRANSPORT_CATEGORIES.get("edu" if key.startswith("edu_") else key)
+                row[category] += float(muni[col])
+        row["Total"] = float(muni[f"{prefix}total"])
+        rows[label] = row
+    return pd.DataFrame.from_dict(rows, orient="index")
 
 
 def show_single_municipality_details(
@@ -33,11 +87,7 @@ def show_single_municipality_details(
     col1, col2 = st.columns([1, 2])
 
     with col1:
-        from core.data_loader import get_municipality_image
-
-        img = get_municipality_image(muni["Nombre"])
-        if img:
-            st.image(img)
+        render_municipality_image(muni["Nombre"], DETAILS_SIZES, muni["slug"])
 
     with col2:
         st.markdown(
@@ -48,26 +98,28 @@ def show_single_municipality_details(
         st.markdown(f":material/payments: | **Precio vivienda:** {muni['IDE_PrecioPorMetroCuadrado']:.0f} €/m²")
         st.markdown(f":material/schedule: | **Horas a la semana en transporte:** {muni['AccessibilityHoursWeekly']:.1f}")
 
+        # Ranking in each compared year (NaN when absent that year)
+        rank_cols = [col for col in muni.index if col.startswith("Rank_")]
+        if rank_cols:
+            positions = " · ".join(
+                f"{col[len('Rank_'):]}: {int(muni[col])}º" if pd.notna(muni[col]) else f"{col[len('Rank_'):]}: —"
+                for col in rank_cols
+            )
+            st.markdown(f":material/trending_up: | **Posición por año:** {positions}")
+
     # Demographics section
     st.markdown("#### **:material/leaderboard: Demografía**")
 
-    # Calculate percentages using demographics total
-    dem_total = (muni[DEMOGRAPHIC_COLUMNS["0-19"]] + 
-                muni[DEMOGRAPHIC_COLUMNS["20-39"]] + 
-                muni[DEMOGRAPHIC_COLUMNS["40-59"]] + 
-                muni[DEMOGRAPHIC_COLUMNS["60-79"]] + 
-                muni[DEMOGRAPHIC_COLUMNS["80+"]])
-
-    pct_0_19 = (muni[DEMOGRAPHIC_COLUMNS["0-19"]] / dem_total * 100)
-    pct_20_39 = (muni[DEMOGRAPHIC_COLUMNS["20-39"]] / dem_total * 100)
-    pct_40_59 = (muni[DEMOGRAPHIC_COLUMNS["40-59"]] / dem_total * 100)
-    pct_60plus = ((muni[DEMOGRAPHIC_COLUMNS["60-79"]] + muni[DEMOGRAPHIC_COLUMNS["80+"]]) / dem_total * 100)
+    # Percentages and counts are precomputed for the whole dataset at load time
+    pct_0_19 = muni[AGE_GROUP_SHARE_COLUMNS["0-19"]]
+    pct_20_39 = muni[AGE_GROUP_SHARE_COLUMNS["20-39"]]
+    pct_40_59 = muni[AGE_GROUP_SHARE_COLUMNS["40-59"]]
+    pct_60plus = muni[AGE_GROUP_SHARE_COLUMNS["60+"]]
 
-    # Get exact counts
-    count_0_19 = int(muni[DEMOGRAPHIC_COLUMNS["0-19"]])
-    count_20_39 = int(muni[DEMOGRAPHIC_COLUMNS["20-39"]])
-    count_40_59 = int(muni[DEMOGRAPHIC_COLUMNS["40-59"]])
-    count_60plus = int(muni[DEMOGRAPHIC_COLUMNS["60-79"]] + muni[DEMOGRAPHIC_COLUMNS["80+"]])
+    count_0_19 = int(muni[AGE_GROUP_COUNT_COLUMNS["0-19"]])
+    count_20_39 = int(muni[AGE_GROUP_COUNT_COLUMNS["20-39"]])
+    count_40_59 = int(muni[AGE_GROUP_COUNT_COLUMNS["40-59"]])
+    count_60plus = int(muni[AGE_GROUP_COUNT_COLUMNS["60+"]])
 
     # Stacked bar
     st.markdown(
@@ -95,12 +147,10 @@ def show_single_municipality_details(
     if show_gender_chart:
         st.markdown("#### **:material/wc: Distribución por género**")
         
-        # Calculate gender totals
-        total_hombres = sum([muni[f"DEM_Edad_{g}_Hombres"] for g in ["0_19", "20_39", "40_59", "60_79", "80Plus"]])
-        total_mujeres = sum([muni[f"DEM_Edad_{g}_Mujeres"] for g in ["0_19", "20_39", "40_59", "60_79", "80Plus"]])
-        
-        pct_hombres = (total_hombres / dem_total * 100)
-        pct_mujeres = (total_mujeres / dem_total * 100)
+        total_hombres = int(muni[GENDER_TOTAL_COLUMNS["Hombres"]])
+        total_mujeres = int(muni[GENDER_TOTAL_COLUMNS["Mujeres"]])
+        pct_hombres = muni[GENDER_SHARE_COLUMNS["Hombres"]]
+        pct_mujeres = muni[GENDER_SHARE_COLUMNS["Mujeres"]]
         
         # Gender bar
         st.markdown(
@@ -131,8 +181,9 @@ def show_single_municipality_details(
     
     # Sum all education-related columns
     hrs_education = sum([muni.get(col, 0) for col in muni.index if col.startswith("hrs_edu_")])
+    hrs_commute = muni.get("hrs_commute", 0)
     
-    total_hrs = hrs_gas + hrs_supermarket + hrs_sport + hrs_health + hrs_education
+    total_hrs = hrs_gas + hrs_supermarket + hrs_sport + hrs_health + hrs_education + hrs_commute
     
     if total_hrs > 0:
         # Calculate percentages
@@ -141,6 +192,7 @@ def show_single_municipality_details(
         pct_sport = (hrs_sport / total_hrs * 100)
         pct_health = (hrs_health / total_hrs * 100)
         pct_education = (hrs_education / total_hrs * 100)
+        pct_commute = (hrs_commute / total_hrs * 100)
         
         # Build the bar chart (only show categories with > 0 hours)
         bar_html = '<div class="demographics-bar">'
@@ -155,6 +207,8 @@ def show_single_municipality_details(
             bar_html += f'<div style="background: #C35309; width: {pct_health:.1f}%;" title="{hrs_health:.2f} h/semana">{pct_health:.1f}%</div>'
         if pct_education > 0:
             bar_html += f'<div style="background: #568EE2; width: {pct_education:.1f}%;" title="{hrs_education:.2f} h/semana">{pct_education:.1f}%</div>'
+        if pct_commute > 0:
+            bar_html += f'<div style="background: #377F86; width: {pct_commute:.1f}%;" title="{hrs_commute:.2f} h/semana">{pct_commute:.1f}%</div>'
         
         bar_html += '</div>'
         st.markdown(bar_html, unsafe_allow_html=True)
@@ -171,11 +225,19 @@ def show_single_municipality_details(
             legend_html += '<span><span style="color: #C35309;">■</span> Salud</span>'
         if pct_education > 0:
             legend_html += '<span><span style="color: #568EE2;">■</span> Educación</span>'
+        if pct_commute > 0:
+            legend_html += '<span><span style="color: #377F86;">■</span> Trabajo</span>'
         legend_html += '</div>'
         st.markdown(legend_html, unsafe_allow_html=True)
     else:
         st.markdown("_No hay datos de transporte disponibles._")
 
+    # Per-member breakdown (household mode)
+    labels = st.session_state.get("household_labels", [])
+    if labels and f"{MEMBER_PREFIX}0_total" in muni.index:
+        st.markdown("##### **:material/groups: Por miembro del hogar (h/semana)**")
+        st.dataframe(member_breakdown(muni, labels).round(2), width='stretch')
+
     # Legend
     st.markdown("### **Desglose por criterio**")
     st.markdown(
@@ -212,13 +274,12 @@ def show_single_municipality_details(
         else:
             raw_value = ""
         
-        # Calculate rank
+        # Calculate rank (1 + municipalities strictly better on this criterion)
         rank = None
         total_munis = None
         if all_scores is not None:
-            sorted_scores = all_scores.sort_values(norm_col, ascending=False).reset_index(drop=True)
-            rank = sorted_scores[sorted_scores['codigo'] == muni['codigo']].index[0] + 1
-            total_munis = len(sorted_scores)
+            rank = int((all_scores[norm_col].to_numpy() > value).sum()) + 1
+            total_munis = len(all_scores)
 
         col_label, col_bar = st.columns([2, 3])
         with col_label:
@@ -281,13 +342,13 @@ def render_details(municipality: pd.Series, images: Dict, all_scores: pd.DataFra
 
         if comparison_mode:
             # Look up fresh comparison municipality data
-            comparison_muni_data = all_scores[all_scores["codigo"] == st.session_state["comparison_municipality_code"]]
-            if len(comparison_muni_data) == 0:
+            comparison_code = st.session_state["comparison_municipality_code"]
+            if comparison_code not in all_scores.index:
                 # Comparison municipality no longer in results
                 st.session_state.pop("comparison_municipality_code", None)
                 st.rerun()
                 return
-            comparison_muni = comparison_muni_data.iloc[0]
+            comparison_muni = all_scores.loc[comparison_code]
             
             # Close comparison button at top
             close_col1, close_col2 = st.columns([17, 1])
@@ -309,36 +370,31 @@ def render_details(municipality: pd.Series, images: Dict, all_scores: pd.DataFra
 
 
                 st.markdown("---\n**Cambiar municipio:**")
-                options = [f"{row['Nombre']} (Puntuación: {row['weighted_score']:.1f})"
-                          for _, row in all_scores.iterrows() if row["codigo"] != municipality["codigo"]]
+                options = all_scores.index[all_scores.index != municipality["codigo"]].tolist()
 
                 if options:
-                    current_selection = f"{comparison_muni['Nombre']} (Puntuación: {comparison_muni['weighted_score']:.1f})"
                     try:
-                        current_index = options.index(current_selection) + 1
+                        current_index = options.index(comparison_code) + 1
                     except ValueError:
                         current_index = 0
 
-                    selected = st.selectbox("Selecciona otro municipio:", ["Selecciona un municipio..."] + options,
-                                          index=current_index, key="comparison_selector_in_panel")
+                    selected = st.selectbox("Selecciona otro municipio:", [None] + options,
+                                          index=current_index, key="comparison_selector_in_panel",
+                                          format_func=municipality_option_labels(all_scores).__getitem__)
 
-                    if selected != "Selecciona un municipio..." and selected != current_selection:
-                        comp_name = selected.split(" (Puntuación:")[0]
-                        comp_code = all_scores[all_scores["Nombre"] == comp_name].iloc[0]["codigo"]
-                        st.session_state["comparison_municipality_code"] = comp_code
+                    if selected is not None and selected != comparison_code:
+                        st.session_state["comparison_municipality_code"] = selected
                         st.rerun()
 
         else:
             show_single_municipality_details(municipality, images, all_scores=all_scores)
             st.markdown("---")
             st.subheader(":material/search: Comparar con otro municipio")
-            options = [f"{row['Nombre']} (Puntuación: {row['weighted_score']:.1f})"
-                      for _, row in all_scores.iterrows() if row["codigo"] != municipality["codigo"]]
+            options = all_scores.index[all_scores.index != municipality["codigo"]].tolist()
             if options:
-                selected = st.selectbox("Selecciona municipio para comparar:", ["Selecciona un municipio..."] + options,
-                                      key="comparison_selector")
-                if selected != "Selecciona un municipio...":
-                    comp_name = selected.split(" (Puntuación:")[0]
-                    comp_code = all_scores[all_scores["Nombre"] == comp_name].iloc[0]["codigo"]
-                    st.session_state["comparison_municipality_code"] = comp_code
+                selected = st.selectbox("Selecciona municipio para comparar:", [None] + options,
+                                      key="comparison_selector",
+                                      format_func=municipality_option_labels(all_scores).__getitem__)
+                if selected is not None:
+                    st.session_state["comparison_municipality_code"] = selected
                     st.rerun()
@@ -2,12 +2,17 @@
 """List view with municipality cards."""
 
 import math
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 import pandas as pd
 import streamlit as st
 from PIL import Image
 
+from core.images import prefetch_municipality_images
+from ui.media import LIST_CARD_SIZES, render_municipality_image
+
+LIST_PAGE_SIZE: int = 10
+
 
 def render_municipality_card(muni: pd.Series, images: Dict[str, Optional[Image.Image]], row_idx: int) -> None:
     """Render single municipality card.
@@ -22,10 +27,7 @@ def render_municipality_card(muni: pd.Series, images: Dict[str, Optional[Image.I
     col1, col2 = st.columns([1, 3])
 
     with col1:
-        from core.data_loader import get_municipality_image
-        img = get_municipality_image(muni["Nombre"])
-        if img:
-            st.image(img, width='stretch')
+        render_municipality_image(muni["Nombre"], LIST_CARD_SIZES, muni["slug"])
 
     with col2:
         # Name and button side by side
@@ -94,6 +96,26 @@ def _render_pagination(current_page: int, num_pages: int, key_suffix: str) -> No
             st.rerun()
 
 
+def _neighbour_page_names(scores_df: pd.DataFrame, current_page: int, num_pages: int, page_size: int) -> List[str]:
+    """Municipality names on the pages adjacent to the current one.
+
+    Args:
+        scores_df: Sorted DataFrame with municipality scores
+        current_page: Current page number
+        num_pages: Total number of pages
+        page_size: Cards per page
+
+    Returns:
+        Names on page N+1 followed by page N-1
+    """
+    names: List[str] = []
+    for page in (current_page + 1, current_page - 1):
+        if 1 <= page <= num_pages:
+            start = (page - 1) * page_size
+            names.extend(scores_df["Nombre"].iloc[start:start + page_size].astype(str))
+    return names
+
+
 def render_list_view(scores_df: pd.DataFrame, images: Dict[str, Optional[Image.Image]]) -> None:
     """Render paginated list of municipalities with arrow navigation.
     
@@ -110,7 +132,7 @@ def render_list_view(scores_df: pd.DataFrame, images: Dict[str, Optional[Image.I
     st.markdown('<hr style="margin: 0.5rem 0; border: none; border-top: 1px solid #ddd;">', unsafe_allow_html=True)
 
 
-    page_size = 10
+    page_size = LIST_PAGE_SIZE
     total = len(scores_df)
     num_pages = max(1, math.ceil(total / page_size))
     
@@ -138,9 +160,9 @@ def render_list_view(scores_df: pd.DataFrame, images: Dict[str, Optional[Image.I
             st.markdown('<hr style="margin: 0.5rem 0; border: none; border-top: 1px solid #ddd;">', unsafe_allow_html=True)
             from ui.details_view import render_details
             # Look up fresh data from current scores_df
-            selected_muni = scores_df[scores_df["codigo"] == st.session_state["selected_municipality_code"]]
-            if len(selected_muni) > 0:
-                render_details(selected_muni.iloc[0], images, scores_df)
+            selected_code = st.session_state["selected_municipality_code"]
+            if selected_code in scores_df.index:
+                render_details(scores_df.loc[selected_code], images, scores_df)
             st.markdown('<hr style="margin: 0.5rem 0; border: none; border-top: 1px solid #ddd;">', unsafe_allow_html=True)
         else:
             render_municipality_card(row, images, idx)
@@ -150,3 +172,6 @@ def render_list_view(scores_df: pd.DataFrame, images: Dict[str, Optional[Image.I
     st.markdown('<hr style="margin: 0.5rem 0; border: none; border-top: 1px solid #ddd;">', unsafe_allow_html=True)
 
     _render_pagination(current_page, num_pages, "bottom")
+
+    # Warm image caches for the adjacent pages while the user reads this one
+    prefetch_municipality_images(_neighbour_page_names(scores_df, current_page, num_pages, page_size))
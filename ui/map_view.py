@@ -1,36 +1,63 @@
 # ui/map_view.py
 """Map visualization component."""
 
-import geopandas as gpd
+from typing import Dict, Tuple
+
 import pandas as pd
 import plotly.express as px
 import streamlit as st
 
+from core.boundaries import pick_geometry_level, view_for_bounds
+from core.data_loader import map_bounds, map_feature_collection
+
+DEFAULT_CENTER: Dict[str, float] = {"lat": 40.4168, "lon": -3.7038}
+DEFAULT_ZOOM: float = 8.0
+
+
+def _map_view(scores_df: pd.DataFrame) -> Tuple[Dict[str, float], float, str]:
+    """Pick center, zoom and level of detail that fit the displayed municipalities.
+
+    Args:
+        scores_df: DataFrame with codigo column
 
-def create_heatmap(gdf: gpd.GeoDataFrame):
+    Returns:
+        Tuple of (center, zoom, level)
+    """
+    bounds = map_bounds(set(scores_df["codigo"].tolist()))
+    if bounds is None:
+        return DEFAULT_CENTER, DEFAULT_ZOOM, pick_geometry_level(DEFAULT_ZOOM)
+    center, zoom = view_for_bounds(bounds)
+    return center, zoom, pick_geometry_level(zoom)
+
+
+def create_heatmap(scores_df: pd.DataFrame):
     """Create choropleth map of municipalities.
     
+    Geometries are pre-simplified and already in EPSG:4326; the level of
+    detail is chosen from the zoom needed to fit the displayed municipalities.
+    
     Args:
-        gdf: GeoDataFrame with weighted_score column
+        scores_df: DataFrame with codigo, Nombre and weighted_score columns
         
     Returns:
         Plotly figure
     """
-    gdf_plot = gdf.to_crs(epsg=4326)
+    center, zoom, level = _map_view(scores_df)
+    geojson = map_feature_collection(level, set(scores_df["codigo"].tolist()))
 
     fig = px.choropleth_mapbox(
-        gdf_plot,
-        geojson=gdf_plot.geometry.__geo_interface__,
-        locations=gdf_plot.index,
+        scores_df,
+        geojson=geojson,
+        locations="codigo",
         color="weighted_score",
         color_continuous_scale=["#DFD1B6", "#6FB5BA", "#568EE2", "#3D517B"],
-        range_color=[gdf_plot["weighted_score"].min(), gdf_plot["weighted_score"].max()],
+        range_color=[scores_df["weighted_score"].min(), scores_df["weighted_score"].max()],
         mapbox_style="open-street-map",
-        zoom=8,
-        center={"lat": 40.4168, "lon": -3.7038},
+        zoom=zoom,
+        center=center,
         opacity=0.7,
         title="Mapa de municipios según tu perfil",
-        custom_data=[gdf_plot["Nombre"]],
+        custom_data=["Nombre"],
         labels={"weighted_score": "Puntuación (más alto = mejor)"},
     )
 
@@ -47,14 +74,13 @@ def create_heatmap(gdf: gpd.GeoDataFrame):
     return fig
 
 # New function:
-def render_map_view(gdf: gpd.GeoDataFrame, scores_df: pd.DataFrame) -> None:
+def render_map_view(scores_df: pd.DataFrame) -> None:
     """Render map view with click handling.
     
     Args:
-        gdf: GeoDataFrame with municipality boundaries and scores
         scores_df: DataFrame with municipality scores
     """
-    if len(gdf) == 0:
+    if len(scores_df) == 0:
         st.warning("No hay municipios disponibles para mostrar.")
         return
 
@@ -68,7 +94,7 @@ def render_map_view(gdf: gpd.GeoDataFrame, scores_df: pd.DataFrame) -> None:
     
     suppress = st.session_state.pop("suppress_map_selection", False)
 
-    fig = create_heatmap(gdf)
+    fig = create_heatmap(scores_df)
     event = st.plotly_chart(
         fig,
         key="heatmap",
@@ -79,8 +105,8 @@ def render_map_view(gdf: gpd.GeoDataFrame, scores_df: pd.DataFrame) -> None:
 
     if not suppress and event and event.selection and event.selection["point_indices"]:
         idx = event.selection["point_indices"][0]
-        clicked_name = gdf.iloc[idx]["Nombre"]
-        selected_row = scores_df[scores_df["Nombre"] == clicked_name].iloc[0]
+        selected_row = scores_df.iloc[idx]
+        clicked_name = selected_row["Nombre"]
 
         if in_comparison_mode:
             # Add to comparison list
@@ -109,10 +135,10 @@ def render_map_view(gdf: gpd.GeoDataFrame, scores_df: pd.DataFrame) -> None:
         from core.data_loader import load_placeholder_images
         
         # Look up fresh data from current scores_df
-        selected_muni = scores_df[scores_df["codigo"] == st.session_state["selected_municipality_code"]]
-        if len(selected_muni) > 0:
+        selected_code = st.session_state["selected_municipality_code"]
+        if selected_code in scores_df.index:
             images = load_placeholder_images()
-            render_details(selected_muni.iloc[0], images, scores_df)
+            render_details(scores_df.loc[selected_code], images, scores_df)
         else:
             # Municipality no longer in filtered results
             st.session_state.pop("selected_municipality_code", None)
@@ -0,0 +1,46 @@
+# ui/media.py
+"""Municipality image rendering shared by list, comparison and details views."""
+
+from html import escape
+from typing import Optional
+
+import streamlit as st
+
+from core.images import get_municipality_image, static_image_sources, use_static_images
+
+# `sizes` hints telling the browser how wide each card image is displayed
+LIST_CARD_SIZES = "(max-width: 767px) 100vw, 25vw"
+COMPARISON_CARD_SIZES = "(max-width: 767px) 100vw, 20vw"
+DETAILS_SIZES = "(max-width: 767px) 100vw, 33vw"
+
+
+def render_municipality_image(nombre: str, sizes: str, slug: Optional[str] = None) -> None:
+    """Render a municipality image.
+
+    In static mode this emits a responsive <picture> pointing at cacheable
+    URLs, so the browser fetches (and keeps) only the size it needs and
+    nothing goes through the session websocket. Otherwise the image bytes
+    are sent with st.image.
+
+    Args:
+        nombre: Municipality name
+        sizes: HTML `sizes` attribute for the displayed width
+        slug: Precomputed slug from the dataset, derived from nombre if omitted
+    """
+    if use_static_images():
+        sources = static_image_sources(nombre, slug)
+        if sources:
+            st.markdown(
+                f'<picture>'
+                f'<source type="image/webp" srcset="{sources["webp"]}" sizes="{sizes}">'
+                f'<img src="{sources["src"]}" srcset="{sources["jpeg"]}" sizes="{sizes}" '
+                f'alt="{escape(nombre)}" loading="lazy" decoding="async" '
+                f'style="width: 100%; height: auto; border-radius: 0.5rem;">'
+                f'</picture>',
+                unsafe_allow_html=True,
+            )
+            return
+
+    img = get_municipality_image(nombre, slug=slug)
+    if img:
+        st.image(img, width='stretch')
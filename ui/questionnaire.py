@@ -4,8 +4,13 @@
 import streamlit as st
 from typing import Dict, Any, List, Optional, Literal
 
+from config.settings import SCOPE
+from core.accessibility import household_members
+from core.boundaries import CENTROID_COLUMNS
+
 from config.constants import (
-    CRITERIA, CRITERIA_ICONS, CRITERIA_LABELS,
+    PROVINCE_NAMES, MADRID_PROVINCE,
+    CRITERIA_ICONS, CRITERIA_LABELS, available_criteria,
     CAR_FREQ_LABELS, CAR_FREQ_TO_WCAR,
     SUPERMARKET_FREQ_LABELS, SUPERMARKET_FREQ_TO_W,
     SPORT_FREQ_LABELS, SPORT_FREQ_TO_W,
@@ -14,11 +19,67 @@ from config.constants import (
 )
 
 
+def render_year_selector(years: List[int]) -> Dict[str, Any]:
+    """Render the data year selector at the top of the sidebar.
+
+    Rendered before the dataset is loaded, so only the chosen year (and any
+    years picked for comparison) are ever read.
+
+    Args:
+        years: Available padrón years, oldest first
+
+    Returns:
+        Dictionary with:
+            - year: int, year whose data is displayed
+            - compare_years: List[int], other years to rank in as well
+    """
+    if len(years) < 2:
+        return {"year": years[-1], "compare_years": []}
+
+    with st.sidebar:
+        st.subheader(":material/calendar_month: | Año de los datos")
+        year = st.selectbox("Año del padrón:", options=years[::-1], index=0)
+        compare_years = st.multiselect(
+            "Comparar el ranking con:",
+            options=[y for y in years[::-1] if y != year],
+            help="Muestra la posición de cada municipio en esos años con tus mismas preferencias.",
+        )
+    return {"year": year, "compare_years": sorted(compare_years)}
+
+
+def render_province_selector(provinces: List[int]) -> List[int]:
+    """Render the province selector (national scope only).
+
+    Rendered before the dataset is loaded: only the chosen provinces' shards
+    are read.
+
+    Args:
+        provinces: INE codes of provinces with data
+
+    Returns:
+        Selected province codes (all of them outside national scope)
+    """
+    if SCOPE != "national":
+        return provinces
+
+    default = [MADRID_PROVINCE] if MADRID_PROVINCE in provinces else provinces[:1]
+    with st.sidebar:
+        st.subheader(":material/public: | Provincias")
+        selected = st.multiselect(
+            "¿Dónde quieres buscar?",
+            options=provinces,
+            default=default,
+            format_func=lambda code: PROVINCE_NAMES.get(code, f"{code:02d}"),
+        )
+    return sorted(selected) or default
+
+
 def render_questionnaire(df_raw) -> Dict[str, Any]:
     """Render sidebar questionnaire and return user preferences.
     
     Args:
-        df_raw: Raw municipality dataset for population bounds
+        df_raw: Raw municipality dataset for population bounds and the
+            criteria it can score
         
     Returns:
         Dictionary with user preferences:
@@ -26,8 +87,15 @@ def render_questionnaire(df_raw) -> Dict[str, Any]:
             - edu_has_kids: bool
             - edu_variant: Optional['public'|'pubpriv']
             - edu_levels: List[str]
+            - commute: None, or dict with the workplace "code" (None when
+              given as coordinates), "lon", "lat", "days" per week and
+              "max_km" (None = no distance limit)
+            - household: None, or dict with members (see
+              core.accessibility.household_members) and aggregation
+              ('sum'|'max')
             - pop_min, pop_max: int
-            - ranks: List[float]
+            - criteria: List[str] (available_criteria of df_raw)
+            - ranks: List[float], one per criterion
     """
     with st.sidebar:
         st.header(":material/account_box: | Tu perfil y prioridades")
@@ -94,27 +162,106 @@ def render_questionnaire(df_raw) -> Dict[str, Any]:
         )
         w_hospital = HOSPITAL_USE_TO_W[hosp_use]
 
+        # Work
+        st.subheader(":material/work: | Trabajo")
+        work_ans = st.radio(
+            "¿Te desplazas a un lugar de trabajo?",
+            options=["No", "Sí"],
+            horizontal=True,
+        )
+        commute: Optional[Dict[str, Any]] = None
+        if work_ans == "Sí":
+            work_by = st.radio("¿Dónde trabajas?", options=["Municipio", "Coordenadas"], horizontal=True)
+            if work_by == "Municipio":
+                names = df_raw["Nombre"].astype(str)
+                work_code = st.selectbox(
+                    "Municipio de trabajo",
+                    options=names.sort_values().index.tolist(),
+                    format_func=names.to_dict().get,
+                )
+                work_lon, work_lat = (float(df_raw.at[work_code, c]) for c in CENTROID_COLUMNS)
+            else:
+                work_code = None
+                work_lat = st.number_input("Latitud", min_value=-90.0, max_value=90.0, value=40.4168, format="%.4f")
+                work_lon = st.number_input("Longitud", min_value=-180.0, max_value=180.0, value=-3.7038, format="%.4f")
+            days = st.number_input("Días por semana en el lugar de trabajo", min_value=1, max_value=7, value=5, step=1)
+            max_km = st.number_input(
+                "Distancia máxima al trabajo en km (0 = sin límite):",
+                min_value=0.0,
+                max_value=1000.0,
+                value=0.0,
+                step=5.0,
+                help="Descarta los municipios más lejanos en línea recta.",
+            )
+            commute = {
+                "code": work_code,
+                "lon": work_lon,
+                "lat": work_lat,
+                "days": float(days),
+                "max_km": max_km or None,
+            }
+
+        # Household
+        st.subheader(":material/groups: | Hogar")
+        household_ans = st.radio(
+            "¿Calculamos los desplazamientos de todo el hogar?",
+            options=["No", "Sí"],
+            horizontal=True,
+            help="Suma los trayectos de cada adulto y de cada hij@ (uno por etapa elegida).",
+        )
+        household: Optional[Dict[str, Any]] = None
+        if household_ans == "Sí":
+            n_adults = st.number_input("¿Cuántos otros adultos viven contigo?", min_value=0, max_value=3, value=1, step=1)
+            other_adults: List[Dict[str, float]] = []
+            for i in range(2, int(n_adults) + 2):
+                with st.expander(f"Adulto {i}"):
+                    adult_car = st.selectbox("Uso del coche", options=CAR_FREQ_LABELS, index=2, key=f"adult_{i}_car")
+                    adult_sport = st.selectbox("Deporte", options=SPORT_FREQ_LABELS, index=1, key=f"adult_{i}_sport")
+                    adult_hosp = st.selectbox("Salud", options=HOSPITAL_USE_LABELS, index=1, key=f"adult_{i}_hospital")
+                other_adults.append({
+                    "freq_car": CAR_FREQ_TO_WCAR[adult_car],
+                    "freq_sport": SPORT_FREQ_TO_W[adult_sport],
+                    "freq_hospital": HOSPITAL_USE_TO_W[adult_hosp],
+                })
+            aggregation = st.radio(
+                "¿Cómo combinamos los tiempos?",
+                options=["Suma del hogar", "Persona con más horas"],
+                horizontal=True,
+            )
+            max_hours = st.number_input(
+                "Máximo de horas semanales por persona (0 = sin límite):",
+                min_value=0.0,
+                max_value=40.0,
+                value=0.0,
+                step=0.5,
+                help="Descarta los municipios donde alguien superaría el límite (si ninguno lo cumple, se muestran todos).",
+            )
+            household = {
+                "members": household_members(
+                    w_car, w_supermarket, w_sport, w_hospital, edu_variant, edu_levels, other_adults, max_hours or None
+                ),
+                "aggregation": "max" if aggregation == "Persona con más horas" else "sum",
+            }
+
         # Population
         st.subheader(":material/location_city: | Tamaño del municipio")
-        if "IDE_PoblacionTotal" in df_raw.columns:
-            min_pop_data = int(df_raw["IDE_PoblacionTotal"].min())
-            max_pop_data = int(df_raw["IDE_PoblacionTotal"].max())
-        else:
-            min_pop_data, max_pop_data = 0, 50000
+        min_pop_data = int(df_raw["IDE_PoblacionTotal"].min())
+        max_pop_data = int(df_raw["IDE_PoblacionTotal"].max())
 
         pop_min, pop_max = st.slider(
             "Rango de población del municipio:",
             min_value=min_pop_data,
             max_value=max_pop_data,
-            value=(min_pop_data, min(50000, max_pop_data)),
+            value=(min_pop_data, max_pop_data if SCOPE == "national" else min(50000, max_pop_data)),
             step=1000,
         )
 
         # Criteria ranking
         st.subheader(":material/stack_star: | Prioriza estas características (0 = no importa, 10 = más importante)")
         st.caption("Puedes dar la misma puntuación a varios criterios.")
+        criteria = available_criteria(df_raw.columns)
         ranks: List[float] = []
-        for crit in CRITERIA:
+        for crit in criteria:
             label = f"{CRITERIA_ICONS[crit]}  |  {CRITERIA_LABELS[crit]}"
             rank = st.number_input(
                 label,
@@ -135,7 +282,10 @@ def render_questionnaire(df_raw) -> Dict[str, Any]:
         "edu_has_kids": edu_has_kids,
         "edu_variant": edu_variant,
         "edu_levels": edu_levels,
+        "commute": commute,
+        "household": household,
         "pop_min": pop_min,
         "pop_max": pop_max,
+        "criteria": criteria,
         "ranks": ranks,
     }